@@ -1,6 +1,7 @@
 from .models.site import Site
 from .handlers.processing import Processing
 from .view.output import Output
+from .handlers.workflows import Batch
 from . import utils
 
 #if __name__ == "__main__":
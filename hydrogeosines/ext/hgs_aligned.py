@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Aligned NumPy representation of the regular and aligned site data.
+"""
+import numpy as np
+import pandas as pd
+
+class HgsAligned(object):
+    """
+    The regular and aligned HGS data (see Processing.RegularAndAligned) as NumPy arrays.
+
+    Every GW location part has one time axis (int64 nanoseconds since the epoch, UTC). The values
+    of all categories at this time axis are the rows of one C-contiguous float array, i.e. every
+    (location, part, category) series is a contiguous view. The lookup table holds the axis and the
+    row of every series. The other categories (BP, ET) are matched to the GW time axis once and
+    must hold one location each, because every GW location part has one row per category. GW
+    times without an entry of the category hold NaN and are excluded by the mask of the series.
+    """
+
+    def __init__(self, data):
+        gw_data = data.hgs.filters.get_gw_data
+        loc_part = gw_data.hgs.filters.loc_part
+        # the categories in the order of the data
+        self.categories = [str(cat) for cat in data["category"].unique()]
+        self.units = {cat: data.hgs.get_loc_unit(cat=cat) for cat in self.categories}
+        # the other categories sorted by time, one entry per time
+        other = {}
+        for cat in self.categories:
+            if cat != "GW":
+                group = data[data["category"] == cat]
+                locs = [str(loc) for loc in group["location"].unique()]
+                if len(locs) > 1:
+                    raise Exception("Error: The '{}' data holds more than one location {}! Only one location per category other than GW can be aligned.".format(cat, locs))
+                group = group.sort_values("datetime", kind="stable").drop_duplicates(subset="datetime")
+                other[cat] = (pd.DatetimeIndex(group["datetime"]).asi8, group["value"].values)
+
+        self.keys   = []
+        self.axes   = []
+        self.arrays = []
+        self.masks  = {}
+        rows = []
+        for gw_loc, GW in gw_data.groupby(by=loc_part, observed=True):
+            t = pd.DatetimeIndex(GW["datetime"]).asi8
+            values = np.full((len(self.categories), len(t)), np.nan)
+            for row, cat in enumerate(self.categories):
+                if cat == "GW":
+                    values[row] = GW["value"].values
+                    mask = None
+                else:
+                    times, cat_values = other[cat]
+                    idx = np.minimum(np.searchsorted(times, t), max(len(times) - 1, 0))
+                    mask = (times[idx] == t) if len(times) else np.zeros(len(t), dtype=bool)
+                    values[row, mask] = cat_values[idx[mask]]
+                    if mask.all():
+                        mask = None
+                    else:
+                        self.masks[(*gw_loc, cat)] = mask
+                rows.append({"location": gw_loc[0], "part": gw_loc[1], "category": cat, "unit": self.units[cat],
+                             "axis": len(self.axes), "row": row, "count": len(t) if mask is None else int(np.count_nonzero(mask))})
+            self.keys.append(gw_loc)
+            self.axes.append(t)
+            self.arrays.append(values)
+        self.table = pd.DataFrame(rows, columns=["location", "part", "category", "unit", "axis", "row", "count"])
+        self._index = {(row.location, row.part, row.category): (row.axis, row.row) for row in self.table.itertuples()}
+
+    def __repr__(self):
+        return "{}({:d} location parts, categories {})".format(type(self).__name__, len(self.keys), self.categories)
+
+    def nbytes(self):
+        return sum(t.nbytes for t in self.axes) + sum(v.nbytes for v in self.arrays) + sum(m.nbytes for m in self.masks.values())
+
+    def _locate(self, gw_loc, cat):
+        try:
+            return self._index[(*gw_loc, cat)]
+        except KeyError:
+            raise Exception("Error: There is no '{}' data for the location part {}!".format(cat, gw_loc))
+
+    def _select(self, gw_loc, cat, dropna:bool=False):
+        # the array position and the mask of the selected entries (None: all)
+        axis, row = self._locate(gw_loc, cat)
+        mask = self.masks.get((*gw_loc, cat))
+        if dropna:
+            # missing entries hold NaN as well
+            valid = ~np.isnan(self.arrays[axis][row])
+            mask = None if valid.all() else valid
+        return axis, row, mask
+
+    def is_aligned(self, cat:str="BP"):
+        ''' Is there a value of the category for every GW entry? '''
+        if cat not in self.categories:
+            return False
+        row = self.categories.index(cat)
+        return all(not np.isnan(values[row]).any() for values in self.arrays)
+
+    def mask(self, gw_loc, cat):
+        ''' The GW entries with an entry of the category or None (all) '''
+        return self._select(gw_loc, cat)[2]
+
+    def row(self, gw_loc, cat):
+        ''' The values of the category at all entries of the GW time axis (NaN where missing) '''
+        axis, row = self._locate(gw_loc, cat)
+        return self.arrays[axis][row]
+
+    def values(self, gw_loc, cat, dropna:bool=False):
+        ''' The values of the category at the GW time axis (a view if no entries are excluded) '''
+        axis, row, mask = self._select(gw_loc, cat, dropna)
+        return self.arrays[axis][row] if mask is None else self.arrays[axis][row][mask]
+
+    def times(self, gw_loc, cat="GW", dropna:bool=False):
+        ''' The int64 times (ns, UTC) of the entries of the category '''
+        axis, row, mask = self._select(gw_loc, cat, dropna)
+        return self.axes[axis] if mask is None else self.axes[axis][mask]
+
+    def datetime(self, gw_loc, cat="GW", dropna:bool=False):
+        ''' The datetime (UTC) of the entries of the category as a Series '''
+        return pd.Series(pd.to_datetime(self.times(gw_loc, cat, dropna), utc=True), name="datetime")
+
+    def to_zero(self, gw_loc, cat="GW", dropna:bool=False):
+        ''' The time in days since the first entry (see Time.to_zero) '''
+        t = self.times(gw_loc, cat, dropna)
+        return (t - t[0]) / 10**9 / (60*60*24)
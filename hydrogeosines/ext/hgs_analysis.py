@@ -8,9 +8,11 @@ import os,sys
 import pandas as pd
 import numpy as np
 from scipy.optimize import curve_fit, least_squares
-from scipy.linalg import svdvals
+from scipy.linalg import svdvals, qr, solve_triangular, cho_factor, cho_solve, eigvalsh
+from scipy.fft import rfft, irfft, next_fast_len
 from scipy.stats import linregress
 from scipy.signal import csd
+from scipy.special import kelvin
 from mpmath import ker, kei, power, sqrt
 
 from IPython.core.display import display, HTML, Markdown
@@ -30,14 +32,384 @@ def quantise(data, step):
     ''' Quantization of a signal '''
     return step*np.floor((data/step)+1/2)
 
+def lsq_qr(Z, y):
+    '''
+    Direct linear least squares solution of Z @ c = y using one QR factorization.
+
+    Parameters
+    ----------
+    Z : N x M numpy array
+        The design matrix.
+    y : N x 1 numpy array
+        The observations.
+
+    Returns
+    -------
+    c : M x 1 numpy array
+        The least squares coefficients.
+    covar : M x M numpy array
+        The coefficient covariance, scaled by the residual variance as in scipy's curve_fit.
+    condnum : float
+        The condition number of Z, i.e. the ratio of largest and smallest singular value.
+    '''
+    n, m = Z.shape
+    Q, R = qr(Z, mode='economic', overwrite_a=False, check_finite=False)
+    c = solve_triangular(R, Q.T @ y)
+    del Q
+    res = y - Z @ c
+    # the singular values of R are those of Z
+    sgl = svdvals(R)
+    # inv(Z.T @ Z) = inv(R) @ inv(R).T
+    Rinv = solve_triangular(R, np.eye(m))
+    covar = (Rinv @ Rinv.T) * ((res @ res) / (n - m))
+    return c, covar, np.max(sgl) / np.min(sgl)
+
+def lsq_cholesky(blocks, y):
+    '''
+    Direct linear least squares solution of Z @ c = y from the normal equations (Cholesky factorization).
+
+    Parameters
+    ----------
+    blocks : list
+        The column blocks of Z, each either an N x K numpy array or a Lag_operator.
+        Lagged blocks are never materialized.
+    y : N x 1 numpy array
+        The observations.
+
+    Returns
+    -------
+    c : M x 1 numpy array
+        The least squares coefficients.
+    covar : M x M numpy array
+        The coefficient covariance, scaled by the residual variance as in scipy's curve_fit.
+    condnum : float
+        The condition number of Z, calculated from the eigenvalues of Z.T @ Z.
+    '''
+    n = len(y)
+    blocks = [b if isinstance(b, Lag_operator) else np.asarray(b, dtype=float).reshape(n, -1) for b in blocks]
+    sizes = [b.shape[1] for b in blocks]
+    edges = np.concatenate(([0], np.cumsum(sizes)))
+    m = edges[-1]
+    # assemble the normal equations block by block
+    ZtZ = np.empty((m, m))
+    Zty = np.empty(m)
+    for i, A in enumerate(blocks):
+        rows = slice(edges[i], edges[i+1])
+        Zty[rows] = A.rmatvec(y) if isinstance(A, Lag_operator) else A.T @ y
+        for j in range(i, len(blocks)):
+            B = blocks[j]
+            cols = slice(edges[j], edges[j+1])
+            if isinstance(A, Lag_operator):
+                AtB = A.gram(B) if isinstance(B, Lag_operator) else A.rmatvec(B)
+            elif isinstance(B, Lag_operator):
+                AtB = B.rmatvec(A).T
+            else:
+                AtB = A.T @ B
+            ZtZ[rows, cols] = AtB
+            ZtZ[cols, rows] = AtB.T
+    # scale the columns to improve the numerical conditioning of the factorization
+    scale = 1/np.sqrt(np.diagonal(ZtZ))
+    cho = cho_factor(ZtZ*np.outer(scale, scale))
+    c = cho_solve(cho, Zty*scale)*scale
+    res = y - blocks_matvec(blocks, c)
+    covar = cho_solve(cho, np.diag(scale))*scale[:, None] * ((res @ res) / (n - m))
+    eig = eigvalsh(ZtZ)
+    return c, covar, np.sqrt(np.max(eig) / np.min(eig)) if (np.min(eig) > 0) else np.inf
+
+def blocks_matvec(blocks, c):
+    ''' Product of a block matrix (numpy arrays and Lag_operators) with a vector '''
+    out, i = 0., 0
+    for b in blocks:
+        k = b.shape[1] if (np.ndim(b) > 1) or isinstance(b, Lag_operator) else 1
+        out = out + (b.matvec(c[i:i+k]) if isinstance(b, Lag_operator) else np.reshape(b, (len(b), -1)) @ c[i:i+k])
+        i += k
+    return out
+
+def correlate_fft(a, b, maxlag:int):
+    ''' Linear correlation sum_k a[k]*b[k+d] for lags d = 0 ... maxlag, using zero-padded real FFTs '''
+    N = next_fast_len(len(a) + maxlag + 1, real=True)
+    fa = rfft(a, N, axis=0)
+    # broadcast a single series against the columns of b
+    fa = fa.reshape(fa.shape + (1,)*(np.ndim(b) - np.ndim(a)))
+    return irfft(np.conj(fa) * rfft(b, N, axis=0), N, axis=0)[:maxlag+1]
+
+class Lag_operator(object):
+    """
+    The lagged regression matrix V[t, i] = x[t-i] (zero for t < i) with lags i = 0 ... nlag.
+
+    Only the generating series is stored, i.e. memory is O(N). Products with V and the normal
+    equations V.T @ V are calculated from correlation sums (FFT) and the Toeplitz structure of V.
+    """
+    def __init__(self, x, nlag:int):
+        self.x = np.asarray(x, dtype=float)
+        self.nlag = int(nlag)
+        self.shape = (len(self.x), self.nlag + 1)
+
+    def dense(self):
+        ''' The materialized N x (nlag+1) matrix '''
+        return self.rows(0, self.shape[0])
+
+    def rows(self, start:int, stop:int):
+        ''' The materialized rows start ... stop-1, in O((stop - start)*nlag) '''
+        if (stop <= start):
+            return np.zeros((0, self.nlag + 1))
+        # x[start-nlag ... stop-1], zero-padded before the start of the record
+        lo = max(start - self.nlag, 0)
+        xp = np.concatenate((np.zeros(lo - (start - self.nlag)), self.x[lo:stop]))
+        return np.lib.stride_tricks.sliding_window_view(xp, self.nlag + 1)[:, ::-1].copy()
+
+    def matvec(self, c):
+        ''' V @ c, a truncated convolution '''
+        n = self.shape[0]
+        N = next_fast_len(n + len(c), real=True)
+        return irfft(rfft(self.x, N) * rfft(c, N), N)[:n]
+
+    def rmatvec(self, y):
+        ''' V.T @ y for an N x 1 or N x K array y '''
+        return correlate_fft(self.x, y, self.nlag)
+
+    def gram(self, other):
+        ''' V.T @ W for two lag operators of the same length '''
+        a, b = self.x, other.x
+        n = len(a)
+        L = max(self.nlag, other.nlag)
+        # correlation sums over the full overlap: C_ab[d] = sum_k a[k]*b[k+d]
+        C_ab = correlate_fft(a, b, L)
+        C_ba = correlate_fft(b, a, L)
+        # sums of the last m products, which fall outside the truncated columns
+        d = np.arange(L + 1)[:, None]
+        k = n - 1 - d - np.arange(L)[None, :]
+        valid = (k >= 0)
+        k = np.where(valid, k, 0)
+        S_ab = np.hstack((np.zeros((L + 1, 1)), np.cumsum(np.where(valid, a[k]*b[np.minimum(k + d, n - 1)], 0.), axis=1)))
+        S_ba = np.hstack((np.zeros((L + 1, 1)), np.cumsum(np.where(valid, b[k]*a[np.minimum(k + d, n - 1)], 0.), axis=1)))
+        # G[i, j] = sum_{t >= max(i,j)} a[t-i]*b[t-j]
+        i = np.arange(self.nlag + 1)[:, None]
+        j = np.arange(other.nlag + 1)[None, :]
+        lag = np.abs(j - i)
+        return np.where(j >= i, C_ba[lag] - S_ba[lag, np.minimum(i, L)], C_ab[lag] - S_ab[lag, np.minimum(j, L)])
+
+def cumsum_var(covar):
+    '''
+    Variance of the cumulative sums of coefficients with covariance matrix covar.
+
+    Parameters
+    ----------
+    covar : M x M numpy array
+        The (symmetric) coefficient covariance.
+
+    Returns
+    -------
+    cvar : M x 1 numpy array
+        Element i is the sum of covar[0:i+1, 0:i+1], accumulated as prefix sums over the rows.
+        The summation order differs from summing every submatrix, i.e. the results agree to
+        rounding, not bit for bit.
+    '''
+    # each row adds its diagonal entry and twice its lower triangle
+    rows = np.diagonal(covar) + 2*np.sum(np.tril(covar, -1), axis=1)
+    return np.cumsum(rows)
+
+class Harmonic_rls(object):
+    """
+    Online harmonic least squares (HALS) by recursive least squares (RLS).
+
+    The model is the one solved by Freq_domain.harmonic_lsqr, a cosine and sine term for every
+    frequency and a DC offset. Each new sample updates the coefficients and their inverse
+    information matrix P in O(M^2) for M = 2*len(freqs) + 1 parameters. A forgetting factor
+    below 1 exponentially discounts old samples (an effective memory of 1/(1 - forgetting) samples).
+    """
+    def __init__(self, freqs, t0:float=0, forgetting:float=1.0, delta:float=1e6):
+        if not (0 < forgetting <= 1):
+            raise Exception("Error: The forgetting factor must be in the interval (0, 1]!")
+        self.freqs = np.array(freqs, dtype=float)
+        self.t0 = float(t0)
+        self.forgetting = float(forgetting)
+        M = 2*len(self.freqs) + 1
+        self.theta = np.zeros(M)
+        # a large initial P for an uninformed estimator
+        self.P = np.eye(M)*delta
+        self.sse = 0.
+        self.n = 0.
+        self.t_last = None
+
+    def design(self, tf):
+        ''' The rows of the HALS matrix Phi for the time float tf '''
+        tau = np.outer(np.atleast_1d(np.asarray(tf, dtype=float)) - self.t0, 2*np.pi*self.freqs)
+        Phi = np.empty((tau.shape[0], 2*len(self.freqs) + 1))
+        Phi[:,0:-1:2] = np.cos(tau)
+        Phi[:,1:-1:2] = np.sin(tau)
+        Phi[:,-1] = 1
+        return Phi
+
+    @classmethod
+    def from_batch(cls, tf, data, freqs, forgetting:float=1.0):
+        '''
+        Seed the estimator from a batch fit of the samples (tf, data).
+        The time origin is the first valid sample, as in Processing.hals (Time.to_zero), i.e. the
+        phases agree with a batch fit of harmonic_lsqr to tf - tf[0].
+        '''
+        tf = np.asarray(tf, dtype=float)
+        data = np.asarray(data, dtype=float)
+        valid = ~np.isnan(data)
+        tf, data = tf[valid], data[valid]
+        self = cls(freqs, t0=tf[0], forgetting=forgetting)
+        # older samples are discounted, the last sample has weight 1
+        w = np.sqrt(self.forgetting**np.arange(len(tf))[::-1])
+        Phi = self.design(tf)
+        Q, R = qr(Phi*w[:,np.newaxis], mode='economic', check_finite=False)
+        self.theta = solve_triangular(R, Q.T @ (data*w))
+        Rinv = solve_triangular(R, np.eye(R.shape[0]))
+        self.P = Rinv @ Rinv.T
+        self.sse = np.sum((w*(data - Phi @ self.theta))**2)
+        self.n = np.sum(w**2)
+        self.t_last = tf[-1]
+        return self
+
+    def update(self, tf, data):
+        '''
+        Add new samples (time float and value) in the order of arrival.
+        NaN values are skipped.
+        '''
+        lam = self.forgetting
+        tf = np.atleast_1d(np.asarray(tf, dtype=float))
+        data = np.atleast_1d(np.asarray(data, dtype=float))
+        for t, phi, y in zip(tf, self.design(tf), data):
+            if np.isnan(y):
+                continue
+            Pphi = self.P @ phi
+            k = Pphi / (lam + phi @ Pphi)
+            error = y - phi @ self.theta
+            self.theta = self.theta + k*error
+            self.P = (self.P - np.outer(k, Pphi)) / lam
+            # keep P symmetric
+            self.P = (self.P + self.P.T) / 2
+            # a posteriori residual
+            self.sse = lam*self.sse + error*(y - phi @ self.theta)
+            self.n = lam*self.n + 1
+            self.t_last = t
+        return self
+
+    @property
+    def complex(self):
+        return self.theta[:-1:2]*1j + self.theta[1:-1:2]
+
+    @property
+    def offset(self):
+        return self.theta[-1]
+
+    @property
+    def error_var(self):
+        return self.sse / self.n if (self.n > 0) else np.nan
+
+    def predict(self, tf):
+        return self.design(tf) @ self.theta
+
+    def results(self):
+        ''' The current estimate in the format of harmonic_lsqr and utils.complex_to_real '''
+        results = utils.complex_to_real(None, self.complex)
+        results.update({'freq': self.freqs.copy(), 'complex': self.complex, 'error_var': self.error_var, 'offset': self.offset})
+        return results
+
+def dft_bins(x, k):
+    '''
+    Selected bins of the discrete Fourier transform, X[k] = sum_n x[n]*exp(-2j*pi*k*n/N).
+
+    Equal to np.fft.fft(x)[k], but in O(N) time and memory per bin: the samples are split into
+    blocks of about sqrt(N) samples and the complex exponential is factorized into a phase per
+    block and a phase per sample within the block.
+    '''
+    x = np.asarray(x, dtype=float)
+    k = np.atleast_1d(np.asarray(k, dtype=np.int64))
+    N = len(x)
+    L = int(np.ceil(np.sqrt(N)))
+    B = -(-N // L)
+    xb = np.zeros(B*L)
+    xb[:N] = x
+    # exact phases from integer products modulo N
+    inner = np.exp(-2j*np.pi*((k[:,np.newaxis]*np.arange(L)) % N)/N)
+    outer = np.exp(-2j*np.pi*((k[:,np.newaxis]*(np.arange(B)*L)) % N)/N)
+    return np.einsum('kb,kb->k', outer, inner @ xb.reshape(B, L).T)
+
+def kelvin_ratio(alpha_w):
+    '''
+    R = K0(z)/(z*K1(z)) for z = alpha_w*exp(i*pi/4) and its derivative dR/dalpha_w.
+
+    Uses the double-precision Kelvin functions ker + i*kei = K0(z) of scipy and, where these
+    underflow, the asymptotic expansion for large arguments.
+    '''
+    alpha_w = np.asarray(alpha_w, dtype=float)
+    rot = np.exp(1j*np.pi/4)
+    z = alpha_w*rot
+    Ke, Kep = kelvin(alpha_w)[1::2]
+    # K1(z) from the derivative of ker + i*kei
+    K1 = -Kep/rot
+    with np.errstate(all='ignore'):
+        R = Ke / (z*K1)
+        # asymptotic expansion of K0(z)/K1(z) for large arguments
+        R = np.where(np.isfinite(R) & (np.abs(K1) > 0), R, (1 - 1/(2*z) + 3/(8*z**2)) / z)
+    # dR/dalpha_w from R'(z) = z*R^2 - 1/z
+    dR = (z*R**2 - 1/z)*rot
+    if (R.ndim == 0):
+        return R[()], dR[()]
+    return R, dR
+
+def hflow_response(K, S_s, r_w, r_c, b, f, jac:bool=False):
+    '''
+    Amplitude ratio and phase shift of the horizontal flow model by Hsieh et al. (1987).
+
+    Uses the double-precision Kelvin functions ker + i*kei = K0(z) of scipy, z = alpha_w*exp(i*pi/4).
+    The model is W = E + iF = 1 + i*c*K0(z)/(z*K1(z)) with c = omega*r_c^2/(2*T), Ar = 1/|W| and
+    dPhi = -arctan(F/E). With jac=True, the derivatives of Ar and dPhi with respect to K and S_s
+    are returned as well (2 x 2 array, rows Ar and dPhi).
+    '''
+    omega = 2*np.pi*f
+    tmp = omega*S_s / K
+    # prevent errors from negative square roots
+    if (tmp < 0) or (K == 0):
+        if jac:
+            return np.Inf, np.Inf, np.zeros((2, 2))
+        return np.Inf, np.Inf
+    c = omega*r_c**2 / (2*K*b)
+    alpha_w = r_w*np.sqrt(tmp)
+    R, dR = kelvin_ratio(alpha_w)
+    W = 1 + 1j*c*R
+    E, F = W.real, W.imag
+    Ar = np.abs(W)**(-1)
+    dPhi = -np.arctan(F/E)
+    if not jac:
+        return Ar, dPhi
+    dW = np.array([1j*(-c/K)*R + 1j*c*dR*(-alpha_w/(2*K)), 1j*c*dR*(alpha_w/(2*S_s))])
+    dAr = -np.abs(W)**(-3)*np.real(np.conj(W)*dW)
+    ddPhi = -(E*dW.imag - F*dW.real) / (E**2 + F**2)
+    return Ar, dPhi, np.array([dAr, ddPhi])
+
+def check_engine(engine, valid=("numpy", "loop")):
+    ''' Validate the computational engine of a method '''
+    if engine not in valid:
+        raise Exception("Error: Engine '{}' is not available! Use one of {}.".format(engine, valid))
+    return engine
+
+def by_column(func, X, Y, **kwargs):
+    ''' Apply a method to every column of an N x M array Y, sharing the N x 1 array X '''
+    return np.array([func(X, y, **kwargs) for y in np.asarray(Y).T])
+
+def as_rows(Y):
+    ''' Return a 1D or N x M array as contiguous M x N float rows '''
+    return np.ascontiguousarray(np.atleast_2d(np.asarray(Y, dtype=float).T))
+
 #%% Static Class for TIME DOMAIN METHODS ######################################
 class Time_domain(object):
+    # solver 'auto' of regress_deconv: the largest dense regression matrix (entries) solved by QR
+    # and the largest condition number solved from the normal equations instead
+    DENSE_MAX = 2**22
+    COND_MAX  = 1e5
+
     def __init__(self, GW, BP):
         self.BP = BP
         self.GW = GW
         
     @staticmethod
-    def BE_average_of_ratios(X, Y):
+    def BE_average_of_ratios(X, Y, engine:str="numpy"):
         '''
         Calculate instantaneous barometric efficiency using the average of ratios method, a time domain solution.
 
@@ -45,8 +417,10 @@ class Time_domain(object):
         ----------
         X : N x 1 numpy array
             barometric pressure data,  provided as either measured values or as temporal derivatives.
-        Y : N x 1 numpy array
-            groundwater pressure data, provided as either measured values or as temporal derivatives.
+        Y : N x 1 or N x M numpy array
+            groundwater pressure data, provided as either measured values or as temporal derivatives. Columns of an N x M array are evaluated at once.
+        engine : str, optional
+            'numpy' (vectorized) or 'loop' (sample-by-sample reference). The default is 'numpy'.
 
         Returns
         -------
@@ -61,11 +435,19 @@ class Time_domain(object):
         #with np.errstate(divide='ignore', invalid='ignore'):
         #    result = np.mean(np.divide(Y, X)[np.isfinite(np.divide(Y, X))])
         X,Y = np.round(X, 12), np.round(Y, 12)
-        result = []
-        for x,y in zip(X,Y):
-            if x!=0.:
-                result.append(y/x)
-        return np.mean(result)
+        if check_engine(engine) == "loop":
+            if np.ndim(Y) > 1:
+                return by_column(Time_domain.BE_average_of_ratios, X, Y, engine=engine)
+            result = []
+            for x,y in zip(X,Y):
+                if x!=0.:
+                    result.append(y/x)
+            return np.mean(result)
+        
+        idx = (X != 0.)
+        # row-wise means keep numpy's pairwise summation of the 1D case
+        result = np.array([np.mean(r) for r in (as_rows(Y)[:, idx]/X[idx])])
+        return result if (np.ndim(Y) > 1) else result[0]
 
     @staticmethod
     def BE_median_of_ratios(X, Y):
@@ -79,6 +461,8 @@ class Time_domain(object):
         Outputs:
             result - scalar. Instantaneous barometric efficiency calculated as the median ratio of measured values or temporal derivatives.
         '''
+        if np.ndim(Y) > 1:
+            return by_column(Time_domain.BE_median_of_ratios, X, Y)
         with np.errstate(divide='ignore', invalid='ignore'):
             result = np.median(np.divide(Y, X)[np.isfinite(np.divide(Y, X))])
         return result
@@ -100,11 +484,13 @@ class Time_domain(object):
         result : scalar
             Instantaneous barometric efficiency calculated as a linear regression based on measured values or temporal derivatives.
         '''
+        if np.ndim(Y) > 1:
+            return by_column(Time_domain.BE_linear_regression, X, Y)
         result = linregress(Y, X)[0]
         return result
 
     @staticmethod
-    def BE_Clark(X, Y):
+    def BE_Clark(X, Y, engine:str="numpy"):
         '''
         Calculate instantaneous barometric efficiency using the Clark (1967) method, a time domain solution.
 
@@ -112,8 +498,10 @@ class Time_domain(object):
         ----------
         X : N x 1 numpy array
             barometric pressure data,  provided as either measured values or as temporal derivatives.
-        Y : N x 1 numpy array
-            groundwater pressure data, provided as either measured values or as temporal derivatives.
+        Y : N x 1 or N x M numpy array
+            groundwater pressure data, provided as either measured values or as temporal derivatives. Columns of an N x M array are evaluated at once.
+        engine : str, optional
+            'numpy' (vectorized) or 'loop' (sample-by-sample reference). The default is 'numpy'.
 
         Returns
         -------
@@ -124,20 +512,31 @@ class Time_domain(object):
         -----
             ** Need to check that Clark's rules are implemented the right way around
         '''
-        sX, sY = [0.], [0.]
-        for x,y in zip(X, Y):
-            sX.append(sX[-1]+abs(x))
-            if x==0:
-                sY.append(sY[-1])
-            elif np.sign(x)==np.sign(y):
-                sY.append(sY[-1]+abs(y))
-            elif np.sign(x)!=np.sign(y):
-                sY.append(sY[-1]-abs(y))
-        result = linregress(sX, sY)[0]
-        return result
+        if check_engine(engine) == "loop":
+            if np.ndim(Y) > 1:
+                return by_column(Time_domain.BE_Clark, X, Y, engine=engine)
+            sX, sY = [0.], [0.]
+            for x,y in zip(X, Y):
+                sX.append(sX[-1]+abs(x))
+                if x==0:
+                    sY.append(sY[-1])
+                elif np.sign(x)==np.sign(y):
+                    sY.append(sY[-1]+abs(y))
+                elif np.sign(x)!=np.sign(y):
+                    sY.append(sY[-1]-abs(y))
+            result = linregress(sX, sY)[0]
+            return result
+
+        X, Yr = np.asarray(X, dtype=float), as_rows(Y)
+        # the cumulative sums are sequential, i.e. identical to the loop
+        dY = np.where(X == 0, 0., np.where(np.sign(X) == np.sign(Yr), np.abs(Yr), -np.abs(Yr)))
+        sX = np.concatenate(([0.], np.cumsum(np.abs(X))))
+        sY = np.hstack((np.zeros((len(Yr), 1)), np.cumsum(dY, axis=-1)))
+        result = np.array([linregress(sX, sy)[0] for sy in sY])
+        return result if (np.ndim(Y) > 1) else result[0]
 
     @staticmethod
-    def BE_Davis_and_Rasmussen(X, Y):
+    def BE_Davis_and_Rasmussen(X, Y, engine:str="numpy"):
         '''
         Calculate instantaneous barometric efficiency using the Davis and Rasmussen (1993) method, a time domain solution.
 
@@ -145,8 +544,10 @@ class Time_domain(object):
         ----------
         X : N x 1 numpy array
             barometric pressure data,  provided as either measured values or as temporal derivatives.
-        Y : N x 1 numpy array
-            groundwater pressure data, provided as either measured values or as temporal derivatives.
+        Y : N x 1 or N x M numpy array
+            groundwater pressure data, provided as either measured values or as temporal derivatives. Columns of an N x M array are evaluated at once.
+        engine : str, optional
+            'numpy' (vectorized) or 'loop' (sample-by-sample reference). The default is 'numpy'.
 
         Returns
         -------
@@ -157,6 +558,11 @@ class Time_domain(object):
         -----
             ** Work in progress - just need to marry the D&R algorithm with the automated segmenting algorithm
         '''
+        batch = (np.ndim(Y) > 1)
+        if (check_engine(engine) == "loop") and batch:
+            return by_column(Time_domain.BE_Davis_and_Rasmussen, X, Y, engine=engine)
+        if (engine == "numpy"):
+            Y = as_rows(Y)
         cSnum    = np.zeros(1)
         cSden    = np.zeros(1)
         cSabs_dB = np.zeros(1)
@@ -167,22 +573,27 @@ class Time_domain(object):
         Sraw_dB  =  np.sum(dB)
         Sabs_dB  =  np.sum(np.abs(dB))
         dW       =  np.diff(Y)
-        Sraw_dW  =  np.sum(dW)
+        Sraw_dW  =  np.sum(dW, axis=-1)
         Sclk_dW  = np.zeros(1)
-        for m in range(len(dW)):
-            if np.sign(dW[m])==np.sign(dB[m]):
-                Sclk_dW += np.abs(dW[m])
-            elif np.sign(dW[m])!=np.sign(dB[m]):
-                Sclk_dW -= np.abs(dW[m])
-        cSnum    += (float(j)/float(n))*Sraw_dW
+        if (engine == "loop"):
+            for m in range(len(dW)):
+                if np.sign(dW[m])==np.sign(dB[m]):
+                    Sclk_dW += np.abs(dW[m])
+                elif np.sign(dW[m])!=np.sign(dB[m]):
+                    Sclk_dW -= np.abs(dW[m])
+        else:
+            # the last cumulative sum is the sequential sum of the loop
+            dW = np.hstack((np.zeros((len(dW), 1)), np.where(np.sign(dW) == np.sign(dB), np.abs(dW), -np.abs(dW))))
+            Sclk_dW = Sclk_dW + np.cumsum(dW, axis=-1)[:, -1]
+        cSnum    = cSnum + (float(j)/float(n))*Sraw_dW
         cSden    += (float(j)/float(n))*Sraw_dB
         cSabs_dB += Sabs_dB
-        cSclk_dW += Sclk_dW
-        result = float((cSclk_dW/cSabs_dB-cSnum/cSabs_dB)/(1.-cSden/cSabs_dB))
-        return result
+        cSclk_dW = cSclk_dW + Sclk_dW
+        result = (cSclk_dW/cSabs_dB-cSnum/cSabs_dB)/(1.-cSden/cSabs_dB)
+        return result if batch else float(result[0])
 
     @staticmethod
-    def BE_Rahi(X, Y):
+    def BE_Rahi(X, Y, engine:str="numpy"):
         '''
         Calculate instantaneous barometric efficiency using the Clark (1967) method, a time domain solution.
 
@@ -190,8 +601,10 @@ class Time_domain(object):
         ----------
         X : N x 1 numpy array
             barometric pressure data,  provided as either measured values or as temporal derivatives.
-        Y : N x 1 numpy array
-            groundwater pressure data, provided as either measured values or as temporal derivatives.
+        Y : N x 1 or N x M numpy array
+            groundwater pressure data, provided as either measured values or as temporal derivatives. Columns of an N x M array are evaluated at once.
+        engine : str, optional
+            'numpy' (vectorized) or 'loop' (sample-by-sample reference). The default is 'numpy'.
 
         Returns
         -------
@@ -202,16 +615,27 @@ class Time_domain(object):
         -----
             ** Need to check that Rahi's rules are implemented the right way around.
         '''
-        sX, sY = [0.], [0.]
-        for x,y in zip(X, Y):
-            if (np.sign(x)!=np.sign(y)) & (abs(y)<abs(x)):
-                sX.append(sX[-1]+abs(x))
-                sY.append(sY[-1]+abs(y))
-            else:
-                sX.append(sX[-1])
-                sY.append(sY[-1])
-        result = linregress(sX, sY)[0]
-        return result
+        if check_engine(engine) == "loop":
+            if np.ndim(Y) > 1:
+                return by_column(Time_domain.BE_Rahi, X, Y, engine=engine)
+            sX, sY = [0.], [0.]
+            for x,y in zip(X, Y):
+                if (np.sign(x)!=np.sign(y)) & (abs(y)<abs(x)):
+                    sX.append(sX[-1]+abs(x))
+                    sY.append(sY[-1]+abs(y))
+                else:
+                    sX.append(sX[-1])
+                    sY.append(sY[-1])
+            result = linregress(sX, sY)[0]
+            return result
+
+        X, Yr = np.asarray(X, dtype=float), as_rows(Y)
+        idx = (np.sign(X) != np.sign(Yr)) & (np.abs(Yr) < np.abs(X))
+        zero = np.zeros((len(Yr), 1))
+        sX = np.hstack((zero, np.cumsum(np.where(idx, np.abs(X), 0.), axis=-1)))
+        sY = np.hstack((zero, np.cumsum(np.where(idx, np.abs(Yr), 0.), axis=-1)))
+        result = np.array([linregress(sx, sy)[0] for sx, sy in zip(sX, sY)])
+        return result if (np.ndim(Y) > 1) else result[0]
 
     @staticmethod
     def BE_Rojstaczer(X, Y, fs:float = 1.0, nperseg:int = None, noverlap:int = None):
@@ -238,6 +662,8 @@ class Time_domain(object):
         -----
             ** Need to check that Rojstaczer's (or Q&R's) implementation was averaged over all frequencies
         '''
+        if np.ndim(Y) > 1:
+            return by_column(Time_domain.BE_Rojstaczer, X, Y, fs=fs, nperseg=nperseg, noverlap=noverlap)
         # TODO: This methods also takes fs, nperseg + noverlap as parameters. Can only be used in overarching BE_method with default values. Can fs (sampling frequency) be calculated from GW data?    
         csd_f, csd_p = csd(X, Y, fs=fs, nperseg=nperseg, noverlap=noverlap) #, scaling='density', detrend=False)
         psd_f, psd_p = csd(X, X, fs=fs, nperseg=nperseg, noverlap=noverlap) #, scaling='density', detrend=False)
@@ -245,8 +671,19 @@ class Time_domain(object):
         return result
     
     @staticmethod
-    def regress_deconv(tf, GW, BP, ET=None, lag_h=24, et_method=None, fqs=None):
+    def regress_deconv(tf, GW, BP, ET=None, lag_h=24, et_method=None, fqs=None, solver:str="auto"):
+        '''
+        Regression deconvolution of the barometric (and Earth tide) response.
+
+        The solver 'qr' factorizes the dense regression matrix, 'cholesky' solves the normal
+        equations assembled from the lag operators without materializing the lagged matrices and
+        'curve_fit' is the iterative reference. The default 'auto' uses 'qr' up to DENSE_MAX
+        matrix entries and 'cholesky' above, unless the condition number of the normal equations
+        exceeds COND_MAX (then 'qr').
+        '''
         print('>> Applying regression deconvolution ...')
+        if solver not in ("auto", "qr", "cholesky", "curve_fit"):
+            raise Exception("Error: Solver '{}' is not available!".format(solver))
             
         if fqs is None:
             fqs = np.array(list(const.const['_etfqs'].values()))
@@ -273,17 +710,13 @@ class Time_domain(object):
         lags = list(range(nlag+1))
         nm = nlag+1
         # the regression matrix for barometric pressure
-        V = np.zeros([n, nm])
+        V = Lag_operator(-dBP, lags[-1])
         NP = 0
-        for i in range(nm):
-            j = lags[i]
-            k = np.arange(n-j)
-            V[j+k, i] = -dBP[k]
             
         #%% consider ET method
         if et_method == None:
             print('>> Not considering Earth tide influences ...')
-            X = np.hstack([V])
+            X = [V]
             
         # HALS: harmonic least squares
         elif et_method == 'hals':
@@ -299,7 +732,7 @@ class Time_domain(object):
                 tau = omega[i]*t[nn]
                 u1[:,i] = np.cos(tau)
                 u2[:,i] = np.sin(tau)
-            X = np.hstack([V, u1, u2])
+            X = [V, u1, u2]
             
         # ts: time series
         elif et_method == 'ts':
@@ -311,32 +744,48 @@ class Time_domain(object):
             lag = range(int((lag_h/24)*spd) + 1)
             print('>> Using Earth tide time series in the regression ...')
             nm = len(lag)
-            W = np.zeros([n, nm])
-            for i in range(nm):
-                j = lag[i]
-                k = np.arange(n-j)
-                ### need negative?
-                W[j+k, i] = dET[k]
-            X = np.hstack([V, W])
+            ### need negative?
+            W = Lag_operator(dET, lag[-1])
+            X = [V, W]
             
         else:
             raise Exception("Error: Earth tide method '{}' is not recognised!".format(et_method)) 
         
         #%% perform least squares fitting
-        # prepare matrix ...
-        Z = np.hstack([np.ones([n,1]), X])
+        auto = (solver == "auto")
+        if auto:
+            # the dense matrix of long lags on long records does not fit into memory
+            size = n*(1 + sum(x.shape[1] for x in X))
+            solver = "qr" if (size <= Time_domain.DENSE_MAX) else "cholesky"
+        if solver == "cholesky":
+            # normal equations from the lag operators, the lagged matrices are never materialized
+            c, covar, condnum = lsq_cholesky([np.ones(n)] + X, dWL)
+            if auto and (condnum > Time_domain.COND_MAX):
+                # the normal equations square the condition number
+                print('>> Ill-conditioned normal equations (condition number {:.2e}), using QR ...'.format(condnum))
+                solver = "qr"
+            else:
+                Xc = blocks_matvec(X, c[1:])
+        if solver != "cholesky":
+            # prepare matrix ...
+            X = np.hstack([x.dense() if isinstance(x, Lag_operator) else x for x in X])
+            Z = np.hstack([np.ones([n,1]), X])
         # perform regression ...
         # ----------------------------------------------
         # c  = np.linalg.lstsq(Z, dWL, rcond=None)[0]
         # ----------------------------------------------            
-        c = 0.5*np.ones(Z.shape[1])
-        c, covar = curve_fit(brf_total(Z), t, dWL, p0=c)
-        
-        #%% compute the singular values
-        sgl = svdvals(Z)
+        if solver == "qr":
+            # the problem is linear: solve it directly
+            c, covar, condnum = lsq_qr(Z, dWL)
+        elif solver == "curve_fit":
+            # iterative reference solution
+            c = 0.5*np.ones(Z.shape[1])
+            c, covar = curve_fit(brf_total(Z), t, dWL, p0=c)
+            #%% compute the singular values
+            sgl = svdvals(Z)
+            condnum = np.max(sgl) / np.min(sgl)
         # 'singular value' is important: 1 is perfect,
         # larger than 10^5 or 10^6 there's a problem
-        condnum = np.max(sgl) / np.min(sgl)
         # print('>> Conditioning number: {:,.0f}'.format(condnum))
         if (condnum > 1e6):
             raise Warning('The solution is ill-conditioned (condition number {}!'.format(condnum))
@@ -344,7 +793,9 @@ class Time_domain(object):
         # ----------------------------------------------
         nc = len(c)
         # calculate the head corrections
-        dWLc = np.cumsum(np.dot(X, c[1:nc]))
+        if solver != "cholesky":
+            Xc = np.dot(X, c[1:nc])
+        dWLc = np.cumsum(Xc)
         # deal with the missing values
         WLc = GW - np.concatenate([[0], dWLc])
         # set the corrected heads
@@ -353,6 +804,38 @@ class Time_domain(object):
         # adjust for mean offset
         # trend  = c[0]
         lag_t = np.linspace(0, lag_h, int((lag_h/24)*spd) + 1, endpoint=True)
+        params = Time_domain.deconv_params(c, covar, lag_t, NP=NP, et_method=et_method, fqs=fqs)
+        
+        # return the method results
+        return WLc, params
+
+
+    @staticmethod
+    def deconv_params(c, covar, lag_t, NP:int=0, et_method=None, fqs=None):
+        '''
+        Response functions and their error propagation from the regression deconvolution coefficients.
+
+        Parameters
+        ----------
+        c : numpy array
+            The regression coefficients (trend, BRF, and ERF or harmonic coefficients).
+        covar : numpy array
+            The coefficient covariance.
+        lag_t : numpy array
+            The lag times in hours.
+        NP : int, optional
+            The number of harmonic ET frequencies (et_method 'hals').
+        et_method : str, optional
+            The Earth tide method: None, 'hals' or 'ts'.
+        fqs : numpy array, optional
+            The harmonic ET frequencies (et_method 'hals').
+
+        Returns
+        -------
+        params : dict
+            The BRF (and ERF) results.
+        '''
+        nm = len(lag_t)
         # error propagation
         brf   = c[np.arange(1, nm+1)]
         brf_covar = covar[1:nm+1,1:nm+1]
@@ -360,13 +843,7 @@ class Time_domain(object):
         brf_stdev = np.sqrt(brf_var)
         cbrf   = np.cumsum(brf)
         # the error propagation for summation
-        cbrf_var = np.zeros(brf_var.shape)
-        for i in np.arange(0, nm):
-        #    if (i == 4): break
-            diag = np.diagonal(brf_covar[0:i+1, 0:i+1])
-            triaglow = np.tril(brf_covar[0:i+1, 0:i+1], -1)
-        #    print(covatl)
-            cbrf_var[i] = np.sum(diag) + 2*np.sum(triaglow)
+        cbrf_var = cumsum_var(brf_covar)
         cbrf_stdev = np.sqrt(cbrf_var)
         params = {'brf': {'lag': lag_t, 'irc': brf, 'irc_stdev': brf_stdev, 'brf': cbrf, 'crf_stdev': cbrf_stdev}}
         
@@ -399,23 +876,180 @@ class Time_domain(object):
             erf_stdev = np.sqrt(erf_var)
             cerf = np.cumsum(erf)
             # the error propagation for summation
-            cerf_var = np.zeros(brf_var.shape)
-            for i in np.arange(0, nm):
-            #    if (i == 4): break
-                diag = np.diagonal(erf_covar[0:i+1, 0:i+1])
-                triaglow = np.tril(erf_covar[0:i+1, 0:i+1], -1)
-            #    print(covatl)
-                cerf_var[i] = np.sum(diag) + 2*np.sum(triaglow)
+            cerf_var = cumsum_var(erf_covar)
             cerf_stdev = np.sqrt(cerf_var)
             params.update({'erf': {'lag': lag_t, 'irc': erf, 'irc_stdev': erf_stdev, 'brf': cerf, 'crf_stdev': cerf_stdev}})  
         
-        # return the method results
-        return WLc, params
+        return params
+
+    @staticmethod
+    def regress_deconv_rolling(tf, GW, BP, ET=None, lag_h=24, et_method=None, fqs=None, window:float=30, step:float=1):
+        '''
+        Regression deconvolution on rolling windows to track a time-varying barometric response.
+
+        The normal equations are updated incrementally: the samples entering a window are added and
+        the samples leaving it are removed (rank-k up/downdates). To bound the rounding errors that
+        accumulate over a long record, they are refactorized from the samples of the window once per
+        window length (every ceil(window/step) windows), so every sample is processed about three
+        times regardless of the window overlap. The residual sum of squares is evaluated directly
+        from the residuals of each window. Lagged regressors use the full record, i.e. they are not
+        truncated at the start of a window. The normal equations square the condition number of the
+        regression matrix: for ill-conditioned windows, the coefficients are less accurate than those
+        of regress_deconv (solver 'qr').
+
+        Parameters
+        ----------
+        tf : numpy array
+            Regularly sampled time in days.
+        GW, BP : numpy array
+            Groundwater heads and barometric pressure.
+        ET : numpy array, optional
+            Earth tide time series (et_method 'ts').
+        lag_h : float, optional
+            The length of the response functions in hours.
+        et_method : str, optional
+            The Earth tide method: None, 'hals' or 'ts'.
+        fqs : numpy array, optional
+            The harmonic ET frequencies (et_method 'hals').
+        window : float, optional
+            The window length in days. The default is 30.
+        step : float, optional
+            The step between consecutive windows in days. The default is 1.
+
+        Returns
+        -------
+        tw : numpy array
+            The index into tf of the last sample of each window.
+        params : dict
+            The results in the layout of regress_deconv, with one row per window for the coefficients.
+        '''
+        print('>> Applying rolling regression deconvolution ...')
+        if fqs is None:
+            fqs = np.array(list(const.const['_etfqs'].values()))
+        # check that dataset is regularly sampled
+        tmp = np.diff(tf)
+        if (np.around(np.min(tmp), 6) != np.around(np.max(tmp), 6)):
+            raise Exception("Error: Dataset must be regularly sampled!")
+        if (len(tf) != len(GW) != len(BP)):
+            raise Exception("Error: All input arrays must have the same length!")
 
+        print(">> Reference: Method by Rasmussen and Crawford (1997) [https://doi.org/10.1111/j.1745-6584.1997.tb00111.x]")
+        
+        t  = tf
+        # samples per day
+        spd = int(np.round(1/(t[1] - t[0])))
+        # make the dataset relative
+        dBP = np.diff(BP)
+        dWL = np.diff(GW)
+        nlag = int((lag_h/24)*spd)
+        n    = len(dBP)
+        # the lagged regressors
+        L = [Lag_operator(-dBP, nlag)]
+        NP = 0
+        omega = None
+        if et_method == None:
+            print('>> Not considering Earth tide influences ...')
+        elif et_method == 'hals':
+            print('>> Using harmonic least-squares to estimate Earth tide influences ...')
+            NP = len(fqs)
+            omega = 2.*np.pi*np.asarray(fqs)
+        elif et_method == 'ts':
+            if (ET is None) or (len(tf) != len(ET)):
+                raise Exception("Error: Compliant Earth tide time series must be available!")
+            print('>> Using Earth tide time series in the regression ...')
+            L.append(Lag_operator(np.diff(ET), nlag))
+        else:
+            raise Exception("Error: Earth tide method '{}' is not recognised!".format(et_method))
+        
+        m = 1 + len(L)*(nlag + 1) + 2*NP
+        w = int(np.round(window*spd))
+        s = int(np.round(step*spd))
+        if (w > n):
+            raise Exception("Error: The window is longer than the dataset!")
+        if (w <= m):
+            raise Exception("Error: The window must contain more samples than regression coefficients ({})!".format(m))
+        if (s < 1):
+            raise Exception("Error: The step must be at least one sample!")
+        
+        def rows(a, b):
+            # the rows a ... b-1 of the regression matrix
+            Z = [np.ones([b-a, 1])] + [l.rows(a, b) for l in L]
+            if omega is not None:
+                tau = np.outer(t[a:b], omega)
+                Z += [np.cos(tau), np.sin(tau)]
+            return np.hstack(Z)
+        
+        lag_t = np.linspace(0, lag_h, nlag + 1, endpoint=True)
+        ZtZ = np.zeros((m, m))
+        Zty = np.zeros(m)
+        start, stop = 0, 0
+        ends = np.arange(w, n+1, s)
+        # the number of windows between refactorizations
+        refresh = int(np.ceil(w/s))
+        out = []
+        for k, end in enumerate(ends):
+            if (end - w >= stop) or (k % refresh == 0):
+                # refactorize from the samples of the window
+                Z = rows(end - w, end)
+                ZtZ[:], Zty[:] = Z.T @ Z, Z.T @ dWL[end - w:end]
+            else:
+                # update: the samples entering the window
+                Z, y = rows(stop, end), dWL[stop:end]
+                ZtZ += Z.T @ Z
+                Zty += Z.T @ y
+                # downdate: the samples leaving the window
+                Z, y = rows(start, end - w), dWL[start:end - w]
+                ZtZ -= Z.T @ Z
+                Zty -= Z.T @ y
+            start, stop = end - w, end
+            # solve the scaled normal equations
+            try:
+                scale = 1/np.sqrt(np.diagonal(ZtZ))
+                cho = cho_factor(ZtZ*np.outer(scale, scale))
+            except (np.linalg.LinAlgError, ValueError):
+                c, covar = np.full(m, np.nan), np.full((m, m), np.nan)
+            else:
+                c = cho_solve(cho, Zty*scale)*scale
+                # residual sum of squares of the window (not yty - c'Zty, which cancels)
+                res = dWL[start:end] - rows(start, end) @ c
+                rss = res @ res
+                covar = cho_solve(cho, np.diag(scale))*scale[:, None] * (rss / (w - m))
+            out.append(Time_domain.deconv_params(c, covar, lag_t, NP=NP, et_method=et_method, fqs=fqs))
+        
+        # stack the window results
+        params = {}
+        for rf, val in out[0].items():
+            params[rf] = {key: (np.array([o[rf][key] for o in out]) if key in ("irc", "irc_stdev", "brf", "crf_stdev", "complex") else item) for key, item in val.items()}
+        # the difference dWL[i] ends at sample i+1
+        return ends, params
 
     # https://stackoverflow.com/questions/643699/how-can-i-use-numpy-correlate-to-do-autocorrelation
     @staticmethod
-    def acorr(dataset):
+    def corr_spectrum(dataset, N:int=None):
+        """
+        The spectrum used by acorr and xcorr.
+
+        Parameters
+        ----------
+        dataset : numpy array
+            Input dataset as a function of uniform time steps
+        N : int, optional
+            The FFT length. The default zero-pads to a fast length of at least 2*len(dataset) - 1,
+            i.e. the correlation is linear rather than circular.
+        Returns
+        -------
+        spectrum: dict
+            The real FFT of the demeaned dataset ('fft'), the FFT length ('N'), the number of
+            samples ('size') and the sum of squares of the demeaned dataset ('ss').
+        """
+        xp = np.asarray(dataset, dtype=float)
+        xp = xp - np.mean(xp)
+        if N is None:
+            N = next_fast_len(2*xp.size - 1, real=True)
+        return {'fft': rfft(xp, N), 'N': N, 'size': xp.size, 'ss': np.sum(xp**2)}
+
+    @staticmethod
+    def acorr(dataset, maxlag:int=None, spectrum:dict=None):
         """
         Calculate the autocorrelation present in an input datasets as a function of time.
 
@@ -423,6 +1057,10 @@ class Time_domain(object):
         ----------
         dataset : numpy array
             Input dataset as a function of uniform time steps
+        maxlag : int, optional
+            The maximum lag in samples. The default is half the length of the dataset.
+        spectrum : dict, optional
+            The result of corr_spectrum(dataset), e.g. cached from a previous call.
         Returns
         -------
         results: numpy array
@@ -433,17 +1071,18 @@ class Time_domain(object):
             *** TBC ***
         """
         #results = sc.signal.correlate(dataset, dataset) # <<< scipy correlate function gives spurious results
-        x = dataset
-        xp = x - np.mean(x)
-        f = np.fft.fft(xp)
-        psd = f.conjugate()*f
-        results = np.fft.ifft(psd).real[:x.size//2]/np.sum(xp**2)
+        if spectrum is None:
+            spectrum = Time_domain.corr_spectrum(dataset)
+        nlags = spectrum['size']//2 if maxlag is None else min(int(maxlag) + 1, spectrum['size'])
+        f = spectrum['fft']
+        psd = f.real**2 + f.imag**2
+        results = irfft(psd, spectrum['N'])[:nlags]/spectrum['ss']
         #results = f.conjugate()*f.real[:x.size//2]/numpy.var(x)/len(x) # alternate formulation for normalising results
         return results
 
 
     @staticmethod
-    def xcorr(dataset1, dataset2):
+    def xcorr(dataset1, dataset2, maxlag:int=None, spectrum1:dict=None, spectrum2:dict=None):
         """
         Calculate the cross-correlation between two input datasets as a function of time.
 
@@ -453,6 +1092,11 @@ class Time_domain(object):
             Input dataset #1 as a function of uniform time steps
         dataset2 : numpy array
             Input dataset #2 as a function of uniform time steps
+        maxlag : int, optional
+            The maximum lag in samples. The default is half the length of dataset #1.
+        spectrum1, spectrum2 : dict, optional
+            The results of corr_spectrum for both datasets with the same FFT length, e.g. cached
+            when one dataset is correlated with several others.
         Returns
         -------
         results: numpy array
@@ -463,13 +1107,18 @@ class Time_domain(object):
             *** TBC ***
         """
         #results = sc.signal.correlate(dataset1, dataset2) # <<< scipy correlate function gives spurious results
-        x,y = dataset1, dataset2
-        xp = x-np.mean(x)
-        yp = y-np.mean(y)
-        fx = np.fft.fft(xp)
-        fy = np.fft.fft(yp)
-        csd = fx.conjugate()*fy
-        results = np.fft.ifft(csd).real[:x.size//2]/np.sum(xp**2)
+        if (spectrum1 is None) or (spectrum2 is None):
+            size = max(np.size(dataset1) if spectrum1 is None else spectrum1['size'], np.size(dataset2) if spectrum2 is None else spectrum2['size'])
+            N = next_fast_len(2*size - 1, real=True)
+            if (spectrum1 is None) or (spectrum1['N'] != N):
+                spectrum1 = Time_domain.corr_spectrum(dataset1, N)
+            if (spectrum2 is None) or (spectrum2['N'] != N):
+                spectrum2 = Time_domain.corr_spectrum(dataset2, N)
+        if (spectrum1['N'] != spectrum2['N']):
+            raise Exception("Error: The spectra must have the same FFT length!")
+        nlags = spectrum1['size']//2 if maxlag is None else min(int(maxlag) + 1, spectrum1['size'])
+        csd = spectrum1['fft'].conjugate()*spectrum2['fft']
+        results = irfft(csd, spectrum1['N'])[:nlags]/spectrum1['ss']
         #results = fx.conjugate()*fy.real[:x.size//2]/numpy.var(x)/len(x) # alternate formulation for normalising results
         return results
 
@@ -479,7 +1128,7 @@ class Freq_domain(object):
     
     #%%
     @staticmethod
-    def lin_window_ovrlp(tf, data, length=3, stopper=3, n_ovrlp=3):
+    def lin_window_ovrlp(tf, data, length=3, stopper=3, n_ovrlp=3, engine:str="numpy"):
         """
         Windowed linear detrend function with optional window overlap
         
@@ -495,6 +1144,8 @@ class Freq_domain(object):
             minimum number of samples within each window needed for detrending
         n_ovrlp : int
             number of window overlaps relative to the defined window length
+        engine : str
+            "numpy" (linear time, default) or "loop" (reference implementation)
             
         Returns
             -------
@@ -506,7 +1157,13 @@ class Freq_domain(object):
         A windowed linear detrend function with optional window overlap for pre-processing of non-uniformly sampled data.
         The reg_times array is extended by value of "length" in both directions to improve averaging and window overlap at boundaries. High overlap values in combination with high
         The "stopper" values will cause reducion in window numbers at time array boundaries.   
+        
+        The "numpy" engine finds the window bounds with searchsorted and sums the moments of x and y
+        over the segments between consecutive window bounds. All samples of a segment belong to the
+        same windows, so the regression lines and detrended values follow in linear time.
         """
+        if check_engine(engine) == "numpy":
+            return Freq_domain._lin_window_segments(tf, data, length=length, stopper=stopper, n_ovrlp=n_ovrlp)
         # !!! how to allow data gaps in here??
         x = np.array(tf).flatten()
         y = np.array(data).flatten()
@@ -542,6 +1199,77 @@ class Freq_domain(object):
             y_detrend[np.isnan(y_detrend)] = 0.0    
         return y_detrend
     
+    @staticmethod
+    def _lin_window_segments(tf, data, length=3, stopper=3, n_ovrlp=3):
+        # linear time version of lin_window_ovrlp (see there)
+        x = np.array(tf, dtype=float).flatten()
+        y = np.array(data, dtype=float).flatten()
+        interval    = length/(n_ovrlp+1) # step_size interval with overlap 
+        # the same window centres as the reference implementation
+        reg_times   = np.arange(x[0]-(x[1]-x[0])-length,x[-1]+length, interval)
+        # the window bounds require sorted times
+        order = None
+        if np.any(np.diff(x) < 0):
+            order = np.argsort(x, kind="stable")
+            x, y = x[order], y[order]
+        valid = ~np.isnan(y)
+        # window k holds the samples lo[k] ... hi[k]-1, i.e. x > tt-(length/2) and x <= tt+(length/2)
+        lo = np.searchsorted(x, reg_times-(length/2), side="right")
+        hi = np.searchsorted(x, reg_times+(length/2), side="right")
+        
+        # segments between consecutive bounds: all their samples are in the same windows
+        bounds = np.unique(np.concatenate((lo, hi, [0, len(x)])))
+        nseg = len(bounds) - 1
+        seg = np.repeat(np.arange(nseg), np.diff(bounds))
+        # centred moments of the valid samples in every segment
+        w = valid.astype(float)
+        xv = np.where(valid, x, 0.)
+        yv = np.where(valid, y, 0.)
+        n_s = np.bincount(seg, weights=w, minlength=nseg)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mx_s = np.where(n_s > 0, np.bincount(seg, weights=xv, minlength=nseg)/n_s, 0.)
+            my_s = np.where(n_s > 0, np.bincount(seg, weights=yv, minlength=nseg)/n_s, 0.)
+        dx = np.where(valid, x - mx_s[seg], 0.)
+        dy = np.where(valid, y - my_s[seg], 0.)
+        sxx_s = np.bincount(seg, weights=dx*dx, minlength=nseg)
+        sxy_s = np.bincount(seg, weights=dx*dy, minlength=nseg)
+        
+        # only detrend windows that meet the stopper criteria
+        a = np.searchsorted(bounds, lo)
+        b = np.searchsorted(bounds, hi)
+        cs = np.concatenate(([0.], np.cumsum(n_s)))
+        use = (cs[b] - cs[a]) >= stopper
+        a, b = a[use], b[use]
+        # (window, segment) pairs of the detrended windows
+        span = b - a
+        win = np.repeat(np.arange(len(a)), span)
+        pair = np.arange(span.sum()) - np.repeat(np.cumsum(span) - span, span) + np.repeat(a, span)
+        # combine the segment moments per window (parallel axis theorem)
+        n_w = np.bincount(win, weights=n_s[pair], minlength=len(a))
+        mx_w = np.bincount(win, weights=n_s[pair]*mx_s[pair], minlength=len(a))/n_w
+        my_w = np.bincount(win, weights=n_s[pair]*my_s[pair], minlength=len(a))/n_w
+        ex = mx_s[pair] - mx_w[win]
+        ey = my_s[pair] - my_w[win]
+        sxx_w = np.bincount(win, weights=sxx_s[pair] + n_s[pair]*ex*ex, minlength=len(a))
+        sxy_w = np.bincount(win, weights=sxy_s[pair] + n_s[pair]*ex*ey, minlength=len(a))
+        # the least squares slope (zero for a single distinct time, the fit is the mean)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slope = np.where(sxx_w > 0, sxy_w/sxx_w, 0.)
+        
+        # sum of the regression lines of all windows covering a segment: C + D*(x - mx_s)
+        C = np.bincount(pair, weights=my_w[win] + slope[win]*ex, minlength=nseg)
+        D = np.bincount(pair, weights=slope[win], minlength=nseg)
+        counter = np.bincount(pair, minlength=nseg).astype(float)[seg]
+        y_detr = counter*np.where(valid, y, 0.) - C[seg] - D[seg]*dx
+        # window gaps and missing values are set to zero (mean of zero)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            y_detrend = np.where(valid & (counter > 0), y_detr/counter, 0.0)
+        if order is not None:
+            out = np.empty_like(y_detrend)
+            out[order] = y_detrend
+            y_detrend = out
+        return y_detrend
+    
     #%%
     @staticmethod
     def harmonic_lsqr(tf, data, freqs):
@@ -599,9 +1327,70 @@ class Freq_domain(object):
         result = {'freq': np.array(freqs), 'complex': hals_comp, 'error_var': error_variance, 'cond_num': condnum, 'offset': dc_comp, 'y_model': y_model}
         return result
     
+    @staticmethod
+    def harmonic_lsqr_batch(tf, data, freqs):
+        '''
+        Harmonic least squares (HALS) for several series that share the sample times.
+        The matrix Phi is assembled and factorized (QR) once and solved for all series.
+        Inputs:
+            tf      - time float. Should be an N x 1 numpy array.
+            data    - estimated outputs. Should be an N x M numpy array (one column per series).
+            freqs   - frequencies to look for. Should be a numpy array.
+        Outputs:
+            results - list of M dictionaries as returned by harmonic_lsqr.
+        '''
+        print(">> Reference: Method explained in Schweizer et al. (2021) [https://doi.org/10.1007/s11004-020-09915-9]")
+        if ((tf.max() - tf.min()) < 20):
+            raise Exception("To use HALS, the duration must be >=20 days!")
+        
+        data = np.asarray(data, dtype=float)
+        if (data.ndim == 1):
+            data = data[:, np.newaxis]
+        N = data.shape[0]
+        f = np.array(freqs)*2*np.pi
+        # make sure that time vectors are relative
+        tf = tf - np.floor(tf[0])
+        # assemble the matrix
+        Phi = np.empty((N, 2*len(f) + 1))
+        tau = np.outer(tf, f)
+        Phi[:,0:-1:2] = np.cos(tau)
+        Phi[:,1:-1:2] = np.sin(tau)
+        del tau
+        # account for any DC offsets
+        Phi[:,-1] = 1
+        # one factorization for all series
+        Q, R = qr(Phi, mode='economic', check_finite=False)
+        singular = svdvals(R)
+        condnum = np.max(singular) / np.min(singular)
+        if (condnum > 1e6):
+            raise Warning('Attention: The solution is ill-conditioned!')
+        theta = solve_triangular(R, Q.T @ data)
+        del Q
+        y_model = Phi @ theta
+        error_variance = np.sum((data - y_model)**2, axis=0)/N
+        print(">> Condition number: {:,.0f}".format(condnum))
+        results = []
+        for i in range(data.shape[1]):
+            # the DC component
+            dc_comp = theta[-1, i]
+            # create complex coefficients
+            hals_comp = theta[:-1:2, i]*1j + theta[1:-1:2, i]
+            print(">> Error variance: {:.6f}, DC component: {:.6f}".format(error_variance[i], dc_comp))
+            results.append({'freq': np.array(freqs), 'complex': hals_comp, 'error_var': error_variance[i], 'cond_num': condnum, 'offset': dc_comp, 'y_model': y_model[:, i]})
+        return results
+    
     #%%
     @staticmethod
-    def fft_comp(tf, data):
+    def fft_comp(tf, data, freqs=None):
+        '''
+        Amplitude spectrum of the Hann-windowed series.
+        Inputs:
+            tf      - time float. Should be an N x 1 numpy array (regularly sampled).
+            data    - the values. Should be an N x 1 numpy array without gaps.
+            freqs   - if given, only the FFT bins closest to these frequencies are calculated (one
+                      bin per frequency, by direct summation as in the Goertzel algorithm). The
+                      values are identical to the full FFT at these bins.
+        '''
         if (len(tf) != len(data)):
             raise Exception("To use FFT, the times must have the same length as data!")
         if np.any(np.isnan(data)):
@@ -612,6 +1401,13 @@ class Freq_domain(object):
         spd = 1/(tf[1] - tf[0])
         fft_N = len(tf)
         hanning = np.hanning(fft_N)
+        if freqs is not None:
+            # the bins of the requested frequencies
+            bins = np.clip(np.round(np.asarray(freqs, dtype=float)*fft_N/spd).astype(int), 0, int(fft_N/2) - 1)
+            fft_f = np.fft.fftfreq(int(fft_N), d=1/spd)[bins]
+            fft = 2*(dft_bins(hanning*data, bins)/(fft_N/2))
+            dc_comp = 2*np.abs(np.sum(hanning*data))/(fft_N/2)
+            return {'freq': fft_f, 'complex': fft, 'dc_comp': dc_comp}
         # perform FFT
         fft_f = np.fft.fftfreq(int(fft_N), d=1/spd)[0:int(fft_N/2)]
         # FFT windowed for amplitudes
@@ -704,7 +1500,14 @@ class Freq_domain(object):
     
     #%%
     @staticmethod
-    def K_Ss_Hsieh(ET_m2:complex, GW_m2:complex, scr_len:float, case_rad:float, scr_rad:float):
+    def K_Ss_Hsieh(ET_m2:complex, GW_m2:complex, scr_len:float, case_rad:float, scr_rad:float, engine:str="scipy", x0=None):
+        '''
+        Hydraulic conductivity and specific storage from the M2 response (Hsieh et al., 1987).
+        The "scipy" engine evaluates the Kelvin functions in double precision and provides the
+        analytic Jacobian to the solver. The "mpmath" engine is the arbitrary-precision reference.
+        The initial guess x0 (K in m/s, Ss in 1/m) can be taken from a K_Ss_table.
+        '''
+        check_engine(engine, ("scipy", "mpmath"))
         # M2 frequency
         f_m2 = const.const['_etfqs']['M2']
         amp_resp = np.abs(GW_m2 / (ET_m2*1e-9))
@@ -750,6 +1553,9 @@ class Freq_domain(object):
             else:
                 return np.Inf, np.Inf
 
+        if (engine == "scipy"):
+            et_hflow = hflow_response
+
         def fit_amp_phase(props, amp_resp, phase_shift, r_c, r_w, scr_len, freq):
             #print(props)
             K, S_s = props
@@ -760,9 +1566,15 @@ class Freq_domain(object):
             # print(error)
             return error
 
+        def fit_jac(props, amp_resp, phase_shift, r_c, r_w, scr_len, freq):
+            K, S_s = props
+            jac = hflow_response(K, S_s, r_c, r_w, scr_len, freq, jac=True)[2]
+            return np.array([[0, amp_resp], [0, 0]]) - jac
+
         print(">> Reference: Method by Hsie et al. (1987) [https://doi.org/10.1029/WR023i010p01824]")
         # least squares fitting
-        fit =  least_squares(fit_amp_phase, [1e-4*24*3600, 1e-4], args=(amp_resp, phase_shift, case_rad, scr_rad, scr_len, f_m2), method='lm')
+        x0 = [1e-4*24*3600, 1e-4] if x0 is None else [x0[0]*24*3600, x0[1]]
+        fit =  least_squares(fit_amp_phase, x0, jac=(fit_jac if (engine == "scipy") else '2-point'), args=(amp_resp, phase_shift, case_rad, scr_rad, scr_len, f_m2), method='lm')
         # print(fit)
 
         if (fit.status > 0):
@@ -783,8 +1595,53 @@ class Freq_domain(object):
     
     #%%
     @staticmethod
-    def K_Ss_Wang(ET_m2:complex, GW_m2:complex, scr_depth:float):
+    def K_Ss_realizations(method:str, ET_m2:complex, GW_m2:complex, sigma:dict, geometry:dict, tolerance:dict, seed, size:int, engine:str="scipy"):
+        '''
+        Monte Carlo realizations of K and Ss by K_Ss_Hsieh or K_Ss_Wang.
+        Inputs:
+            method      - 'hsieh' or 'wang'.
+            ET_m2, GW_m2 - the M2 components.
+            sigma       - standard deviations of the real and imaginary parts of the components ('ET', 'GW').
+            geometry    - the well geometry (scr_len, case_rad, scr_rad or scr_depth).
+            tolerance   - standard deviations of the well geometry. Non-positive draws are redrawn.
+            seed        - seed of the random generator (e.g. a numpy SeedSequence).
+            size        - the number of realizations.
+        Outputs:
+            K, Ss       - numpy arrays (NaN where the fit failed).
+        '''
+        rng = np.random.default_rng(seed)
+        ET = ET_m2 + sigma.get("ET", 0)*(rng.standard_normal(size) + 1j*rng.standard_normal(size))
+        GW = GW_m2 + sigma.get("GW", 0)*(rng.standard_normal(size) + 1j*rng.standard_normal(size))
+        geo = {}
+        for key, value in geometry.items():
+            tol = tolerance.get(key, 0)
+            draw = value + tol*rng.standard_normal(size)
+            bad = (draw <= 0)
+            while np.any(bad):
+                draw[bad] = value + tol*rng.standard_normal(np.sum(bad))
+                bad = (draw <= 0)
+            geo[key] = draw
+        K = np.full(size, np.nan)
+        Ss = np.full(size, np.nan)
+        with utils.nullify_output():
+            for i in range(size):
+                try:
+                    if (method == "hsieh"):
+                        fit = Freq_domain.K_Ss_Hsieh(ET[i], GW[i], geo["scr_len"][i], geo["case_rad"][i], geo["scr_rad"][i], engine=engine)
+                    else:
+                        fit = Freq_domain.K_Ss_Wang(ET[i], GW[i], geo["scr_depth"][i])
+                except Exception:
+                    # e.g. a phase shift outside the valid range of the model
+                    continue
+                if len(fit):
+                    K[i], Ss[i] = fit["K"], fit["Ss"]
+        return K, Ss
+
+    #%%
+    @staticmethod
+    def K_Ss_Wang(ET_m2:complex, GW_m2:complex, scr_depth:float, x0=None):
         # !!! need borehole construction parameters !!!
+        # the initial guess x0 (K in m/s, Ss in 1/m) can be taken from a K_Ss_table
         
         # M2 frequency
         f_m2 = const.const['_etfqs']['M2']
@@ -820,7 +1677,8 @@ class Freq_domain(object):
 
         print(">> Reference: Method by Wang (2000) [ISBN:9780691037462]")
         # least squares fitting wang
-        fit =  least_squares(residuals, [0.01, 0.01], args=(amp_resp, phase_shift, scr_depth, f_m2), bounds=((1e-20,1e-20),(0.01,0.01)), xtol=3e-16, ftol=3e-16, gtol=3e-16)
+        x0 = [0.01, 0.01] if x0 is None else np.clip(x0, 1e-20, 0.01)
+        fit =  least_squares(residuals, x0, args=(amp_resp, phase_shift, scr_depth, f_m2), bounds=((1e-20,1e-20),(0.01,0.01)), xtol=3e-16, ftol=3e-16, gtol=3e-16)
 
         if (fit.status > 0):
             K = fit.x[0]
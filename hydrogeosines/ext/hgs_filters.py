@@ -1,33 +1,67 @@
+import re
 import numpy as np
 
 class HgsFilters(object):
     """
     An extension that features hgs filters by category and location
+
+    The category accessors get_<category>_data, get_<category>_values and get_<category>_locs
+    are resolved lazily: the row positions of all categories are determined once (one pass over
+    the category column) on first use and are reused for all later accesses.
     """
     VALID_CATEGORY  = {"ET", "BP", "GW"}
     NON_VALID_VALUES = {""}
+    # the identifier columns of the long format, stored as object or category dtype
+    KEY_COLUMNS = ("category", "location", "part", "unit")
+    # lazily resolved category accessors
+    CATEGORY_ATTR = re.compile(r"^get_(\w+?)_(data|values|locs)$")
     
     def __init__(self, hgs_obj):
         ## add attribute specific to Time here   
         #self._validate(hgs_obj)
         self._obj = hgs_obj
-        
-        # dynamically set a attribute that uses a function to access existing data categories
-        for attr in self._obj.category.unique():
-            setattr(self,f'get_{attr.lower()}_data', self.make_attr(attr)())
-            setattr(self,f'get_{attr.lower()}_values', self.make_attr(attr)().value.values)
-            setattr(self,f'get_{attr.lower()}_locs', self.make_attr(attr)()["location"].unique())
+        # row positions by category, determined on first use
+        self._rows = None
+    
+    def __getattr__(self, name):
+        # only called for attributes that do not exist: resolve the category accessors
+        match = self.CATEGORY_ATTR.match(name)
+        if match is None:
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+        rows = self.category_rows
+        category = {str(cat).lower(): cat for cat in rows.keys()}.get(match.group(1))
+        if category is None:
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, name))
+        if match.group(2) == "data":
+            return self._obj.take(rows[category])
+        elif match.group(2) == "values":
+            return self._obj["value"].values[rows[category]]
+        else:
+            return self._obj["location"].take(rows[category]).unique()
+    
+    def __dir__(self):
+        attrs = list(super().__dir__())
+        if self._rows is not None:
+            attrs += ["get_{}_{}".format(str(cat).lower(), kind) for cat in self._rows.keys() for kind in ("data", "values", "locs")]
+        return attrs
+    
+    @property
+    def category_rows(self):
+        # row positions of every category (one pass over the category column)
+        if self._rows is None:
+            self._rows = self._obj.groupby("category", observed=True, sort=False).indices
+        return self._rows
     
     # access function 
     def make_attr(self, category):
         def inner():
-            return self._obj[self._obj['category'] == category].copy()
+            return self._obj.take(self.category_rows.get(category, np.array([], dtype=int)))
         return inner
     
     @property
     def obj_col(self):
-        # returns df object columns as list
-        return list(self._obj.select_dtypes(include=['object']).columns)
+        # returns df identifier columns as list (in column order, independent of the dtype)
+        return [col for col in self._obj.columns if col in self.KEY_COLUMNS]
     
     @property
     def loc_part(self):
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed forward-model tables for the inversion of K and Ss from the M2 response.
+"""
+import os
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .hgs_analysis import Freq_domain, kelvin_ratio
+from ..models import const
+from .. import utils
+
+class K_Ss_table(object):
+    """
+    Lookup tables of the Hsieh et al. (1987) and Wang (2000) models for many wells.
+
+    Both models depend on K, Ss and the well geometry only through dimensionless groups, i.e. a
+    single table per model serves all wells:
+        hsieh:  W = 1 + i*c*K0(z)/(z*K1(z)), z = alpha_w*exp(i*pi/4), with
+                alpha_w = r_w*sqrt(omega*Ss/K) and c = omega*r_c^2/(2*K*b)
+        wang:   V = 1 - exp(-(1+i)*u), with u = z/delta and delta = sqrt(2*K/(Ss*omega))
+    The table holds the logarithm of the amplitude ratio and the phase shift on a regular grid of
+    the logarithms of the groups. It is built in memory and, only if a folder is given (or set by
+    the environment variable HGS_TABLE_CACHE), stored there and loaded by later sessions. The inversion picks the best grid node of
+    every well, refines it by Newton iterations of the exact model (vectorized over all wells) and
+    falls back to the solver of Freq_domain, started from the table, where these do not converge.
+    """
+    ENV_FOLDER  = "HGS_TABLE_CACHE"
+    # log10 range and number of nodes of every dimensionless group
+    GRID        = {"hsieh": ((-4, 3, 141), (-8, 4, 241)), "wang": ((-3, 2, 2001),)}
+
+    def __init__(self, model:str="hsieh", folder:str=None):
+        model = model.lower()
+        if model not in self.GRID.keys():
+            raise Exception("Error: Model '{}' is not available! Use one of {}.".format(model, tuple(self.GRID.keys())))
+        if folder is None:
+            # nothing is written to disk unless requested
+            folder = os.environ.get(self.ENV_FOLDER)
+        self.model = model
+        self.folder = folder
+        self._table = None
+        self._tree = None
+
+    #%% dimensionless models
+    @staticmethod
+    def hsieh_model(alpha_w, c):
+        ''' W and its derivatives with respect to log(alpha_w) and log(c) '''
+        R, dR = kelvin_ratio(alpha_w)
+        W = 1 + 1j*c*R
+        return W, 1j*c*dR*alpha_w, 1j*c*R
+
+    @staticmethod
+    def wang_model(u):
+        ''' V and its derivative with respect to log(u) '''
+        e = np.exp(-(1 + 1j)*u)
+        return 1 - e, (1 + 1j)*e*u
+
+    #%% storage
+    def path(self):
+        if self.folder is None:
+            return None
+        grid = "_".join("{:g}_{:g}_{:d}".format(*g) for g in self.GRID[self.model])
+        return os.path.join(self.folder, "k_ss_{}_{}.npz".format(self.model, grid))
+
+    def build(self):
+        ''' Evaluate the model on the grid '''
+        axes = [np.log(10**np.linspace(*g)) for g in self.GRID[self.model]]
+        if (self.model == "hsieh"):
+            W = self.hsieh_model(np.exp(axes[0])[:,np.newaxis], np.exp(axes[1])[np.newaxis,:])[0]
+            # log(Ar) + i*dPhi = -log(W)
+            values = -np.log(W)
+        else:
+            values = np.log(self.wang_model(np.exp(axes[0]))[0])
+        return {"axes": axes, "log_amp": values.real, "phase": values.imag}
+
+    @property
+    def table(self):
+        ''' The table, loaded from the folder or built (and saved to the folder) '''
+        if self._table is None:
+            path = self.path()
+            if path is None:
+                self._table = self.build()
+                return self._table
+            try:
+                with np.load(path, allow_pickle=False) as npz:
+                    n = len(self.GRID[self.model])
+                    self._table = {"axes": [npz["axis{:d}".format(i)] for i in range(n)], "log_amp": npz["log_amp"], "phase": npz["phase"]}
+            except Exception:
+                self._table = self.build()
+                os.makedirs(self.folder, exist_ok=True)
+                tmp = path + ".tmp.npz"
+                axes = {"axis{:d}".format(i): axis for i, axis in enumerate(self._table["axes"])}
+                np.savez(tmp, log_amp=self._table["log_amp"], phase=self._table["phase"], **axes)
+                # replace atomically
+                os.replace(tmp, path)
+        return self._table
+
+    #%% inversion
+    def search(self, log_g, phase_shift):
+        '''
+        The grid nodes with the smallest residuals for every well, the nearest neighbours of the
+        observations among the nodes (hsieh: log(g) = log(A_str*r_c^2/(2*b*r_w^2)) and phase shift).
+        '''
+        table = self.table
+        if self._tree is None:
+            if (self.model == "hsieh"):
+                la, lc = table["axes"]
+                # the amplitude residual log(Ar) - log(g*alpha_w^2/c) without the well term
+                node = table["log_amp"] - 2*la[:,np.newaxis] + lc[np.newaxis,:]
+                points = np.column_stack((node.ravel(), table["phase"].ravel()))
+            else:
+                points = table["phase"][:,np.newaxis]
+            self._tree = cKDTree(points)
+        if (self.model == "hsieh"):
+            best = self._tree.query(np.column_stack((log_g, phase_shift)))[1]
+            ia, ic = np.unravel_index(best, table["log_amp"].shape)
+            return np.column_stack((table["axes"][0][ia], table["axes"][1][ic]))
+        best = self._tree.query(np.asarray(phase_shift)[:,np.newaxis])[1]
+        return table["axes"][0][best][:,np.newaxis]
+
+    def newton(self, x, log_g, phase_shift, iterations:int=30, tol:float=1e-12):
+        ''' Refine the nodes x by Newton iterations of the exact model '''
+        x = x.copy()
+        for _ in range(iterations):
+            if (self.model == "hsieh"):
+                W, dW_a, dW_c = self.hsieh_model(np.exp(x[:,0]), np.exp(x[:,1]))
+                ja, jc = -dW_a/W, -dW_c/W
+                r = np.column_stack((-np.log(np.abs(W)) - log_g - 2*x[:,0] + x[:,1], -np.angle(W) - phase_shift))
+                J = np.stack((np.column_stack((ja.real - 2, jc.real + 1)), np.column_stack((ja.imag, jc.imag))), axis=1)
+                with np.errstate(all='ignore'):
+                    step = np.linalg.solve(J, -r[:,:,np.newaxis])[:,:,0]
+            else:
+                V, dV = self.wang_model(np.exp(x[:,0]))
+                r = (np.angle(V) - phase_shift)[:,np.newaxis]
+                with np.errstate(all='ignore'):
+                    step = -r/(dV/V).imag[:,np.newaxis]
+            step = np.clip(np.nan_to_num(step), -1, 1)
+            x += step
+            if np.all(np.abs(r) < tol):
+                break
+        return x, np.all(np.abs(r) < tol, axis=1)
+
+    def invert(self, ET_m2, GW_m2, scr_len=None, case_rad=None, scr_rad=None, scr_depth=None, fallback:bool=True):
+        """
+        K and Ss of many wells.
+
+        Parameters
+        ----------
+        ET_m2, GW_m2 : complex numpy arrays
+            The M2 components of the Earth tide and the groundwater heads.
+        scr_len, case_rad, scr_rad : float or numpy arrays
+            The well geometry of the Hsieh model (see Freq_domain.K_Ss_Hsieh).
+        scr_depth : float or numpy array
+            The screen depth of the Wang model (see Freq_domain.K_Ss_Wang).
+        fallback : bool, optional
+            Use the solver of Freq_domain where the table inversion does not converge.
+
+        Returns
+        -------
+        results : dict
+            Arrays of A_str, dPhi, A_r, K (m/s), Ss (1/m) and the method that was used for every
+            well ('table', 'solver' or 'failed').
+        """
+        ET_m2, GW_m2 = np.broadcast_arrays(np.atleast_1d(ET_m2), np.atleast_1d(GW_m2))
+        n = len(ET_m2)
+        f_m2 = const.const['_etfqs']['M2']
+        amp_resp = np.abs(GW_m2 / (ET_m2*1e-9))
+        phase_shift = np.angle(GW_m2 / ET_m2)
+        method = np.full(n, "failed", dtype=object)
+        if (self.model == "hsieh"):
+            if (scr_len is None) or (case_rad is None) or (scr_rad is None):
+                raise Exception("Error: The Hsieh model requires scr_len, case_rad and scr_rad!")
+            b, r_w, r_c = [np.broadcast_to(np.asarray(v, dtype=float), (n,)) for v in (scr_len, case_rad, scr_rad)]
+            valid = (np.degrees(phase_shift) <= 1)
+            log_g = np.log(amp_resp*r_c**2/(2*b*r_w**2))
+            x, converged = self.newton(self.search(log_g, phase_shift), log_g, phase_shift)
+            alpha_w, c = np.exp(x[:,0]), np.exp(x[:,1])
+            omega = 2*np.pi*f_m2
+            K_d = omega*r_c**2/(2*b*c)
+            K = K_d/24/3600
+            Ss = alpha_w**2*K_d/(r_w**2*omega)
+        else:
+            if scr_depth is None:
+                raise Exception("Error: The Wang model requires scr_depth!")
+            z = np.broadcast_to(np.asarray(scr_depth, dtype=float), (n,))
+            valid = (phase_shift >= 0)
+            x, converged = self.newton(self.search(None, phase_shift), None, phase_shift)
+            u = np.exp(x[:,0])
+            Ss = np.abs(self.wang_model(u)[0])/amp_resp
+            omega = 2*np.pi*(f_m2/24/3600)
+            K = omega*z**2*Ss/(2*u**2)
+            # the bounds of the solver
+            converged &= (K <= 0.01) & (Ss <= 0.01)
+        converged &= valid & np.isfinite(K) & np.isfinite(Ss)
+        method[converged] = "table"
+        K = np.where(converged, K, np.nan)
+        Ss_guess, K_guess = Ss.copy(), K.copy()
+        Ss = np.where(converged, Ss, np.nan)
+
+        if fallback:
+            for i in np.flatnonzero(valid & ~converged):
+                x0 = None if not (np.isfinite(K_guess[i]) and np.isfinite(Ss_guess[i])) else [K_guess[i], Ss_guess[i]]
+                with utils.nullify_output():
+                    if (self.model == "hsieh"):
+                        fit = Freq_domain.K_Ss_Hsieh(ET_m2[i], GW_m2[i], b[i], r_w[i], r_c[i], x0=x0)
+                    else:
+                        fit = Freq_domain.K_Ss_Wang(ET_m2[i], GW_m2[i], z[i], x0=x0)
+                if len(fit):
+                    K[i], Ss[i] = fit["K"], fit["Ss"]
+                    method[i] = "solver"
+
+        return {'A_str': amp_resp, 'dPhi': phase_shift, 'A_r': amp_resp*Ss, 'K': K, 'Ss': Ss, 'method': method}
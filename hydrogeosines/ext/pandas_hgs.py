@@ -38,19 +38,71 @@ class HgsAccessor(object):
     ## setting filters as a property and extending it by the HgsFilters methods
     @property
     def filters(self):
+        # new filters on every access: the category rows are resolved lazily and follow in-place edits
         return HgsFilters(self._obj)
     
+    #%%
+    @property
+    def is_categorical(self):
+        # are the identifier columns stored as pd.Categorical?
+        cols = self.filters.obj_col
+        return (len(cols) > 0) and all(isinstance(self._obj[col].dtype, pd.CategoricalDtype) for col in cols)
+    
+    def to_categorical(self):
+        """
+        Store the identifier columns (category, location, part, unit) as pd.Categorical.
+
+        Every row then holds small integer codes instead of a reference to a Python string,
+        which reduces the memory of these columns from roughly 300 to 4 bytes per row and
+        speeds up grouping.
+
+        Returns
+        -------
+        df : pd.DataFrame
+            A copy with categorical identifier columns (categories in lexical order).
+        """
+        df = self._obj.copy()
+        for col in self.filters.obj_col:
+            cats = df[col].cat.categories if isinstance(df[col].dtype, pd.CategoricalDtype) else pd.unique(df[col].dropna())
+            df[col] = df[col].astype(pd.CategoricalDtype(sorted(cats)))
+        return df
+    
+    def to_object(self):
+        # store the identifier columns as object dtype (Python strings)
+        df = self._obj.copy()
+        for col in self.filters.obj_col:
+            df[col] = df[col].astype(object)
+        return df
+    
+    @staticmethod
+    def concat(frames, **kwargs):
+        """
+        Concatenate hgs DataFrames like pd.concat. Identifier columns that are categorical in any of
+        the frames remain categorical with the (lexically ordered) union of all categories.
+        """
+        frames = list(frames)
+        for col in HgsFilters.KEY_COLUMNS:
+            dtypes = [df[col].dtype for df in frames if col in df.columns]
+            if any(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes):
+                cats = set()
+                for df in frames:
+                    if col in df.columns:
+                        cats.update(df[col].cat.categories if isinstance(df[col].dtype, pd.CategoricalDtype) else pd.unique(df[col].dropna()))
+                dtype = pd.CategoricalDtype(sorted(cats))
+                frames = [df.astype({col: dtype}) if col in df.columns else df for df in frames]
+        return pd.concat(frames, **kwargs)
+    
     #%%
     @property
     def pivot(self):
-        return self._obj.pivot_table(index=self.dt._obj, columns=self.filters.obj_col, values="value")    
+        return self._obj.pivot_table(index=self.dt._obj, columns=self.filters.obj_col, values="value", observed=True)    
       
     #%%
     @property
     def spl_freq_groupby(self):
         # returns most ofen found sampling frequency grouped by object-dtype columns, in seconds
         df = self._obj[self._obj.value.notnull()]
-        df = df.groupby(self.filters.obj_col, dropna=False)["datetime"].agg(lambda x: (x.diff(periods=1).dt.seconds).mode())
+        df = df.groupby(self.filters.obj_col, dropna=False, observed=True)["datetime"].agg(lambda x: (x.diff(periods=1).dt.seconds).mode())
         #df = df.index.droplevel(3) # remove the zero index entry
         return df
       
@@ -105,7 +157,12 @@ class HgsAccessor(object):
         if len(df[idx]) > 0:
             print("Convert pressure to SI unit meter.")
             df.loc[idx, "value"] = self.unit_converter_vec(df[idx], unit_dict) 
-            df.loc[:, "unit"]    = np.where(idx, "m", df.unit) 
+            if isinstance(df["unit"].dtype, pd.CategoricalDtype):
+                df["unit"] = df["unit"].cat.add_categories([c for c in ["m"] if c not in df["unit"].cat.categories])
+                df.loc[idx, "unit"] = "m"
+                df["unit"] = df["unit"].cat.remove_unused_categories()
+            else:
+                df.loc[:, "unit"]    = np.where(idx, "m", df.unit) 
         return df
     
     #%%
@@ -126,7 +183,7 @@ class HgsAccessor(object):
     def resample(self, freq,origin:str = "start_day"):
         # resamples by group and by a given frequency in "seconds".
         # should be used on the (calculated) median frequency of the datetime
-        out = self._obj.groupby(self.filters.obj_col).resample(str(int(freq))+"S", on="datetime", origin=origin).mean()
+        out = self._obj.groupby(self.filters.obj_col, observed=True).resample(str(int(freq))+"S", on="datetime", origin=origin).mean()
         # reorganize index and column structure to match original hgs dataframe
         out = out.reset_index()[self._obj.columns]
         return out
@@ -141,7 +198,7 @@ class HgsAccessor(object):
             a = self._obj.loc[:,self.filters.obj_col].isin(freq_groupby.index[i]).all(axis=1)
             # resample       
             print(self.filters.obj_col)
-            temp = self._obj[a].groupby(self.filters.obj_col).resample(str(int(freq_groupby[i]))+"S", on="datetime", origin=origin).mean()
+            temp = self._obj[a].groupby(self.filters.obj_col, observed=True).resample(str(int(freq_groupby[i]))+"S", on="datetime", origin=origin).mean()
             print(temp)
             temp = temp.reset_index()
             out.append(temp) 
@@ -190,6 +247,9 @@ class HgsAccessor(object):
                     # use character string format
                     val.insert(3,"part",str(i+1))    
                 else:
+                    if isinstance(val["part"].dtype, pd.CategoricalDtype):
+                        # new part labels are not among the categories
+                        val["part"] = val["part"].astype(object)
                     val.loc[val["part"] != np.nan,"part"] = str(i+1)
             # concat df back with new column for "part"         
             if len(list_df) == 1:
@@ -317,7 +377,7 @@ class HgsAccessor(object):
         if mcfs.hgs.filters.is_nan:        
             ## identify small and large gaps
             # group by identifier columns of site data
-            regular = mcfs.groupby(mcfs.hgs.filters.obj_col).apply(HgsAccessor.gap_routine, mcf=spl_freq, 
+            regular = mcfs.groupby(mcfs.hgs.filters.obj_col, observed=True).apply(HgsAccessor.gap_routine, mcf=spl_freq, 
                                                                  inter_max = inter_max, part_min = part_min, 
                                                                  method = method, inter_max_total= inter_max_total).reset_index(drop=True)      
             # reassamble DataFrame          
@@ -334,6 +394,125 @@ class HgsAccessor(object):
         """
         Align barometric pressure records with groundwater head data.
 
+        Data that is aligned already (no null values and one entry of every BP record at every GW
+        time) is returned as is. Otherwise the common GW/BP timeline is computed in one pass for
+        every GW location by binary searches of the int64 times: the BP records are taken (or
+        resampled) at the GW sampling times, BP gaps below inter_max are interpolated, and the GW
+        entries are restricted to the times for which all BP records hold a value. Where this removes GW entries, the remaining data is split into parts at the
+        gaps and parts shorter than part_min are dropped. The result is equivalent to the
+        converged iterations of BP_align_iterative.
+
+        Parameters
+        ----------
+        inter_max : int, optional
+            Maximum of interpolated time interval in seconds. The default is 3600.
+        method : str, optional
+            Interpolation method of Pandas to be used. The default is "backfill".
+        part_min : int, optional
+            Minimum record duration of the groundwater data in days. The default is 20.
+        inter_max_total : int, optional
+            Maximum percentage threshold of values to be interpolated. The default is 10.
+
+        Raises
+        ------
+        Exception
+            If inter_max is smaller than the GW sampling interval.
+
+        Returns
+        -------
+        out : pd.DataFrame
+            HGS DataFrame with a BP entry for every GW entry.
+
+        """
+        # get bp and gw categories and split from rest of the data
+        bp_data = self.filters.get_bp_data
+        gw_data = self.filters.get_gw_data
+        df_rest = self._obj[~self._obj["category"].isin(["GW","BP"])]
+        # assign missing part label to bp_data
+        if "part" in bp_data.columns:
+            bp_data["part"] = bp_data["part"].fillna("all")
+        # the BP records and the number of them that must be present at every GW entry
+        records = bp_data.groupby(bp_data.hgs.filters.obj_col, observed=True).ngroup().values
+        n_bp = int(records.max()) + 1 if len(records) else 0
+        ## data that is aligned already is returned as is (like BP_align_iterative): no null values
+        ## and one entry of every BP record at every GW time
+        if (n_bp > 0) and (len(gw_data) > 0) and not (bp_data["value"].isnull().any() or gw_data["value"].isnull().any()):
+            bp_times = pd.DatetimeIndex(bp_data["datetime"]).asi8
+            order = np.lexsort((records, bp_times))
+            t, r = bp_times[order], records[order]
+            times, count = np.unique(t, return_counts=True)
+            gw_times = pd.DatetimeIndex(gw_data["datetime"]).asi8
+            idx = np.minimum(np.searchsorted(times, gw_times), len(times) - 1)
+            if not ((t[1:] == t[:-1]) & (r[1:] == r[:-1])).any() and ((times[idx] == gw_times) & (count[idx] == n_bp)).all():
+                print("The GW and BP data is aligned already.")
+                return pd.concat([gw_data, bp_data, df_rest], axis=0, ignore_index=True)
+        bp_data = bp_data.sort_values(by=["datetime"], ascending=True).reset_index(drop=True)
+        # get GW most common frequencies
+        spl_freqs_gw = gw_data.hgs.spl_freq_groupby
+        # make sure a reasonable inter_max is chosen
+        if (inter_max < spl_freqs_gw.values).any():
+            raise Exception("Error: The selected parameter value of {} for 'inter_max' is too low for a sampling frequency of {}.\nPlease reset!".format(inter_max,spl_freqs_gw.values.max()))
+
+        # the BP times (int64 ns) for binary searches
+        bp_times = pd.DatetimeIndex(bp_data["datetime"]).asi8
+        bp_temp = []
+        gw_temp = []
+        # align BP data to each gw location separately
+        for name, GW in gw_data.groupby(gw_data.hgs.filters.obj_col, observed=True):
+            print("\n----- {}_{} -----".format(name[1],name[2]))
+            gw_times = pd.DatetimeIndex(GW["datetime"]).asi8
+            dt_start = GW["datetime"].min()
+            dt_end   = GW["datetime"].max()
+            spl_freq = int(spl_freqs_gw[name])
+            # BP entries within the time span of the GW data (a slice of the sorted BP data)
+            lo, hi = np.searchsorted(bp_times, [gw_times.min(), gw_times.max() + spl_freq*10**9], side="left")
+            BP, times = bp_data.iloc[lo:hi], bp_times[lo:hi]
+            # if all GW entries have a matching BP, use those directly
+            if np.isin(gw_times, times).all():
+                BP = BP[np.isin(times, gw_times)]
+            else:
+                print("BP record resampled to 1 sample per {}s.".format(spl_freq))
+                BP = BP.hgs.resample(spl_freq, origin=dt_start)
+                BP = BP[(BP["datetime"] >= dt_start) & (BP["datetime"] <= dt_end)]
+
+            ## identify and upsample small gaps, larger gaps are removed
+            if BP.hgs.filters.is_nan:
+                print("\nProcessing BP gaps ...")
+                BP = BP.groupby(BP.hgs.filters.obj_col, observed=True).apply(HgsAccessor.gap_routine, mcf=spl_freq, inter_max = inter_max,
+                                          method = method, inter_max_total= inter_max_total, split_location=False).reset_index(drop=True)
+                BP = BP[BP["value"].notnull()]
+
+            ## the common timeline: GW entries with a value of every BP record
+            times, count = np.unique(pd.DatetimeIndex(BP["datetime"]).asi8, return_counts=True)
+            idx = np.minimum(np.searchsorted(times, gw_times), max(len(times) - 1, 0))
+            matched = (times[idx] == gw_times) & (count[idx] == n_bp) if len(times) else np.zeros(len(GW), dtype=bool)
+            valid = GW["value"].notnull().values & matched
+            if not valid.all():
+                print("... dropping {:d} GW entries without matching BP entries.".format(np.count_nonzero(~valid)))
+                # split GW data at the gaps and apply the minimum part size
+                part_size = int(part_min/(spl_freq/(60*60*24)))
+                GW = GW[valid].reset_index(drop=True).hgs.location_splitter(part_size=part_size, dt_threshold=inter_max)
+            else:
+                print("... all done!")
+            gw_temp.append(GW)
+            bp_temp.append(BP)
+
+        gw_data = pd.concat(gw_temp, axis=0, ignore_index=True)
+        if len(gw_data) == 0:
+            print("Unfortunately, there is insufficient overlap between the BP and GW data, so they cannot be aligned. Try different minimum part_size and inter_max parameters.")
+        bp_data = pd.concat(bp_temp, axis=0, ignore_index=True).drop_duplicates(subset=None, keep='first', ignore_index=True)
+
+        out = pd.concat([gw_data, bp_data, df_rest],axis=0,ignore_index=True)
+
+        return out
+
+    def BP_align_iterative(self, inter_max:int = 3600, method: str ="backfill", part_min: int = 20, inter_max_total:int = 10):
+        """
+        Align barometric pressure records with groundwater head data (iterative reference of BP_align).
+
+        The alignment is repeated until the BP data holds no null values and is aligned with the
+        GW data. This does not converge where a GW record extends beyond the BP records.
+
         Parameters
         ----------
         inter_max : int, optional
@@ -380,7 +559,7 @@ class HgsAccessor(object):
             bp_temp = []
             gw_temp = []
             # align BP data to each gw location separately
-            for name, GW in gw_data.groupby(gw_data.hgs.filters.obj_col): 
+            for name, GW in gw_data.groupby(gw_data.hgs.filters.obj_col, observed=True): 
                 print("\n----- {}_{} -----".format(name[1],name[2]))
                 dt_start = GW["datetime"].min()
                 dt_end   = GW["datetime"].max()
@@ -405,7 +584,7 @@ class HgsAccessor(object):
                 if BP.hgs.filters.is_nan:
                     print("\nProcessing BP gaps ...")
                     # interpolate small gaps in BP data, and leave out bigger gaps
-                    BP = BP.groupby(BP.hgs.filters.obj_col).apply(HgsAccessor.gap_routine, mcf=spl_freq, inter_max = inter_max, 
+                    BP = BP.groupby(BP.hgs.filters.obj_col, observed=True).apply(HgsAccessor.gap_routine, mcf=spl_freq, inter_max = inter_max, 
                                               method = method, inter_max_total= inter_max_total, split_location=False).reset_index(drop=True)   
                     # resample to get gaps that are larger then max_gap
                     BP = BP.hgs.resample(spl_freq)
@@ -423,7 +602,7 @@ class HgsAccessor(object):
                         GW = GW.hgs.resample(spl_freq)            
                         # identify and upsample or split gaps in gw data  
                         #GW = GW.hgs.make_regular(spl_freq=spl_freq,inter_max_total=inter_max_total,part_min=part_min,inter_max=inter_max).reset_index(drop=True)
-                        GW = GW.groupby(GW.hgs.filters.obj_col).apply(HgsAccessor.gap_routine, mcf=spl_freq, inter_max = inter_max, part_min = part_min,
+                        GW = GW.groupby(GW.hgs.filters.obj_col, observed=True).apply(HgsAccessor.gap_routine, mcf=spl_freq, inter_max = inter_max, part_min = part_min,
                                               method = method, inter_max_total= inter_max_total, split_location=True).reset_index(drop=True)                        
                 else:
                     print("... all done!")
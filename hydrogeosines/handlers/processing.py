@@ -10,24 +10,124 @@ import pytz
 import numpy as np
 import inspect
 import warnings
-from copy import deepcopy
-
-from ..ext.hgs_analysis import Time_domain, Freq_domain
+from copy import copy, deepcopy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from scipy.fft import next_fast_len
+
+from ..ext.hgs_analysis import Time_domain, Freq_domain, Harmonic_rls
+from ..ext.hgs_aligned import HgsAligned
+from ..ext.time import Time
+from .result_cache import Result_cache, memoize, fingerprint
 from ..models.site import Site
 from ..models.ext.et import ET_data as etides
 #from ...view import View
 
 from .. import utils
 
+#%% the per-location work, which only receives NumPy arrays (see Processing._map)
+def _be_time_task(BP, GW, methods, engine):
+    return {val: getattr(Time_domain, key)(BP, GW, **Processing._engine_args(getattr(Time_domain, key), engine)) for key, val in methods}
+
+def _hals_task(tf, values, freqs, detrend):
+    if detrend:
+        values = Freq_domain.lin_window_ovrlp(tf, values)
+    return Freq_domain.harmonic_lsqr(tf, values, freqs)
+
+def _fft_task(tf, values, freqs, detrend):
+    if detrend:
+        values = Freq_domain.lin_window_ovrlp(tf, values)
+    return Freq_domain.fft_comp(tf, values, freqs=freqs)
+
+def _xcorr_task(values, pairs, maxlags):
+    # the spectrum of every category is calculated once
+    N = next_fast_len(2*max(len(v) for v in values.values()) - 1, real=True)
+    spectra = {cat: Time_domain.corr_spectrum(v, N) for cat, v in values.items()}
+    return [Time_domain.xcorr(values[cat1], values[cat2], maxlag=maxlag, spectrum1=spectra[cat1], spectrum2=spectra[cat2]) for (cat1, cat2), maxlag in zip(pairs, maxlags)]
+
 class Processing(object):
+    """
+    The processing methods of a site.
+
+    By default the site is deep-copied. With copy_on_write=True the site data is shared until a
+    processing step (by_dates, by_gwloc, decimate, ET_calc) replaces it by a private DataFrame, i.e.
+    the data of the original site must not be modified in place while the Processing is in use.
+
+    With cache=True (or a shared Result_cache object) repeated calls of the processing methods
+    with the same parameters are served from a cache (see result_cache.memoize). The results are
+    keyed on a hash of the input data that is calculated on every call, so in-place edits of
+    site.data or data_regular are detected. The cached and returned results are independent copies.
+
+    With n_jobs other than 1 the per-location work is distributed over a pool of n_jobs threads
+    (backend="thread") or processes (backend="process"; n_jobs=None or -1 uses all processors).
+    The process backend pickles the task functions and their NumPy arguments. On platforms that
+    start the workers with "spawn" (Windows, macOS), every worker imports the main module again,
+    so a script using the process backend must guard its entry point with
+    if __name__ == "__main__":
+    """
     # define all class attributes here
     #attr = attr
 
-    def __init__(self, site_obj):
+    BACKENDS = ("thread", "process")
+
+    def __init__(self, site_obj, n_jobs:int=1, backend:str="process", copy_on_write:bool=False, cache=False):
         self._validate(site_obj)
-        self.site       = deepcopy(site_obj)
-        self.data_orig  = site_obj.data.copy()
+        if backend not in self.BACKENDS:
+            raise Exception("Error: Backend '{}' is not available! Use one of {}.".format(backend, self.BACKENDS))
+        if copy_on_write:
+            # share the data of the site: the processing steps (by_dates, by_gwloc, decimate, ET_calc,
+            # ...) never modify the site data in place but replace it by a new private DataFrame
+            self.site       = copy(site_obj)
+            self.site.utc_offset = dict(site_obj.utc_offset)
+            self.data_orig  = site_obj.data
+        else:
+            self.site       = deepcopy(site_obj)
+            self.data_orig  = site_obj.data.copy()
+        self.copy_on_write = copy_on_write
         self.results    = {}
+        # parallel execution of the per-location work (n_jobs=None or -1 uses all processors)
+        self.n_jobs     = n_jobs
+        self.backend    = backend
+        # memoization of the method results (True, False or a Result_cache object)
+        if (cache is None) or (cache is False):
+            cache = None
+        elif cache is True:
+            cache = Result_cache()
+        self.cache      = cache
+        self._result_states = {}
+
+    @property
+    def shares_data(self):
+        ''' Is the site data still shared with the original site (see copy_on_write)? '''
+        return self.copy_on_write and (self.site.data is self.data_orig)
+
+    def _data_state(self, aligned:bool=False):
+        """
+        The site and the hash of the input data of a method (see result_cache.memoize): the site
+        data and, for the methods on the regular and aligned data, the arrays of data_aligned.
+        The hashes are calculated on every call to detect in-place edits of the data.
+        """
+        hashes = [fingerprint(self.site.data)]
+        if aligned:
+            hashes.append(fingerprint(self.data_aligned))
+        return (self.site._name, self.site.geoloc, self.site.utc_offset, tuple(hashes))
+
+    def _stored_results(self, name:str, loc:str=None):
+        """
+        The stored results (update=True) of a method for a location (None: all stored locations),
+        if they were calculated from the current data and hold all categories. Otherwise None.
+        """
+        if (name not in self.results) or (name not in self._result_states):
+            return None
+        aligned, state = self._result_states[name]
+        if (state is None) or (state != self._data_state(aligned)):
+            return None
+        comps = {key: val for key, val in self.results[name].items() if (loc is None) or (key[0] == loc)}
+        categories = {}
+        for key in comps.keys():
+            categories.setdefault(key[:2], set()).add(str(key[2]))
+        if not len(categories) or any(cats != set(self.site.data["category"].astype(str).unique()) for cats in categories.values()):
+            return None
+        return comps
 
     @staticmethod
     def _validate(obj):
@@ -41,6 +141,35 @@ class Processing(object):
         # check for non valid categories
         utils.check_affiliation(obj.data["category"].unique(), obj.VALID_CATEGORY)
 
+    @staticmethod
+    def _engine_args(func, engine):
+        # only pass the engine to methods that actually offer one
+        if "engine" in inspect.signature(func).parameters.keys():
+            return {"engine": engine}
+        return {}
+
+    def _map(self, func, tasks):
+        """
+        Apply func to every tuple of arguments in tasks and return the results in the same order.
+
+        The tasks only hold the NumPy arrays of a location (part). They are processed serially by
+        default and distributed over a thread or process pool if n_jobs is not 1.
+        """
+        tasks = list(tasks)
+        if (self.n_jobs == 1) or (len(tasks) < 2):
+            return [func(*task) for task in tasks]
+        with self._pool() as pool:
+            return list(pool.map(func, *zip(*tasks)))
+
+    def _pool(self, n_jobs:int=None):
+        """
+        The thread or process pool of the backend with n_jobs workers (None: the n_jobs of the
+        Processing; None or -1 there uses all processors).
+        """
+        n_jobs = self.n_jobs if n_jobs is None else n_jobs
+        executor = ThreadPoolExecutor if (self.backend == "thread") else ProcessPoolExecutor
+        return executor(max_workers=None if (n_jobs in (None, -1)) else n_jobs)
+
     #TODO!: The method changes the site_obj itself. Maybe add_ET should return a new DataFrame, not self
     def ET_calc(self, et_comp:str='g'):
         self.site.add_ET(et_comp=et_comp)
@@ -58,9 +187,29 @@ class Processing(object):
         data = data.hgs.make_regular(**kwargs)
         data = data.hgs.BP_align(**BPalign_args)
         data.hgs.check_alignment() # check integrity
+        # keep the storage of the site data
+        if self.site.data.hgs.is_categorical:
+            data = data.hgs.to_categorical()
         self.data_regular = data
+        # the aligned arrays for the processing methods
+        self._aligned = (data, HgsAligned(data))
         return self
 
+    @property
+    def data_aligned(self):
+        """
+        The regular and aligned data as NumPy arrays (see HgsAligned). The data is made regular
+        and aligned on first use and the arrays follow changes of data_regular.
+        """
+        try:
+            data = self.data_regular
+        except AttributeError:
+            self.RegularAndAligned()
+            data = self.data_regular
+        if getattr(self, "_aligned", (None, None))[0] is not data:
+            self._aligned = (data, HgsAligned(data))
+        return self._aligned[1]
+
     #%% the "by_something" methods permanently modify the site data and with this methods can be chained together
     def by_dates(self, start=None, stop=None, utc_offset=None):
         print("Filter dataset by dates ...")
@@ -159,7 +308,8 @@ class Processing(object):
 
 
     #%% BE_time
-    def BE_time(self, method:str="all", derivative=True, update=False):
+    @memoize(aligned=True)
+    def BE_time(self, method:str="all", derivative=True, engine:str="numpy", batch:bool=False, update=False):
         print("-------------------------------------------------")
         print("Processing BE_time method ...")
         name = (inspect.currentframe().f_code.co_name).lower()
@@ -171,23 +321,54 @@ class Processing(object):
         method_dict = dict(zip(method_list,[i.replace("BE_", "").lower() for i in method_list]))
 
         # make GW data regular and align it with BP
-        try:
-            data = self.data_regular
-        except AttributeError:
-            self.RegularAndAligned()
-            data = self.data_regular
-            
-        # extract data categories
-        gw_data = data.hgs.filters.get_gw_data
-        bp_data = data.hgs.filters.get_bp_data
+        aligned = self.data_aligned
+
+        if method.lower() != 'all':
+            #check for non valid method
+            utils.check_affiliation(method, method_dict.values())
+
+        # evaluate all GW locations sharing a time axis at once
+        if batch:
+            batch_out = {}
+            for locs, datetime, BP, GW in self._shared_time_axes(aligned):
+                if derivative==True:
+                    BP, GW = np.diff(BP), np.diff(GW, axis=0)
+                    datetime = datetime[1:]
+
+                if method.lower() == 'all':
+                    batch_results = dict.fromkeys(method_dict.values())
+                    for key, val in method_dict.items():
+                        batch_results[val] = getattr(Time_domain, key)(BP, GW, **self._engine_args(getattr(Time_domain, key), engine))
+                else:
+                    be_method = getattr(Time_domain, list(method_dict.keys())[list(method_dict.values()).index(method)])
+                    batch_results = {method: be_method(BP, GW, **self._engine_args(be_method, engine))}
+
+                for i, gw_loc in enumerate(locs):
+                    data_group = pd.DataFrame(data = {"GW": GW[:, i], "BP": BP}, index=datetime, columns=["GW", "BP"])
+                    utils.dict_update(info, {"derivative": derivative, 'unit': '-', 'utc_offset': self.site.utc_offset[gw_loc[0]]})
+                    results = {key: val[i] for key, val in batch_results.items()}
+                    batch_out[gw_loc] = [results, data_group, info]
+                    print("Successfully calculated using method '{}' on GW data from '{}'!".format(method,str(gw_loc)))
+
+            # keep the order of the location-by-location results
+            out[name].update({gw_loc: batch_out[gw_loc] for gw_loc in sorted(batch_out.keys())})
+            keys = []
+        else:
+            keys = aligned.keys
 
-        grouped = gw_data.groupby(by=gw_data.hgs.filters.loc_part)
-        for gw_loc, GW in grouped:
-            # create GW datetime filter for BP data
-            datetime = GW.datetime
-            filter_gw = bp_data.datetime.isin(datetime)
-            BP = bp_data.loc[filter_gw,:].value.values
-            GW = GW.value.values
+        # select method
+        if method.lower() == 'all':
+            methods = list(method_dict.items())
+        else:
+            # pass the data to the right method in Time_domain using the method_dict
+            methods = [(list(method_dict.keys())[list(method_dict.values()).index(method)], method)]
+
+        tasks, groups = [], []
+        for gw_loc in keys:
+            # the BP data at the GW time axis
+            datetime = aligned.datetime(gw_loc)
+            BP = aligned.values(gw_loc, "BP")
+            GW = aligned.values(gw_loc, "GW")
 
             if derivative==True:
                BP, GW = np.diff(BP), np.diff(GW) # need to also divide by the time step length
@@ -195,20 +376,11 @@ class Processing(object):
 
             # aggregate data for results container
             data_group = pd.DataFrame(data = {"GW": GW, "BP": BP}, index=datetime, columns=["GW", "BP"])
-            utils.dict_update(info, {"derivative": derivative, 'unit': '-', 'utc_offset': self.site.utc_offset[gw_loc[0]]})
-
-            # select method
-            if method.lower() == 'all':
-                results = dict.fromkeys(method_dict.values())
-                for key, val in method_dict.items():
-                    results[val] = getattr(Time_domain, key)(BP, GW)
-
-            else:
-                #check for non valid method
-                utils.check_affiliation(method, method_dict.values())
-                # pass the data to the right method in Time_domain using the method_dict
-                results = {method: getattr(Time_domain, list(method_dict.keys())[list(method_dict.values()).index(method)])(BP,GW)}
+            groups.append((gw_loc, data_group))
+            tasks.append((BP, GW, methods, engine))
 
+        for (gw_loc, data_group), results in zip(groups, self._map(_be_time_task, tasks)):
+            utils.dict_update(info, {"derivative": derivative, 'unit': '-', 'utc_offset': self.site.utc_offset[gw_loc[0]]})
             # add results to the out dictionary
             out[name].update({gw_loc:[results, data_group, info]})
             print("Successfully calculated using method '{}' on GW data from '{}'!".format(method,str(gw_loc)))
@@ -218,6 +390,37 @@ class Processing(object):
 
         return out
 
+    @staticmethod
+    def _shared_time_axes(aligned):
+        """
+        Arrange GW locations in a time x location matrix, once for all locations.
+
+        Parameters
+        ----------
+        aligned : HgsAligned
+            The regular and aligned data (see Processing.data_aligned).
+
+        Yields
+        ------
+        locs : list
+            (location, part) identifiers of the matrix columns.
+        datetime : pd.DatetimeIndex
+            The time axis shared by these locations.
+        BP : N x 1 numpy array
+            Barometric pressure values at the shared time axis.
+        GW : N x M numpy array
+            Groundwater values, one column per location.
+        """
+        # group locations by identical time axes
+        axes = {}
+        for gw_loc in aligned.keys:
+            axes.setdefault(aligned.times(gw_loc, dropna=True).tobytes(), []).append(gw_loc)
+        for locs in axes.values():
+            datetime = pd.DatetimeIndex(aligned.datetime(locs[0], dropna=True), name="datetime")
+            valid = ~np.isnan(aligned.row(locs[0], "GW"))
+            GW = np.column_stack([aligned.values(gw_loc, "GW", dropna=True) for gw_loc in locs])
+            yield locs, datetime, aligned.row(locs[0], "BP")[valid], GW
+
     #%% BE_freq
     def BE_freq(self, method:str = "Rau", freq_method:str='hals', update=False):
         name = (inspect.currentframe().f_code.co_name).lower()
@@ -242,11 +445,10 @@ class Processing(object):
         info = {"site": self.site._name}
         out = {name:{}}
 
-        # !!! check if method results already exist to save time.
-        # Problematic if results was previously calculated without ET -> update can be buggy
-        try:
-            comps = self.results[freq_method.lower()]
-        except KeyError:
+        # use the stored results of the frequency method if they are valid for the current data
+        # (see _stored_results), repeated calculations are served from the cache
+        comps = self._stored_results(freq_method.lower())
+        if comps is None:
             comps = getattr(self, freq_method.lower())(update=update)[freq_method.lower()]
 
         # print("start")
@@ -264,7 +466,7 @@ class Processing(object):
 
         # create DataFrame for unique locations/parts
         df = pd.DataFrame.from_dict(comps,orient="index").reset_index().rename(columns={"level_0":"location","level_1":"part","level_2":"category"})
-        grouped = df.groupby(by=(["location","part"]))
+        grouped = df.groupby(by=(["location","part"]), observed=True)
         for group, val in grouped:
             print("-------------------------------------------------")
             print('Location: {}, Part: {}'.format(group[0], group[1]))
@@ -319,7 +521,18 @@ class Processing(object):
         return out
 
     #%% K_Ss_estimate
-    def K_Ss_estimate(self, loc:str, method:str=None, scr_len:float=0, case_rad:float=0, scr_rad:float=0, scr_depth:float=0, freq_method:str='hals', update=False):
+    def K_Ss_estimate(self, loc:str, method:str=None, scr_len:float=0, case_rad:float=0, scr_rad:float=0, scr_depth:float=0, freq_method:str='hals', engine:str="scipy",
+                      mc:int=0, tolerance:dict=None, seed:int=0, n_jobs:int=None, percentiles=(2.5, 50, 97.5), update=False):
+        """
+        Hydraulic conductivity and specific storage by Hsieh et al. (1987) or Wang (2000).
+
+        With mc > 0, the uncertainty is estimated from mc Monte Carlo realizations and stored as
+        'uncertainty' in the results (percentiles of K and Ss). The M2 components are resampled
+        from the HALS error variance and the well geometry from tolerance, a dict of standard
+        deviations (e.g. {'scr_len': 1, 'case_rad': 0.005}). The realizations are distributed over
+        the pool of the backend with deterministic seeding (see _k_ss_uncertainty). n_jobs=None
+        uses the n_jobs of the Processing, -1 all processors.
+        """
         name = (inspect.currentframe().f_code.co_name).lower()
         print("-------------------------------------------------")
         print("Method: {}".format(name))
@@ -348,21 +561,13 @@ class Processing(object):
         info = {"site": self.site._name}
         out = {name:{}}
 
-        # !!! check if method results already exist to save time.
-        # !!!! check that location exists
-
-        # Problematic if results was previously calculated without ET -> update can be buggy
-        # print(self.results[freq_method.lower()].keys())
-        comps = {}
-        if freq_method.lower() in self.results.keys():
-            for key, value in self.results[freq_method.lower()].items():
-                if key[0] == loc:
-                    comps[key] = value
-        else:
-            comps = getattr(self, freq_method.lower())(loc=loc, update=update)[freq_method.lower()]
-
-        if not len(comps):
-            comps = getattr(self, freq_method.lower())(loc=loc, update=update)[freq_method.lower()]
+        # use the stored results of the frequency method if they are valid for the current data
+        # (see _stored_results), repeated calculations are served from the cache
+        if loc not in self.site.data.loc[self.site.data["category"] == "GW", "location"].unique():
+            raise Exception("Location '{}' does not exist!".format(loc))
+        comps = self._stored_results(freq_method.lower(), loc=loc)
+        if comps is None:
+            comps = getattr(self, freq_method.lower())(loc=[loc], update=update)[freq_method.lower()]
 
         if not len(comps):
             raise Exception("Location '{}' does not exist!".format(loc))
@@ -385,13 +590,17 @@ class Processing(object):
         # create DataFrame for unique locations/parts
         df = pd.DataFrame.from_dict(comps,orient="index").reset_index().rename(columns={"level_0":"location","level_1":"part","level_2":"category"})
         # print(df)
-        grouped = df.groupby(by=(["location","part"]))
+        grouped = df.groupby(by=(["location","part"]), observed=True)
         for group, val in grouped:
             print('Location: {}, Part: {}'.format(group[0], group[1]))
             complex_dict = {}
+            sigma = {}
             for cat in val.category.unique():
                 # print(cat)
                 data = val[val["category"] == cat]
+                # standard deviation of the real and imaginary parts of the HALS coefficients
+                if ("error_var" in data.columns) and ("y_model" in data.columns):
+                    sigma[str(cat)] = np.sqrt(2*data["error_var"].iloc[0]/len(data["y_model"].iloc[0]))
 
                 for key,freq in freqs.items():
                     # print(key,freq)
@@ -416,7 +625,11 @@ class Processing(object):
                 if (scr_rad <=0):
                     raise Exception("For method '{}' the screen radius (scr_rad) must have a valid value!".format(method.lower()))
 
-                results = Freq_domain.K_Ss_Hsieh(complex_dict["ET_m2"], complex_dict["GW_m2"], scr_len, case_rad, scr_rad)
+                results = Freq_domain.K_Ss_Hsieh(complex_dict["ET_m2"], complex_dict["GW_m2"], scr_len, case_rad, scr_rad, engine=engine)
+                if (mc > 0):
+                    print("> Estimating the uncertainty from {:,d} realizations ...".format(mc))
+                    results["uncertainty"] = self._k_ss_uncertainty("hsieh", complex_dict["ET_m2"], complex_dict["GW_m2"], sigma,
+                            {"scr_len": scr_len, "case_rad": case_rad, "scr_rad": scr_rad}, tolerance or {}, mc, seed, n_jobs, engine, percentiles)
                 utils.dict_update(info, {'method': 'Hsieh', 'unit': 'm/s', 'utc_offset': self.site.utc_offset[group[0]]})
                 out[name].update({group:[results, data, info]})
                 pass
@@ -427,6 +640,10 @@ class Processing(object):
                     raise Exception("For method '{}' the screen depth (scr_depth) must have a valid value!".format(method.lower()))
 
                 results = Freq_domain.K_Ss_Wang(complex_dict["ET_m2"], complex_dict["GW_m2"], scr_depth)
+                if (mc > 0):
+                    print("> Estimating the uncertainty from {:,d} realizations ...".format(mc))
+                    results["uncertainty"] = self._k_ss_uncertainty("wang", complex_dict["ET_m2"], complex_dict["GW_m2"], sigma,
+                            {"scr_depth": scr_depth}, tolerance or {}, mc, seed, n_jobs, engine, percentiles)
                 utils.dict_update(info, {'method': 'Wang', 'unit': 'm/s', 'utc_offset': self.site.utc_offset[group[0]]})
                 out[name].update({group:[results,data,info]})
 
@@ -436,8 +653,44 @@ class Processing(object):
         return out
 
 
+    def _k_ss_uncertainty(self, method:str, ET_m2:complex, GW_m2:complex, sigma:dict, geometry:dict, tolerance:dict,
+                          mc:int, seed:int, n_jobs:int, engine:str, percentiles, chunk:int=100):
+        """
+        Percentiles of K and Ss from mc Monte Carlo realizations (Freq_domain.K_Ss_realizations).
+
+        The realizations are split into chunks with their own seeds spawned from seed, i.e. the
+        results do not depend on n_jobs. With n_jobs other than 1, the chunks are distributed over the
+        pool of the backend (see _pool). A summary is printed as chunks complete.
+        """
+        sizes = [min(chunk, mc - i) for i in range(0, mc, chunk)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        args = [(method, ET_m2, GW_m2, sigma, geometry, tolerance, s, n, engine) for s, n in zip(seeds, sizes)]
+        K = [None]*len(sizes)
+        Ss = [None]*len(sizes)
+
+        def summary(i, result):
+            K[i], Ss[i] = result
+            done = np.hstack([k for k in K if k is not None])
+            print("> {:,d}/{:,d} realizations, K [{}]: {} m/s".format(len(done), mc, ", ".join("{:g}%".format(p) for p in percentiles),
+                  ", ".join("{:.2e}".format(v) for v in np.nanpercentile(done, percentiles))))
+
+        if ((self.n_jobs if n_jobs is None else n_jobs) == 1) or (len(args) < 2):
+            for i, arg in enumerate(args):
+                summary(i, Freq_domain.K_Ss_realizations(*arg))
+        else:
+            with self._pool(n_jobs) as pool:
+                futures = {pool.submit(Freq_domain.K_Ss_realizations, *arg): i for i, arg in enumerate(args)}
+                for future in as_completed(futures):
+                    summary(futures[future], future.result())
+
+        K = np.hstack(K)
+        Ss = np.hstack(Ss)
+        return {'realizations': mc, 'failed': int(np.sum(np.isnan(K))), 'seed': seed, 'percentiles': np.array(percentiles),
+                'K': np.nanpercentile(K, percentiles), 'Ss': np.nanpercentile(Ss, percentiles), 'sigma': sigma, 'tolerance': tolerance}
+
     #%% auto correlation
-    def acorr(self, loc:list=None, update=False):
+    @memoize(aligned=True)
+    def acorr(self, loc:list=None, max_lag:float=None, update=False):
         #TODO! NOT adviced to use on site.data with non-aligned ET
         # !!! Check for data gaps implemented. See try/except with data_regular attribute
         name = (inspect.currentframe().f_code.co_name).lower()
@@ -448,47 +701,38 @@ class Processing(object):
         info = {"site": self.site._name}
         out = {name: {}}
         # make dataset regular
-        try:
-            data = self.data_regular
-        except AttributeError:
-            self.RegularAndAligned()
-            data = self.data_regular
-            
-        categories  = data.category.unique()
-            
-        # grouping by location and parts (loc_part)
-        gw_data     = data.hgs.filters.get_gw_data
-        grouped = gw_data.groupby(by=gw_data.hgs.filters.loc_part)
+        aligned = self.data_aligned
         
-        for gw_loc, GW in grouped:
+        tasks, groups = [], []
+        # by location and parts (loc_part)
+        for gw_loc in aligned.keys:
             if (loc is None) or (gw_loc[0] in loc):
                 print('Calculating auto-correlation for location: {}'.format(gw_loc[0]))
                     
                 # loop through categories
-                for cat in categories:
+                for cat in aligned.categories:
                     print('Data category: {}'.format(cat))
                     ident = (*gw_loc, cat)
-                    # print(ident)
-                    if cat != "GW":
-                        group = getattr(data.hgs.filters, utils.join_tuple_string(("get", cat.lower(), "data")))
-                        filter_gw = group.datetime.isin(GW.datetime)
-                        group = group.loc[filter_gw,:]
-                    else:
-                        group = GW
+                    # the entries of the category at the GW time axis
+                    datetime = aligned.datetime(gw_loc, cat)
+                    values   = aligned.values(gw_loc, cat)
 
                     # calculate time lags in days
-                    ps      = group.hgs.dt.spl_period(unit='h')/24
-                    lags = np.arange(0., len(GW)*ps/2, ps)
-                    coeff = Time_domain.acorr(group.value.values)
-                    # apply the auto correlation method
-                    results  = {'lags': lags[:len(coeff)], 'coeff': coeff}
-
-                    # slim data container
-                    data_group = pd.DataFrame(data = {cat: group.value.values}, index=group.datetime)
-                    # nested output dict with list for [results, data, info]
-                    utils.dict_update(info, {'unit': data.hgs.get_loc_unit(cat=cat), 'utc_offset': self.site.utc_offset[gw_loc[0]]})
-
-                    out[name].update({ident: [results, data_group, info]})
+                    ps      = Time(datetime).spl_period(unit='h')/24
+                    maxlag  = None if max_lag is None else int(np.floor(max_lag/ps))
+                    groups.append((gw_loc, cat, ident, ps, datetime, values))
+                    tasks.append((values, maxlag))
+
+        # apply the auto correlation method
+        for (gw_loc, cat, ident, ps, datetime, values), coeff in zip(groups, self._map(Time_domain.acorr, tasks)):
+            results  = {'lags': np.arange(len(coeff))*ps, 'coeff': coeff}
+
+            # slim data container
+            data_group = pd.DataFrame(data = {cat: values}, index=datetime)
+            # nested output dict with list for [results, data, info]
+            utils.dict_update(info, {'unit': aligned.units[cat], 'utc_offset': self.site.utc_offset[gw_loc[0]]})
+
+            out[name].update({ident: [results, data_group, info]})
                     
         if not len(out[name]):
             raise Exception("Please use at least one valid location for '{}'!".format(name))
@@ -499,7 +743,8 @@ class Processing(object):
         return out
 
     #%% cross correlation
-    def xcorr(self, loc:list=None, update=False):
+    @memoize(aligned=True)
+    def xcorr(self, loc:list=None, max_lag:float=None, update=False):
         #TODO! NOT adviced to use on site.data with non-aligned ET
         # !!! Check for data gaps implemented. See try/except with data_regular attribute
         name = (inspect.currentframe().f_code.co_name).lower()
@@ -510,73 +755,47 @@ class Processing(object):
         info = {"site": self.site._name}
         out = {name: {}}
         # make dataset regular
-        try:
-            data = self.data_regular
-        except AttributeError:
-            self.RegularAndAligned()
-            data = self.data_regular
-            
-        categories  = data.category.unique()
+        aligned = self.data_aligned
+        categories  = aligned.categories
         
-        # grouping by location and parts (loc_part)
-        gw_data     = data.hgs.filters.get_gw_data
-        grouped = gw_data.groupby(by=gw_data.hgs.filters.loc_part)
-    
-        
-        for gw_loc, GW in grouped:
+        tasks, locations = [], []
+        # by location and parts (loc_part)
+        for gw_loc in aligned.keys:
             if (loc is None) or (gw_loc[0] in loc):
                 print('Calculating cross-correlation for location: {}'.format(gw_loc[0]))
                 
-                # loop through first categories
+                # the entries of every category at the GW time axis
+                groups = {cat: (aligned.datetime(gw_loc, cat), aligned.values(gw_loc, cat)) for cat in categories}
+                
+                # all pairs of different categories
+                pairs = []
                 for i in range(len(categories)):
-
-                    cat1 = categories[i]
-                    
-                    # print(ident)
-                    if cat1 != "GW":
-                        group1 = getattr(data.hgs.filters, utils.join_tuple_string(("get", cat1.lower(), "data")))
-                        filter_gw = group1.datetime.isin(GW.datetime)
-                        group1 = group1.loc[filter_gw,:]
-                    else:
-                        group1 = GW
-                    
-                    # the first data
-                    data1 = group1.value.values
-                    
-                    # calculate time lags in days
-                    ps = group1.hgs.dt.spl_period(unit='h')/24
-                    lags = np.arange(0., len(GW)*ps/2, ps)
-                    
-                    # loop through consecutive categories
                     for j in range(i, len(categories)):
-                        
-                        cat2 = categories[j]
                         # only calculate if not equal category !
-                        if cat1 != cat2:
-                            print('Data categories: {}-{}'.format(cat1, cat2))
-                            ident = (*gw_loc, cat1, cat2)
-                            # print(ident)
-                            if cat2 != "GW":
-                                group2 = getattr(data.hgs.filters, utils.join_tuple_string(("get", cat2.lower(), "data")))
-                                filter_gw = group2.datetime.isin(GW.datetime)
-                                group2 = group2.loc[filter_gw,:]
-                            else:
-                                group2 = GW
-                            
-                            # the second data 
-                            data2 = group2.value.values
-                            
-                            # calculate cross-correlation
-                            coeff = Time_domain.xcorr(data1, data2)
-                            # apply the auto correlation method
-                            results  = {'lags': lags[:len(coeff)], 'coeff': coeff}
-                            
-                            # slim data container
-                            data_group = pd.DataFrame(data = {cat1: group1.value.values, cat2: group2.value.values}, index=group1.datetime)
-                            # nested output dict with list for [results, data, info]
-                            utils.dict_update(info, {'unit': data.hgs.get_loc_unit(cat=cat1), 'utc_offset': self.site.utc_offset[gw_loc[0]]})
-                            
-                            out[name].update({ident: [results, data_group, info]})
+                        if categories[i] != categories[j]:
+                            pairs.append((categories[i], categories[j]))
+                
+                # calculate time lags in days
+                ps = {cat: Time(groups[cat][0]).spl_period(unit='h')/24 for cat in categories}
+                maxlag = {cat: None if max_lag is None else int(np.floor(max_lag/ps[cat])) for cat in categories}
+                locations.append((gw_loc, groups, pairs, ps))
+                tasks.append(({cat: groups[cat][1] for cat in categories}, pairs, [maxlag[pair[0]] for pair in pairs]))
+        
+        # calculate cross-correlation
+        for (gw_loc, groups, pairs, ps), coeffs in zip(locations, self._map(_xcorr_task, tasks)):
+            for (cat1, cat2), coeff in zip(pairs, coeffs):
+                print('Data categories: {}-{}'.format(cat1, cat2))
+                ident = (*gw_loc, cat1, cat2)
+                group1, group2 = groups[cat1], groups[cat2]
+                # apply the auto correlation method
+                results  = {'lags': np.arange(len(coeff))*ps[cat1], 'coeff': coeff}
+                
+                # slim data container
+                data_group = pd.DataFrame(data = {cat1: group1[1], cat2: group2[1]}, index=group1[0])
+                # nested output dict with list for [results, data, info]
+                utils.dict_update(info, {'unit': aligned.units[cat1], 'utc_offset': self.site.utc_offset[gw_loc[0]]})
+                
+                out[name].update({ident: [results, data_group, info]})
                     
         if not len(out[name]):
             raise Exception("Please use at least one valid location for '{}'!".format(name))
@@ -588,7 +807,13 @@ class Processing(object):
     
 
     #%% fft
-    def fft(self, loc:list=None, detrend:bool=True, update:bool=False):
+    @memoize(aligned=True)
+    def fft(self, loc:list=None, detrend:bool=True, targeted:bool=False, update:bool=False):
+        """
+        Amplitude spectra of the regular and aligned data.
+        With targeted=True only the FFT bins of the tidal components of every category are
+        calculated (see Freq_domain.fft_comp), which is sufficient for BE_freq and K_Ss_estimate.
+        """
         #TODO! NOT adviced to use on site.data with non-aligned ET
         # !!! Check for data gaps implemented. See try/except with data_regular attribute
         name = (inspect.currentframe().f_code.co_name).lower()
@@ -599,52 +824,40 @@ class Processing(object):
         info = {"site": self.site._name}
         out = {name:{}}
         # make dataset regular
-        try:
-            data = self.data_regular
-        except AttributeError:
-            self.RegularAndAligned()
-            data = self.data_regular
-
-        gw_data     = data.hgs.filters.get_gw_data
-        categories  = data.category.unique()
-        # grouping by location and parts (loc_part)
-        grouped = gw_data.groupby(by=gw_data.hgs.filters.loc_part)
-        for gw_loc, GW in grouped:
+        aligned = self.data_aligned
+        tasks, groups = [], []
+        # by location and parts (loc_part)
+        for gw_loc in aligned.keys:
             if (loc is None) or (gw_loc[0] in loc):
                 print('Calculating FFT for location: {}'.format(gw_loc[0]))
                 # loop through categories
-                for cat in categories:
+                for cat in aligned.categories:
                     print('Data category: {}'.format(cat))
                     ident = (*gw_loc, cat)
                     # print(ident)
                     #ET = ET, GW = {ET, AT}, BP = AT
                     comps = Site.comp_select(cat)
-                    if cat != "GW":
-                        group = getattr(data.hgs.filters, utils.join_tuple_string(("get", cat.lower(), "data")))
-                        filter_gw = group.datetime.isin(GW.datetime)
-                        group = group.loc[filter_gw,:]
-                    else:
-                        group = GW
                     
                     #??? is drop NaN here correct???
-                    group   = group.hgs.filters.drop_nan
-                    tf      = group.hgs.dt.to_zero
-                    values  = group.value.values
+                    group   = (aligned.datetime(gw_loc, cat, dropna=True), aligned.values(gw_loc, cat, dropna=True))
+                    tf      = aligned.to_zero(gw_loc, cat, dropna=True)
                     # apply detrending and signal processing
-                    if detrend:
-                        values  = Freq_domain.lin_window_ovrlp(tf, values)
-                    values  = Freq_domain.fft_comp(tf, values)
-                    # calculate real Amplitude and Phase
-                    results = utils.complex_to_real(tf, values["complex"])
-                    results["comps"] = list(comps.keys())
-                    results.update(values)
-                    #slim data container
-                    data_group = pd.DataFrame(data = {cat:group.value.values}, index=group.datetime)
-                    # nested output dict with list for [results, data, info]
-                    utils.dict_update(info, {'unit': data.hgs.get_loc_unit(cat=cat), 'ET_unit': data.hgs.get_loc_unit(cat='ET'),
-                            'utc_offset': self.site.utc_offset[gw_loc[0]]})
-
-                    out[name].update({ident: [results, data_group, info]})
+                    freqs   = [i["freq"] for i in comps.values()] if targeted else None
+                    groups.append((gw_loc, cat, ident, comps, group, tf))
+                    tasks.append((tf, group[1], freqs, detrend))
+
+        for (gw_loc, cat, ident, comps, group, tf), values in zip(groups, self._map(_fft_task, tasks)):
+            # calculate real Amplitude and Phase
+            results = utils.complex_to_real(tf, values["complex"])
+            results["comps"] = list(comps.keys())
+            results.update(values)
+            #slim data container
+            data_group = pd.DataFrame(data = {cat:group[1]}, index=group[0])
+            # nested output dict with list for [results, data, info]
+            utils.dict_update(info, {'unit': aligned.units[cat], 'ET_unit': aligned.units.get('ET', False),
+                    'utc_offset': self.site.utc_offset[gw_loc[0]]})
+
+            out[name].update({ident: [results, data_group, info]})
 
         if not len(out[name]):
             raise Exception("Please use at least one valid location for '{}'!".format(name))
@@ -655,7 +868,8 @@ class Processing(object):
         return out
 
     #%% hals
-    def hals(self, loc:list=None, detrend=True, update=False):
+    @memoize()
+    def hals(self, loc:list=None, detrend=True, batch:bool=False, update=False):
         #!!! ALLOW DATA GAPS HERE !!!! -> they are allow as data_regular is not enforced as in fft
         name = (inspect.currentframe().f_code.co_name).lower()
         print("-------------------------------------------------")
@@ -668,15 +882,15 @@ class Processing(object):
         gw_data     = data.hgs.filters.get_gw_data
         categories  = data.category.unique()
         # grouping by location and parts (loc_part)
-        grouped = gw_data.groupby(by=gw_data.hgs.filters.loc_part)
+        grouped = gw_data.groupby(by=gw_data.hgs.filters.loc_part, observed=True)
+        series = []
         for gw_loc, GW in grouped:
             # filter by location, if required
             if (loc is None) or (gw_loc[0] in loc):
                 print("-------------------------------------------------")
-                print('> Calculating HALS for location: {}'.format(gw_loc[0]))
+                print('> Preparing HALS for location: {}'.format(gw_loc[0]))
                 # loop through categories
                 for cat in categories:
-                    print('Data category: {}'.format(cat))
                     ident = (*gw_loc, cat)
                     # print(ident)
                     #ET = ET, GW = {ET, AT}, BP = AT
@@ -699,21 +913,41 @@ class Processing(object):
                     group   = group.hgs.filters.drop_nan
                     tf      = group.hgs.dt.to_zero
                     values  = group.value.values
-                    # apply detrending and signal processing
-                    if detrend:
-                        values  = Freq_domain.lin_window_ovrlp(tf, values)
-                    values  = Freq_domain.harmonic_lsqr(tf, values, freqs)
-                    # calculate real Amplitude and Phase
-                    results = utils.complex_to_real(tf, values["complex"])
-                    results["component"] = list(comps.keys())
-                    results.update(values)
-                    # slim data container
-                    data_group = pd.DataFrame(data = {cat:group.value.values}, index=group.datetime)
-                    # nested output dict with list for [results, data, info]
-                    # print(cat)
-                    utils.dict_update(info, {'unit': data.hgs.get_loc_unit(cat=cat), 'ET_unit': data.hgs.get_loc_unit(cat='ET'),
-                            'utc_offset': self.site.utc_offset[gw_loc[0]]})
-                    out[name].update({ident: [results, data_group, info]})
+                    series.append((gw_loc, cat, ident, comps, freqs, group, tf, values))
+        
+        # the HALS fits: series of the same category with the same sample times share one factorization
+        fits = {}
+        if batch:
+            # apply detrending and signal processing
+            if detrend:
+                detrended = self._map(Freq_domain.lin_window_ovrlp, [(item[6], item[7]) for item in series])
+                series = [item[:7] + (values,) for item, values in zip(series, detrended)]
+            batches = {}
+            for i, (gw_loc, cat, ident, comps, freqs, group, tf, values) in enumerate(series):
+                batches.setdefault((cat, tuple(freqs), tf.tobytes()), []).append(i)
+            for key, idx in batches.items():
+                print('> Calculating HALS for category {} at {} location(s) ...'.format(key[0], len(idx)))
+            tasks = [(series[idx[0]][6], np.column_stack([series[i][7] for i in idx]), series[idx[0]][4]) for idx in batches.values()]
+            for idx, batch_fits in zip(batches.values(), self._map(Freq_domain.harmonic_lsqr_batch, tasks)):
+                fits.update(zip(idx, batch_fits))
+        else:
+            for gw_loc, cat, ident, comps, freqs, group, tf, values in series:
+                print('> Calculating HALS for location: {}, data category: {}'.format(gw_loc[0], cat))
+            fits = dict(enumerate(self._map(_hals_task, [(tf, values, freqs, detrend) for gw_loc, cat, ident, comps, freqs, group, tf, values in series])))
+        
+        for i, (gw_loc, cat, ident, comps, freqs, group, tf, values) in enumerate(series):
+            values = fits[i]
+            # calculate real Amplitude and Phase
+            results = utils.complex_to_real(tf, values["complex"])
+            results["component"] = list(comps.keys())
+            results.update(values)
+            # slim data container
+            data_group = pd.DataFrame(data = {cat:group.value.values}, index=group.datetime)
+            # nested output dict with list for [results, data, info]
+            # print(cat)
+            utils.dict_update(info, {'unit': data.hgs.get_loc_unit(cat=cat), 'ET_unit': data.hgs.get_loc_unit(cat='ET'),
+                    'utc_offset': self.site.utc_offset[gw_loc[0]]})
+            out[name].update({ident: [results, data_group, info]})
 
         if not len(out[name]):
             raise Exception("Please use at least one valid location for '{}'!".format(name))
@@ -723,21 +957,65 @@ class Processing(object):
 
         return out
 
-    #%% GW_correct
-    def GW_correct(self, lag_h=24, et_method:str=None, fqs=None, update=False):
-        name    = (inspect.currentframe().f_code.co_name)
-        # print(name)
+    #%% online hals
+    def hals_online(self, loc:list=None, cat:str="GW", forgetting:float=1.0, update=False):
+        """
+        Seed online HALS estimators (recursive least squares) from the data of every GW location.
+
+        The estimators are stored as 'estimator' in the results and take new samples with
+        estimator.update(tf, value), where tf is the time float in days since 1970-01-01 in the
+        time zone of the data (datetime.hgs.dt.to_num). The current amplitude and phase of the
+        tidal components are returned by estimator.results(), with the phases referred to the first
+        sample as in hals. The data are not detrended.
+        """
+        name = (inspect.currentframe().f_code.co_name).lower()
         print("-------------------------------------------------")
         print("Method: {}".format(name))
-        sig     = inspect.signature(getattr(Processing, name))
-        #info = {lag_h}
-        #print(sig,info)
-        #TODO!: define dictionary with valid et_methods to use the utils.check_affiliation() method
-        # output dict
-        name = name.lower()
-        info = {"site": self.site._name}
+        info = {"site": self.site._name, "forgetting": forgetting}
         out = {name:{}}
+        data        = self.site.data
+        gw_data     = data.hgs.filters.get_gw_data
+        comps       = Site.comp_select(cat)
+        freqs       = [i["freq"] for i in comps.values()]
+        grouped = gw_data.groupby(by=gw_data.hgs.filters.loc_part, observed=True)
+        for gw_loc, GW in grouped:
+            if (loc is None) or (gw_loc[0] in loc):
+                print("-------------------------------------------------")
+                print('> Seeding online HALS for location: {}'.format(gw_loc[0]))
+                if cat != "GW":
+                    group = getattr(data.hgs.filters, utils.join_tuple_string(("get", cat.lower(), "data")))
+                    group = group.loc[(group["datetime"] >= GW["datetime"].min()) & (group["datetime"] <= GW["datetime"].max())]
+                else:
+                    group = GW
+                group = group.hgs.filters.drop_nan
+                if ((group.datetime.max() - group.datetime.min()) < pd.Timedelta(days=20)):
+                    raise Exception("To use HALS, the duration must be >=20 days!")
+                tf = group.hgs.dt.to_num
+                estimator = Harmonic_rls.from_batch(tf, group.value.values, freqs, forgetting=forgetting)
+                results = estimator.results()
+                results["component"] = list(comps.keys())
+                results["estimator"] = estimator
+                data_group = pd.DataFrame(data = {cat:group.value.values}, index=group.datetime)
+                utils.dict_update(info, {'unit': data.hgs.get_loc_unit(cat=cat), 'ET_unit': data.hgs.get_loc_unit(cat='ET'),
+                        'utc_offset': self.site.utc_offset[gw_loc[0]]})
+                out[name].update({(*gw_loc, cat): [results, data_group, info]})
+
+        if not len(out[name]):
+            raise Exception("Please use at least one valid location for '{}'!".format(name))
+
+        if update:
+            utils.dict_update(self.results, out)
+
+        return out
+
+    #%% GW_correct
+    def _gw_correct_data(self, et_method:str=None):
+        """
+        Generator over the regular and aligned GW locations for the regression deconvolution.
 
+        Yields the group key, the time in days, the datetime, the GW, BP and (optional) ET values,
+        the ET unit and the aligned data set.
+        """
         # make GW data regular and align it with BP
         try:
             data = self.data_regular
@@ -746,50 +1024,77 @@ class Processing(object):
             data = self.data_regular
             data.hgs.check_alignment(cat="BP")
 
+        aligned = self.data_aligned
+
         ## check integrity of ET data
         # ET data is already present and needed
+        et_data = None
         if ((et_method not in (None, "hals")) and ('ET' in self.site.data["category"].unique())):
             ## check if et is aligned
-            if data.hgs.check_alignment(cat="ET"):
-                et_data = data.hgs.filters.get_et_data
-            else:
+            if not aligned.is_aligned(cat="ET"):
                 # there's something going on here ...
                 et_data = etides.calc_ET_align(data, geoloc=self.site.geoloc)
                 print("ET was recalculated and aligned")
-        else:
-            et_data = None
             #et_data = etides.calc_ET_align(data,geoloc=self.site.geoloc)
 
-        # extract data categories
-        gw_data = data.hgs.filters.get_gw_data
-        bp_data = data.hgs.filters.get_bp_data
-
-        grouped = gw_data.groupby(by=gw_data.hgs.filters.loc_part)
-        for gw_loc, GW in grouped:
+        for gw_loc in aligned.keys:
             print("-------------------------------------------------")
             print('> Correcting GW for location: {}'.format(gw_loc[0]))
             # print(gw_loc)
-            tf = GW.hgs.dt.to_zero # same results as delta function with utc offset = None
-            datetime = GW.datetime
-            filter_gw = bp_data.datetime.isin(datetime)
-            BP = bp_data.loc[filter_gw,:].value.values
+            tf = aligned.to_zero(gw_loc) # same results as delta function with utc offset = None
+            datetime = aligned.datetime(gw_loc)
+            BP = aligned.values(gw_loc, "BP")
+            et_unit = None
             if et_method in (None, "hals"):
                 ET = None
             elif et_method == 'ts':
-                if et_data is None:
+                if 'ET' not in aligned.categories:
+                    gw_data = data.hgs.filters.get_gw_data
+                    GW = gw_data[(gw_data["location"] == gw_loc[0]) & (gw_data["part"] == gw_loc[1])]
                     ET = etides.calc_ET_align(GW, geoloc=self.site.geoloc)
                     ET = ET.value.values
                     et_unit = 'm**2/s**2'
-                else:
+                elif et_data is not None:
                     filter_gw = et_data.datetime.isin(datetime)
                     ET = et_data.loc[filter_gw,:].value.values
                     et_unit = data.hgs.get_loc_unit(cat='ET')
+                else:
+                    ET = aligned.values(gw_loc, "ET")
+                    et_unit = aligned.units['ET']
             else:
                 raise Exception("Error: Specified 'et_method' is not available!")
             
-            GW = GW.value.values
+            GW = aligned.values(gw_loc, "GW")
+            yield gw_loc, tf, datetime, GW, BP, ET, et_unit, data
+
+    @memoize(aligned=True)
+    def GW_correct(self, lag_h=24, et_method:str=None, fqs=None, solver:str="auto", update=False):
+        """
+        Barometric (and Earth tide) response functions and corrected GW heads by regression
+        deconvolution (see Time_domain.regress_deconv).
+        The lagged regressors are Lag_operator objects. solver="cholesky" forms the normal
+        equations from them directly, i.e. without the lagged matrices in memory, while "qr" (and
+        "curve_fit") builds the dense N x (nlag+1) matrices via dense(). The default "auto" uses
+        "qr" for small and for ill-conditioned problems and "cholesky" where the dense matrices
+        exceed Time_domain.DENSE_MAX entries.
+        """
+        name    = (inspect.currentframe().f_code.co_name)
+        # print(name)
+        print("-------------------------------------------------")
+        print("Method: {}".format(name))
+        sig     = inspect.signature(getattr(Processing, name))
+        #info = {lag_h}
+        #print(sig,info)
+        #TODO!: define dictionary with valid et_methods to use the utils.check_affiliation() method
+        # output dict
+        name = name.lower()
+        info = {"site": self.site._name}
+        out = {name:{}}
+
+        groups = list(self._gw_correct_data(et_method))
+        tasks = [(tf, GW, BP, ET, lag_h, et_method, fqs, solver) for gw_loc, tf, datetime, GW, BP, ET, et_unit, data in groups]
+        for (gw_loc, tf, datetime, GW, BP, ET, et_unit, data), (WLc, results) in zip(groups, self._map(Time_domain.regress_deconv, tasks)):
             # print("ET METHOD ", et_method)
-            WLc, results = Time_domain.regress_deconv(tf, GW, BP, ET, lag_h=lag_h, et_method=et_method, fqs=fqs)
             results["WLc"] = WLc
             
             # add results to the out dictionary
@@ -806,3 +1111,41 @@ class Processing(object):
             utils.dict_update(self.results, out)
 
         return out
+
+    @memoize(aligned=True)
+    def GW_correct_rolling(self, lag_h=24, et_method:str=None, fqs=None, window:float=30, step:float=1, update=False):
+        name    = (inspect.currentframe().f_code.co_name)
+        print("-------------------------------------------------")
+        print("Method: {}".format(name))
+        sig     = inspect.signature(getattr(Processing, name))
+        # output dict
+        name = name.lower()
+        info = {"site": self.site._name}
+        out = {name:{}}
+
+        groups = list(self._gw_correct_data(et_method))
+        tasks = [(tf, GW, BP, ET, lag_h, et_method, fqs, window, step) for gw_loc, tf, datetime, GW, BP, ET, et_unit, data in groups]
+        for (gw_loc, tf, datetime, GW, BP, ET, et_unit, data), (tw, results) in zip(groups, self._map(Time_domain.regress_deconv_rolling, tasks)):
+            # the response functions as tables indexed by the end of each window
+            index = pd.DatetimeIndex(datetime.values[tw], name="datetime")
+            for rf in results.values():
+                for key, val in rf.items():
+                    if key in ("irc", "irc_stdev", "brf", "crf_stdev"):
+                        rf[key] = pd.DataFrame(val, index=index, columns=rf["lag"])
+                    elif key == "complex":
+                        rf[key] = pd.DataFrame(val, index=index, columns=rf["freq"])
+            
+            # add results to the out dictionary
+            if et_method in (None, 'hals'):
+                data_group = pd.DataFrame(data = {"GW": GW,"BP": BP}, index=datetime, columns=["GW","BP"])
+                utils.dict_update(info, {'info': sig.parameters, 'unit': data.hgs.get_loc_unit(), 'utc_offset': self.site.utc_offset[gw_loc[0]]})
+            else:
+                data_group = pd.DataFrame(data = {"GW": GW,"BP": BP,"ET": ET}, index=datetime, columns=["GW","BP","ET"])
+                utils.dict_update(info, {'info': sig.parameters, 'unit': data.hgs.get_loc_unit(), 'ET_unit': et_unit, 'utc_offset': self.site.utc_offset[gw_loc[0]]})
+
+            out[name].update({gw_loc: [results, data_group, info]})
+
+        if update:
+            utils.dict_update(self.results, out)
+
+        return out
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Memoization of the Processing results.
+"""
+import os
+import pickle
+import hashlib
+import inspect
+import functools
+from copy import deepcopy
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+
+from .. import utils
+
+def fingerprint(data):
+    ''' The hash of a DataFrame (values of all columns, without the index) or of the arrays of HgsAligned '''
+    if data is None:
+        return None
+    sha = hashlib.sha1()
+    if isinstance(data, pd.DataFrame):
+        sha.update(np.ascontiguousarray(pd.util.hash_pandas_object(data, index=False).values).tobytes())
+    else:
+        sha.update(repr((data.keys, data.categories, data.units)).encode())
+        for t, values in zip(data.axes, data.arrays):
+            sha.update(t.tobytes())
+            sha.update(values.tobytes())
+    return sha.hexdigest()
+
+def normalize(value):
+    ''' A stable text representation of a method parameter '''
+    if isinstance(value, dict):
+        return "{" + ",".join("{}:{}".format(normalize(k), normalize(v)) for k, v in sorted(value.items(), key=lambda item: str(item[0]))) + "}"
+    if isinstance(value, (list, tuple, set, np.ndarray)):
+        items = [normalize(v) for v in (np.asarray(value).ravel() if isinstance(value, np.ndarray) else value)]
+        # the order of a set is not defined
+        return "(" + ",".join(sorted(items) if isinstance(value, set) else items) + ")"
+    if isinstance(value, (float, np.floating)):
+        return repr(float(value))
+    if isinstance(value, (bool, np.bool_)):
+        return repr(bool(value))
+    if isinstance(value, (int, np.integer)):
+        return repr(int(value))
+    return repr(value)
+
+class Result_cache(object):
+    """
+    LRU cache of the results of Processing methods.
+
+    Every entry is keyed on the method, its normalized parameters (without update), the selected
+    locations, the site name, geo-location and UTC offsets and the hash of the input data, i.e. a
+    changed dataset (by_dates, by_gwloc, decimate, ET_calc, RegularAndAligned) never reuses old
+    results. The max_entries most recently used results are held in memory. With a folder, the
+    results are also stored on disk (pickle) and the least recently used files are deleted once
+    the folder exceeds max_bytes. One cache can be shared by several Processing objects.
+    """
+    MAX_ENTRIES = 32
+    MAX_BYTES   = 512*2**20
+
+    def __init__(self, max_entries:int=None, folder:str=None, max_bytes:int=None):
+        self.max_entries = self.MAX_ENTRIES if max_entries is None else int(max_entries)
+        self.folder = folder
+        self.max_bytes = self.MAX_BYTES if max_bytes is None else int(max_bytes)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    #%% keys and storage
+    @staticmethod
+    def key(method:str, params:dict, loc, state:tuple):
+        ''' The hash of the method, its parameters, the locations and the state of the input data '''
+        text = "|".join((method, normalize(params), normalize(loc), normalize(state)))
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def path(self, key:str):
+        return os.path.join(self.folder, key + ".pkl")
+
+    def get(self, key:str):
+        ''' The cached results or None '''
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+        if self.folder is None:
+            return None
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                out = pickle.load(f)
+        except Exception:
+            # a damaged entry is calculated again
+            return None
+        # mark as recently used
+        os.utime(path)
+        self._store(key, out)
+        return out
+
+    def put(self, key:str, out:dict):
+        self._store(key, out)
+        if self.folder is not None:
+            os.makedirs(self.folder, exist_ok=True)
+            tmp = self.path(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(out, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # replace atomically
+            os.replace(tmp, self.path(key))
+            self.evict(keep=key)
+
+    def _store(self, key:str, out:dict):
+        self._entries[key] = out
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(self.folder, f)) for f in os.listdir(self.folder) if f.endswith(".pkl")) if (self.folder is not None) and os.path.isdir(self.folder) else 0
+
+    def evict(self, keep:str=None):
+        ''' Delete the least recently used files until the folder is smaller than max_bytes '''
+        if (self.folder is None) or not os.path.isdir(self.folder):
+            return
+        files = sorted([os.path.join(self.folder, f) for f in os.listdir(self.folder) if f.endswith(".pkl")], key=os.path.getmtime)
+        total = sum(os.path.getsize(f) for f in files)
+        for f in files:
+            if total <= self.max_bytes:
+                break
+            if (keep is not None) and (os.path.basename(f) == keep + ".pkl"):
+                continue
+            total -= os.path.getsize(f)
+            os.remove(f)
+
+    def clear(self):
+        self._entries.clear()
+        if (self.folder is not None) and os.path.isdir(self.folder):
+            for f in os.listdir(self.folder):
+                if f.endswith(".pkl"):
+                    os.remove(os.path.join(self.folder, f))
+
+def memoize(aligned:bool=False):
+    """
+    Decorator of Processing methods that serves repeated calls from Processing.cache.
+
+    The results depend on the site data and, with aligned=True, on the regular and aligned data
+    (see Processing.data_aligned). A call for a subset of the locations (loc) is also served from
+    the cached results of all locations (loc=None). The cache holds a deep copy of the results and
+    every hit returns a new deep copy, so the caller may modify them. With update=True, the state of the input data is recorded along with
+    the stored results (see Processing._stored_results).
+    """
+    def decorator(func):
+        sig = inspect.signature(func)
+        name = func.__name__.lower()
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            cache = getattr(self, "cache", None)
+            params = sig.bind(self, *args, **kwargs)
+            params.apply_defaults()
+            params = dict(params.arguments)
+            del params["self"]
+            update = params.pop("update", False)
+            loc = params.pop("loc", None)
+            if (cache is None) and not update:
+                return func(self, *args, **kwargs)
+            state = self._data_state(aligned)
+            if update:
+                # stored results of different data states are not reused
+                valid = (name not in self.results) or (self._result_states.get(name) == (aligned, state))
+                self._result_states[name] = (aligned, state if valid else None)
+            if cache is None:
+                return func(self, *args, **kwargs)
+
+            key = cache.key(name, params, loc, state)
+            out = cache.get(key)
+            if (out is None) and (loc is not None):
+                # the subset of the results of all locations
+                full = cache.get(cache.key(name, params, None, state))
+                if full is not None:
+                    subset = {ident: val for ident, val in full[name].items() if ident[0] in loc}
+                    out = {name: subset} if len(subset) else None
+            if out is None:
+                cache.misses += 1
+                out = func(self, *args, **kwargs)
+                # the cached copy is not linked to the results of this call
+                cache.put(key, deepcopy({name: out[name]}))
+                return out
+            cache.hits += 1
+            print("-------------------------------------------------")
+            print("Method: {} (loaded from the cache)".format(name))
+            out = deepcopy({name: out[name]})
+            if update:
+                utils.dict_update(self.results, out)
+            return out
+        return wrapper
+    return decorator
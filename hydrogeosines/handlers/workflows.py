@@ -1,7 +1,193 @@
+# -*- coding: utf-8 -*-
 """
+Standard workflows over many sites.
+
 # future developments
-- include multiple Sites,
 - include mutlitpe Processings and Views into one major workflow
 -> standard workflows most commonly used by USERS
-    
-"""
\ No newline at end of file
+
+"""
+
+import os
+import json
+import time
+import pickle
+import traceback
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from ..models.site import Site
+from .processing import Processing
+from ..view.output import Output
+from .. import utils
+
+def run_site(entry:dict, pipeline:list, folder:str, save_results:bool=True, verbose:bool=False):
+    """
+    Import, process and export a single site of a manifest (see Batch).
+
+    Returns a record with the site name, the status ('done' or 'failed'), the error message and
+    the runtime of every step in seconds. The record is also written to folder/<name>.json,
+    which marks the site as completed for a resumed batch.
+    """
+    name = entry["name"]
+    record = {"site": name, "status": "failed", "error": None, "timing": {}}
+    site_folder = os.path.join(folder, Batch.filename(name))
+    tic = time.perf_counter()
+    try:
+        with utils.nullify_output(suppress_stdout=not verbose, suppress_stderr=not verbose):
+            # the site
+            start = time.perf_counter()
+            site = Site(name, geoloc=entry.get("geoloc"), categorical=entry.get("categorical", False))
+            for file in entry["files"]:
+                site.import_csv(**file)
+            process = Processing(site, copy_on_write=True)
+            record["timing"]["import"] = time.perf_counter() - start
+            # the pipeline
+            for method, kwargs in Batch.steps(pipeline):
+                start = time.perf_counter()
+                if (method == "export"):
+                    os.makedirs(site_folder, exist_ok=True)
+                    kwargs = dict(kwargs)
+                    methods = kwargs.pop("analysis_method", None)
+                    methods = list(process.results.keys()) if methods is None else [m.lower() for m in np.array([methods]).flatten()]
+                    # the Output only takes results of exportable methods
+                    Output({m: process.results[m] for m in methods}).export(folder=site_folder, **kwargs)
+                else:
+                    getattr(process, method)(**kwargs)
+                record["timing"][method] = time.perf_counter() - start
+            if save_results:
+                os.makedirs(site_folder, exist_ok=True)
+                with open(os.path.join(site_folder, "results.pkl"), "wb") as f:
+                    pickle.dump(process.results, f)
+        record["status"] = "done"
+    except Exception as error:
+        record["error"] = "{}: {}".format(type(error).__name__, error)
+        record["traceback"] = traceback.format_exc()
+    record["timing"]["total"] = time.perf_counter() - tic
+
+    # mark the site as processed (atomically)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, Batch.filename(name) + ".json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(record, f, indent=1)
+    os.replace(path + ".tmp", path)
+    return record
+
+
+class Batch(object):
+    """
+    Batch runner for a processing pipeline over the sites of a manifest.
+
+    The manifest is a list of dictionaries (or the path to a JSON file with this list), one for
+    every site:
+        {"name": "death valley", "geoloc": [-116.471360, 36.408130, 688], "categorical": False,
+         "files": [{"filepath": "Rau_et_al_2021.csv", "input_category": ["GW","BP","ET"],
+                    "utc_offset": 0, "unit": ["m","m","nstr"], "how": "add"}]}
+    where every entry of "files" holds the arguments of Site.import_csv. The pipeline is a list
+    of Processing methods, either names or (name, kwargs) tuples, e.g.
+        ["ET_calc", "RegularAndAligned", ("hals", {"update": True}), ("BE_freq", {"update": True}),
+         ("GW_correct", {"update": True}), ("export", {"analysis_method": ["hals", "gw_correct"]})]
+    The step "export" writes the results of the given (exportable) methods with Output.export.
+
+    Every site writes its results and a record with its status and the runtime of every step
+    to folder. Sites with a 'done' record are skipped when a batch is resumed.
+    """
+    DEFAULT_PIPELINE = ["ET_calc", "RegularAndAligned", ("hals", {"update": True}), ("BE_freq", {"update": True}),
+                        ("GW_correct", {"update": True}), ("export", {"analysis_method": ["hals", "gw_correct"]})]
+
+    def __init__(self, manifest, folder:str, pipeline:list=None):
+        if isinstance(manifest, str):
+            with open(manifest, "r") as f:
+                manifest = json.load(f)
+        names = [entry["name"] for entry in manifest]
+        if len(set(names)) != len(names):
+            raise Exception("Error: The site names of the manifest must be unique!")
+        self.manifest = list(manifest)
+        self.folder = folder
+        self.pipeline = self.DEFAULT_PIPELINE if pipeline is None else pipeline
+        # check the pipeline
+        for method, kwargs in self.steps(self.pipeline):
+            if (method != "export") and not callable(getattr(Processing, method, None)):
+                raise Exception("Error: '{}' is not a Processing method!".format(method))
+
+    @staticmethod
+    def steps(pipeline):
+        ''' The pipeline as (method, kwargs) tuples '''
+        return [(step, {}) if isinstance(step, str) else (step[0], dict(step[1]) if len(step) > 1 else {}) for step in pipeline]
+
+    @staticmethod
+    def filename(name:str):
+        return "".join(c if (c.isalnum() or c in "-_. ") else "_" for c in str(name))
+
+    def record(self, name:str):
+        ''' The record of a processed site or None '''
+        path = os.path.join(self.folder, self.filename(name) + ".json")
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except ValueError:
+            return None
+
+    def run(self, n_jobs:int=1, resume:bool=True, save_results:bool=True, verbose:bool=False):
+        """
+        Run the pipeline for all sites.
+
+        Parameters
+        ----------
+        n_jobs : int, optional
+            The number of worker processes. The default (1) runs the sites serially, None or -1
+            uses all processors.
+        resume : bool, optional
+            Skip the sites that were completed by a previous run.
+        save_results : bool, optional
+            Store the Processing results of every site in folder/<name>/results.pkl.
+        verbose : bool, optional
+            Show the output of the processing methods.
+
+        Returns
+        -------
+        summary : pd.DataFrame
+            Status, error and the runtime of every step [s] by site.
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        records = {}
+        todo = []
+        for entry in self.manifest:
+            record = self.record(entry["name"]) if resume else None
+            if (record is not None) and (record["status"] == "done"):
+                record["status"] = "skipped"
+                records[entry["name"]] = record
+            else:
+                todo.append(entry)
+        print("Processing {:d} of {:d} sites ...".format(len(todo), len(self.manifest)))
+
+        def progress(record):
+            records[record["site"]] = record
+            print("[{:d}/{:d}] {}: {} ({:.2f} s){}".format(len(records), len(self.manifest), record["site"], record["status"],
+                  record["timing"]["total"], "" if record["error"] is None else " " + record["error"]))
+
+        if (n_jobs == 1):
+            for entry in todo:
+                progress(run_site(entry, self.pipeline, self.folder, save_results, verbose))
+        else:
+            with ProcessPoolExecutor(max_workers=None if (n_jobs == -1) else n_jobs) as pool:
+                futures = [pool.submit(run_site, entry, self.pipeline, self.folder, save_results, verbose) for entry in todo]
+                for future in as_completed(futures):
+                    progress(future.result())
+
+        # the summary in the order of the manifest
+        rows = []
+        for entry in self.manifest:
+            record = records[entry["name"]]
+            row = {"site": record["site"], "status": record["status"], "error": record["error"]}
+            row.update(record["timing"])
+            rows.append(row)
+        return pd.DataFrame(rows).set_index("site")
+
+    def results(self, name:str):
+        ''' The stored Processing results of a site '''
+        with open(os.path.join(self.folder, self.filename(name), "results.pkl"), "rb") as f:
+            return pickle.load(f)
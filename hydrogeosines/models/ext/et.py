@@ -9,12 +9,26 @@ import numpy as np
 
 from scipy.interpolate import interp1d
 
+from ...ext.pandas_hgs import HgsAccessor
+from .et_cache import ET_cache
+
 # check if PyGTide is available
 try:
     import pygtide as pgt
 except ImportError:
     raise Exception('Error: Addition of Earth tides requires the PyGTide module. Please install: https://github.com/hydrogeoscience/pygtide')
             
+def predict_et(pt, geoloc, start, duration, samplerate, et_comp_i, et_cat, waves=None, cache=False):
+    # run PyGTide (or serve the prediction from the on-disk cache: True, False or an ET_cache object)
+    def predict(start, duration):
+        pt.predict(geoloc[1], geoloc[0], geoloc[2], start, duration, samplerate, tidalcompo=et_comp_i, tidalpoten=et_cat)
+        return pt.results()
+    if (cache is None) or (cache is False):
+        return predict(start, duration)
+    if cache is True:
+        cache = ET_cache()
+    return cache.predict(predict, geoloc, start, duration, samplerate, et_comp_i, et_cat, waves=waves)
+
 class ET(object):
     # define all class attributes here 
     #attr = attr
@@ -26,7 +40,7 @@ class ET(object):
         #self.attribute = variable            
     
     #%% add ET data to the container
-    def add_ET(self, et_comp='pot', et_cat=8, waves=None):
+    def add_ET(self, et_comp='pot', et_cat=8, waves=None, cache=False):
         print("Adding Earth tides using the inbuilt PyGTide package.")
         print("Warning: This may take some time ...")
         if (et_comp == 'pot'):
@@ -61,9 +75,8 @@ class ET(object):
             # pt.set_wavegroup(wavedata = np.array([[0.8, 2.2, 1., 0.]]))
             pt.set_wavegroup(wavedata = waves)
         print(start, duration, samplerate,)
-        pt.predict(self.geoloc[1], self.geoloc[0], self.geoloc[2], start, duration, samplerate, tidalcompo=et_comp_i, tidalpoten=et_cat)
         # retrieve the results as dataframe
-        data = pt.results()
+        data = predict_et(pt, self.geoloc, start, duration, samplerate, et_comp_i, et_cat, waves=waves, cache=cache)
         # print(data.iloc[:30, 0:3])
         # convert time to floating point for matching
         td = (data['UTC'] - pd.to_datetime('1899-12-30', utc=True)).dt
@@ -82,7 +95,7 @@ class ET(object):
         # kill existing ET values
         self.data = self.data.drop(self.data[self.data.category == 'ET'].index)
         # add new ET values
-        self.data = self.data.append(et_data)
+        self.data = HgsAccessor.concat([self.data, et_data])
         # sort data in a standard way -> easier to read
         self.data = self.data.sort_values(by=["category","location"])
         # no dublicate indices
@@ -105,7 +118,7 @@ class ET_data(object):
         #add attributes specific to Load here
         #self.attribute = variable            
             
-    def calc_ET_align(self, et_comp='pot', et_cat=8, waves=None, geoloc:list=None):
+    def calc_ET_align(self, et_comp='pot', et_cat=8, waves=None, geoloc:list=None, cache=False):
         """
         Method for hgs.DataFrame NOT Site as input. Best used on Site.data_regular.
 
@@ -119,6 +132,8 @@ class ET_data(object):
             DESCRIPTION. The default is None.
         geoloc : list, optional
             DESCRIPTION. The default is None.
+        cache : bool or ET_cache, optional
+            Serve the prediction from the on-disk cache (True: default folder, see ET_cache). The default is False.
 
         Raises
         ------
@@ -165,9 +180,8 @@ class ET_data(object):
         else:
             # pt.set_wavegroup(wavedata = np.array([[0.8, 2.2, 1., 0.]]))
             pt.set_wavegroup(wavedata = waves)
-        pt.predict(geoloc[1], geoloc[0], geoloc[2], start_naive, duration, samplerate, tidalcompo=et_comp_i, tidalpoten=et_cat)
         # retrieve the results as dataframe
-        pt_data = pt.results()
+        pt_data = predict_et(pt, geoloc, start_naive, duration, samplerate, et_comp_i, et_cat, waves=waves, cache=cache)
         # interpolate the Earth tide data for non uniform sampling (cubic spline)
         pt_data = pt_data.set_index("UTC")
         pt_data = pt_data.loc[start:stop,:]
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache for PyGTide Earth tide predictions.
+"""
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+class ET_cache(object):
+    """
+    Content-addressed cache of PyGTide predictions.
+
+    Every entry is keyed on the location, tidal component, catalogue, wave groups, sample rate
+    and the phase of the sample grid, and holds one contiguous predicted series. The series is
+    stored column-wise in a binary numpy archive (.npz). A request that overlaps or touches the
+    cached time span only predicts the missing range(s) before and after it. PyGTide only uses the
+    date of the start time, i.e. every prediction starts at midnight (UTC) and its sample grid is
+    defined by the sample rate and the phase of that midnight. All predictions of the cache start
+    at midnight of a day on the grid of the entry. The least recently used entries are deleted
+    once the folder exceeds max_bytes.
+    """
+    ENV_FOLDER  = "HGS_ET_CACHE"
+    MAX_BYTES   = 512*2**20
+
+    def __init__(self, folder:str=None, max_bytes:int=None):
+        if folder is None:
+            folder = os.environ.get(self.ENV_FOLDER, os.path.join(os.path.expanduser("~"), ".cache", "hydrogeosines", "et"))
+        self.folder = folder
+        self.max_bytes = self.MAX_BYTES if max_bytes is None else int(max_bytes)
+
+    #%% keys and storage
+    @staticmethod
+    def key(geoloc, et_comp:int, et_cat:int, waves, samplerate:int, start):
+        ''' The hash of all parameters that determine the predicted values on a sample grid '''
+        # the sample grid is defined by the sample rate and the phase of the midnight PyGTide starts at
+        phase = int(pd.Timestamp(start).normalize().value // 10**9) % int(samplerate)
+        waves = "default" if waves is None else np.round(np.asarray(waves, dtype=float), 9).tobytes().hex()
+        text = "{:.6f}|{:.6f}|{:.3f}|{:d}|{:d}|{}|{:d}|{:d}".format(geoloc[1], geoloc[0], geoloc[2], int(et_comp), int(et_cat), waves, int(samplerate), phase)
+        return hashlib.sha1(text.encode()).hexdigest()
+
+    def path(self, key:str):
+        return os.path.join(self.folder, key + ".npz")
+
+    def load(self, key:str):
+        ''' The cached PyGTide results (UTC column first) or None '''
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                names = list(npz["names"])
+                data = {"UTC": pd.to_datetime(npz["utc"], utc=True)}
+                for i, name in enumerate(names):
+                    data[name] = npz["c{:d}".format(i)]
+        except Exception:
+            # a damaged entry is predicted again
+            return None
+        # mark as recently used
+        os.utime(path)
+        return pd.DataFrame(data, columns=["UTC"] + names)
+
+    def save(self, key:str, data):
+        os.makedirs(self.folder, exist_ok=True)
+        names = [str(col) for col in data.columns[1:]]
+        columns = {"c{:d}".format(i): data[col].values.astype(float) for i, col in enumerate(data.columns[1:])}
+        utc = pd.DatetimeIndex(data["UTC"]).asi8
+        tmp = self.path(key) + ".tmp.npz"
+        np.savez(tmp, utc=utc, names=np.array(names, dtype=str), **columns)
+        # replace atomically
+        os.replace(tmp, self.path(key))
+        self.evict(keep=key)
+
+    def size(self):
+        return sum(os.path.getsize(os.path.join(self.folder, f)) for f in os.listdir(self.folder) if f.endswith(".npz")) if os.path.isdir(self.folder) else 0
+
+    def evict(self, keep:str=None):
+        ''' Delete the least recently used entries until the cache is smaller than max_bytes '''
+        if not os.path.isdir(self.folder):
+            return
+        files = [os.path.join(self.folder, f) for f in os.listdir(self.folder) if f.endswith(".npz") and not f.endswith(".tmp.npz")]
+        files = sorted(files, key=os.path.getmtime)
+        total = sum(os.path.getsize(f) for f in files)
+        for f in files:
+            if total <= self.max_bytes:
+                break
+            if (keep is not None) and (os.path.basename(f) == keep + ".npz"):
+                continue
+            total -= os.path.getsize(f)
+            os.remove(f)
+
+    def clear(self):
+        if os.path.isdir(self.folder):
+            for f in os.listdir(self.folder):
+                if f.endswith(".npz"):
+                    os.remove(os.path.join(self.folder, f))
+
+    #%% cached prediction
+    def predict(self, predict, geoloc, start, duration:float, samplerate:int, et_comp:int, et_cat:int, waves=None):
+        """
+        Cached Earth tide prediction.
+
+        Parameters
+        ----------
+        predict : callable
+            predict(start, duration) runs PyGTide for a naive UTC datetime start and a duration
+            in hours, and returns its results (DataFrame with the 'UTC' column first).
+        geoloc : list
+            Longitude, latitude and height (WGS84).
+        start : datetime
+            The naive UTC start of the prediction. As in PyGTide, only the date is used.
+        duration : float
+            The duration of the prediction in hours.
+        samplerate : int
+            The sample rate in seconds.
+        et_comp, et_cat : int
+            The PyGTide tidal component and catalogue.
+        waves : numpy array, optional
+            The wave groups. The default (None) uses the recommended wave groups.
+
+        Returns
+        -------
+        data : pd.DataFrame
+            The PyGTide results between midnight of the start date and duration hours later.
+        """
+        # PyGTide predicts from midnight of the start date
+        start = pd.Timestamp(start).tz_localize(None).normalize()
+        stop = start + pd.Timedelta(hours=duration)
+        step = pd.Timedelta(seconds=int(samplerate))
+        day = pd.Timedelta(days=1)
+        key = self.key(geoloc, et_comp, et_cat, waves, samplerate, start)
+        cached = self.load(key)
+
+        def on_grid(t):
+            return (int(t.value // 10**9) % int(samplerate)) == (int(start.value // 10**9) % int(samplerate))
+
+        def run(t0, t1):
+            # whole hours from midnight t0
+            hours = int(np.ceil((t1 - t0)/pd.Timedelta(hours=1)))
+            print(">> Predicting Earth tides from {} to {} ...".format(t0, t0 + pd.Timedelta(hours=hours)))
+            return predict(t0.to_pydatetime(), hours)
+
+        if cached is not None:
+            first = cached["UTC"].iloc[0].tz_localize(None)
+            last = cached["UTC"].iloc[-1].tz_localize(None)
+            # the latest midnight on the grid of the entry that does not start after its end
+            t_last = last.normalize()
+            while (t_last >= first) and not on_grid(t_last):
+                t_last -= day
+        if (cached is None) or (start > last + step) or (stop < first - step) or (t_last < first):
+            # nothing to extend: predict the requested span only
+            data = run(start, stop)
+        else:
+            # the cached values take precedence at the seams
+            parts = [cached]
+            if start < first:
+                parts.append(run(start, first))
+            if stop > last:
+                parts.append(run(t_last, stop))
+            if len(parts) == 1:
+                print(">> Earth tides were loaded from the cache.")
+                data = cached
+            else:
+                data = pd.concat(parts, ignore_index=True)
+                data = data.drop_duplicates(subset="UTC", keep="first").sort_values("UTC").reset_index(drop=True)
+        if data is not cached:
+            self.save(key, data)
+        # the requested span
+        utc = data["UTC"].dt.tz_localize(None)
+        return data[(utc >= start) & (utc <= stop)].reset_index(drop=True)
@@ -6,10 +6,12 @@ Created on Wed Sep 23 16:13:00 2020
 """
 
 from ... import utils
+from ...ext.pandas_hgs import HgsAccessor
 
 import pandas as pd
 import numpy as np
 import pytz
+import time
 from datetime import datetime, timedelta
 
 class Read(object):
@@ -22,7 +24,8 @@ class Read(object):
         #self.attribute = variable
         
     #%%
-    def import_csv(self, filepath, input_category, utc_offset:float, unit="m", how:str="add", loc_names=None, header = 0, check_duplicates=False, dayfirst=True, dt_format=None):
+    def import_csv(self, filepath, input_category, utc_offset:float, unit="m", how:str="add", loc_names=None, header = 0, check_duplicates=False, dayfirst=True, dt_format=None, chunksize:int=None):
+        tic = time.perf_counter()
         
         # determine which input category is empty so that this column can be ignored
         use_cat = np.array([input_category]).flatten()
@@ -63,16 +66,125 @@ class Read(object):
         # make sure the first column is always used
         usecols = np.concatenate(([0], usecols + 1), axis=0)
         # load the csv file into variable. column headers are required (header=0)
+        reader = self._read_csv(filepath, dayfirst=dayfirst, header=header, names=loc_names, usecols=usecols, dt_format=dt_format, chunksize=None if chunksize is None else int(chunksize))
+        if chunksize is None:
+            reader = [reader]
+        # stream the file: the values of every series are appended to its buffer and only one
+        # chunk is kept in wide and long format at a time
+        buffers = {}
+        for i, chunk in enumerate(reader):
+            locations = chunk.columns
+            n = len(chunk)
+            # report the localization and unit conversion only once
+            with utils.nullify_output(suppress_stdout=(i > 0), suppress_stderr=False):
+                chunk = self._format_long(chunk, input_category, unit, utc_offset)
+            # the melted table holds one block of n rows per column
+            for j in range(len(locations)):
+                if n > 0:
+                    key = tuple(chunk[col].iat[j*n] for col in ("category", "location", "part", "unit"))
+                    times, values = buffers.setdefault(key, ([], []))
+                    times.append(chunk["datetime"].values[j*n:(j + 1)*n])
+                    values.append(chunk["value"].values[j*n:(j + 1)*n])
+            del chunk
+        if len(buffers) == 0:
+            raise Exception("Error: The file does not contain any data!")
+        data = self._long_table(buffers, self.data.columns, categorical=self.data.hgs.is_categorical)
+        del buffers
+        nrows = len(data)
+        
+        # add utc_offset to site instead of data, to keep number of columns at a minimum
+        self.utc_offset.update(dict(utils.zip_formatter(locations, utc_offset)))
+
+        # how to use the data
+        if how == "add":
+            # sort data in a standard way -> easier to read
+            self.data = self._merge_sorted(self.data, data)
+            del data
+            print("A new time series was added ...")
+            
+        #TODO: Implement other methods
+        else:
+            raise ValueError("Method not available")
+
+        # make sure the datetime is formated correctly for later use
+        if not isinstance(self.data["datetime"].dtype, pd.DatetimeTZDtype):
+            self.data["datetime"] = pd.to_datetime(self.data["datetime"])
+        # no dublicate entries
+        if check_duplicates == True:
+            self.data = self.data.hgs.check_duplicates
+        
+        toc = time.perf_counter() - tic
+        print("Imported {:,} values in {:.2f} s ({:,.0f} values/s)".format(nrows, toc, nrows/max(toc, 1e-9)))
+
+    @staticmethod
+    def _long_table(buffers:dict, columns, categorical:bool=False):
+        """
+        The long hgs table of the buffered series, a dict {(category, location, part, unit): (times, values)}
+        of lists of arrays. The series are ordered by category, location and part (stable), i.e. the
+        table is sorted like the site data.
+        """
+        keys = sorted(buffers.keys(), key=lambda key: key[:3])
+        sizes = [sum(len(t) for t in buffers[key][0]) for key in keys]
+        table = {"datetime": pd.to_datetime(np.concatenate([t for key in keys for t in buffers[key][0]]), utc=True),
+                 "value": np.concatenate([v for key in keys for v in buffers[key][1]]).astype(float)}
+        for i, col in enumerate(("category", "location", "part", "unit")):
+            labels = [key[i] for key in keys]
+            if categorical:
+                dtype = pd.CategoricalDtype(sorted(set(labels)))
+                table[col] = pd.Categorical.from_codes(np.repeat([dtype.categories.get_loc(label) for label in labels], sizes), dtype=dtype)
+            else:
+                table[col] = np.repeat(np.array(labels, dtype=object), sizes)
+        return pd.DataFrame(table, columns=columns)
+
+    @staticmethod
+    def _merge_sorted(data, new):
+        """
+        Merge the long table new into the site data, sorted by category, location and part. Tables
+        that hold every series in one block are merged block-wise (stable, the rows of data first),
+        otherwise both are concatenated and sorted.
+        """
+        if len(data) == 0:
+            if all(data[col].dtype == new[col].dtype for col in data.columns):
+                return new
+            return HgsAccessor.concat([data, new], ignore_index=True)
+        cols = ["category", "location", "part"]
+        blocks = []
+        for i, frame in enumerate((data, new)):
+            change = np.zeros(max(len(frame) - 1, 0), dtype=bool)
+            for col in cols:
+                values = np.asarray(frame[col], dtype=object)
+                change |= (values[1:] != values[:-1])
+            starts = np.concatenate(([0], np.flatnonzero(change) + 1))
+            stops = np.append(starts[1:], len(frame))
+            keys = [tuple(frame[col].iat[start] for col in cols) for start in starts]
+            if len(set(keys)) != len(keys):
+                # a series is split into several blocks
+                merged = HgsAccessor.concat([data, new])
+                return merged.sort_values(by=cols).reset_index(drop=True)
+            blocks += [(key, i, start, stop) for key, start, stop in zip(keys, starts, stops)]
+        frames = (data, new)
+        blocks = sorted(blocks, key=lambda block: block[:2])
+        return HgsAccessor.concat([frames[i].iloc[start:stop] for key, i, start, stop in blocks], ignore_index=True)
+
+    @staticmethod
+    def _read_csv(filepath, dayfirst=True, header=0, names=None, usecols=None, dt_format=None, chunksize:int=None):
+        # read the csv file (or an iterator over chunks) with a datetime index
         if dt_format is None:
-            data = pd.read_csv(filepath, parse_dates=True, index_col=0, infer_datetime_format=True, dayfirst=dayfirst, header = header, names=loc_names, usecols=usecols)
+            reader = pd.read_csv(filepath, parse_dates=True, index_col=0, infer_datetime_format=True, dayfirst=dayfirst, header = header, names=names, usecols=usecols, chunksize=chunksize)
         else:
-            data = pd.read_csv(filepath, index_col=0, header = header, names=loc_names, usecols=usecols)
-            data.index = pd.to_datetime(data.index, format=dt_format)
-            
-        # # ignore column numbers beyond input length
-        # ncols = len(np.array(input_category).flatten())
-        # data = data.iloc[:, :ncols]
+            reader = pd.read_csv(filepath, index_col=0, header = header, names=names, usecols=usecols, chunksize=chunksize)
+        
+        def parse(data):
+            if dt_format is not None:
+                data.index = pd.to_datetime(data.index, format=dt_format)
+            return data
+        
+        if chunksize is None:
+            return parse(reader)
+        return (parse(chunk) for chunk in reader)
 
+    def _format_long(self, data, input_category, unit, utc_offset):
+        # localize a wide table to UTC, melt it to the long hgs format and convert the units
         data.index.rename(name="datetime", inplace=True) # streamline datetime name
         
         # make sure the first column is a correctly identified datetime
@@ -103,28 +215,7 @@ class Read(object):
 
         # reformat unit column to SI units
         data = data.hgs.pucf_converter_vec(self.const["_pucf"]) # vectorizing
-
-        # add utc_offset to site instead of data, to keep number of columns at a minimum
-        self.utc_offset.update(dict(utils.zip_formatter(locations, utc_offset)))
-
-        # how to use the data
-        if how == "add":
-            self.data = self.data.append(data)
-            print("A new time series was added ...")
-            
-        #TODO: Implement other methods
-        else:
-            raise ValueError("Method not available")
-
-        # make sure the datetime is formated correctly for later use
-        self.data["datetime"] = pd.to_datetime(self.data["datetime"])
-        # sort data in a standard way -> easier to read
-        self.data.sort_values(by=["category","location","part"], inplace = True)
-        # no dublicate indices
-        self.data.reset_index(inplace=True, drop=True)
-        # no dublicate entries
-        if check_duplicates == True:
-            self.data = self.data.hgs.check_duplicates
+        return data
 
     #%%
     def import_df(self, dataframe, input_category, utc_offset:float, unit="m", how:str="add", loc_names=None, check_duplicates=False, dayfirst=True, dt_format:str=None):
@@ -221,7 +312,7 @@ class Read(object):
 
         # how to use the data
         if how == "add":
-            self.data = self.data.append(data)
+            self.data = HgsAccessor.concat([self.data, data])
             print("A new time series was added ...")
             
         #TODO: Implement other methods
@@ -14,14 +14,21 @@ from .const import const
 #%% define a class for the investigated site
 
 class Site(Read, ET):
-    """Optional class documentation string, can be accessed via Site.__doc__"""
+    """
+    The investigated site and its data in long format.
+
+    With categorical=True the identifier columns of Site.data are stored as pd.Categorical
+    (see HgsAccessor.to_categorical).
+    """
     # define all class attributes here
     VALID_CATEGORY  = {"ET", "BP", "GW"}
     const           = const
 
-    def __init__(self, name:str=None, geoloc:list=None, data=None, *args, **kwargs):
+    def __init__(self, name:str=None, geoloc:list=None, data=None, categorical:bool=False, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        # store the identifier columns as pd.Categorical
+        self.categorical = categorical
         # The site name
         if name is None:
             name = "Site-1"
@@ -57,11 +64,12 @@ class Site(Read, ET):
     @data.setter
     def data(self,data):
         if data is None:
+            key = 'category' if getattr(self, "categorical", False) else 'object'
             self._data = pd.DataFrame({"datetime": pd.Series([], dtype="datetime64[ns]"),
-                                        "category": pd.Series([], dtype='object'),
-                                        "location": pd.Series([], dtype='object'), 
-                                        "part": pd.Series([], dtype='object'), 
-                                        "unit": pd.Series([], dtype='object'), 
+                                        "category": pd.Series([], dtype=key),
+                                        "location": pd.Series([], dtype=key), 
+                                        "part": pd.Series([], dtype=key), 
+                                        "unit": pd.Series([], dtype=key), 
                                         "value": pd.Series([], dtype='float')})
 
         elif isinstance(data, pd.DataFrame):
@@ -98,18 +98,19 @@ def gap_mask(s:pd.Series, maxgap:int):
         Number of null entries marked as True     
 
     """
-    idx = s.isnull().astype(int).groupby(s.notnull().astype(bool).cumsum()).sum()
-    sizes = idx[idx > 0] # size of gaps
-    start = sizes.index + (sizes.cumsum() - sizes) # get start index
-    stop  = start + sizes # get stop index
-    gaps = [np.arange(a,b) for a,b in zip(start,stop)] # get indices of each individual gap
-    
-    ## create a mask for the gap sizes
-    mask = np.zeros_like(s)
-    for gap in gaps:
-        mask[gap] = len(gap)    
-
-    return (mask < maxgap) | s.notnull().to_numpy(), np.count_nonzero(np.logical_and(mask > 0, mask < maxgap))
+    null = s.isnull().to_numpy()
+    # run-length encoding of the null entries: start and stop index of every gap
+    edges = np.diff(np.concatenate(([0], null.view(np.int8), [0])))
+    start = np.flatnonzero(edges == 1)
+    stop  = np.flatnonzero(edges == -1)
+    sizes = stop - start # size of gaps
+    small = sizes < maxgap
+
+    ## the null entries of the gaps below maxgap are marked as True
+    mask = ~null
+    mask[null] = np.repeat(small, sizes)
+
+    return mask, int(np.sum(sizes[small]))
 
 @contextmanager
 def nullify_output(suppress_stdout=True, suppress_stderr=True):
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime of the single-pass BP_align against the iterative version for the sites in tests/data.
+
+The iterative version does not converge for the CSIRO sample (the GW records extend beyond the
+BP record) and is skipped there.
+"""
+
+import pandas as pd
+import time
+
+import hydrogeosines as hgs
+from hydrogeosines import utils
+
+#%% sites, arguments of make_regular/BP_align and whether the iterative version converges
+def death_valley():
+    site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+    site.import_csv('tests/data/death_valley/BLM-1_double.csv', input_category=["GW","GW","BP","ET"], utc_offset=0,
+                    unit=["m","m","m","nstr"], how="add", check_duplicates=True)
+    return site, {}, True
+
+def fowlers_gap():
+    site = hgs.Site('Fowlers Gap', geoloc=[141.73099, -31.2934, 160])
+    site.import_csv('tests/data/fowlers_gap/acworth_short_gaps.csv', input_category=['BP', 'GW', 'GW', 'GW', 'ET'], utc_offset=10,
+                    unit=['m', 'm', 'm', 'm', 'm**2/s**2'], loc_names=["Baro", "FG822-1", "FG822-2", "Smith", "ET"], how="add", check_duplicates=True)
+    return site, {"part_min": 5, "inter_max_total": 40}, True
+
+def port_keats():
+    site = hgs.Site('Port Keats', geoloc=[129.53, -14.26, 8])
+    site.import_csv('tests/data/port_keats_gaps/Baro.csv', input_category="BP", utc_offset=8, unit="cm", loc_names=["Baro"], how="add", dayfirst=True)
+    for loc in ("RN027214", "RN039613", "RN039617"):
+        site.import_csv('tests/data/port_keats_gaps/{}.csv'.format(loc), input_category="GW", utc_offset=8, unit="cm", loc_names=[loc], how="add", dayfirst=True)
+    return site, {"part_min": 5, "inter_max": 7200, "inter_max_total": 40}, True
+
+def csiro():
+    site = hgs.Site('csiro', geoloc=[141.762065, -31.065781, 160])
+    site.import_csv('tests/data/csiro/test_sample/CSIRO_GW_short.csv', input_category=["GW"]*3, utc_offset=10, unit=["m"]*3,
+                    loc_names=["Loc_A","Loc_B","Loc_C"], how="add", check_duplicates=True)
+    site.import_csv('tests/data/csiro/test_sample/CSIRO_BP_short.csv', input_category="BP", utc_offset=10, unit="mbar",
+                    loc_names=["Baro"], how="add", check_duplicates=True)
+    site.data = site.data[site.data["location"] != "Loc_C"].reset_index(drop=True)
+    return site, {}, False
+
+SITES = {"death valley": death_valley, "fowlers gap": fowlers_gap, "port keats": port_keats, "csiro": csiro}
+
+#%% run the benchmark (best of REPEAT runs)
+REPEAT = 5
+
+def best(func):
+    times = []
+    for i in range(REPEAT):
+        tic = time.perf_counter()
+        out = func()
+        times.append(time.perf_counter() - tic)
+    return out, min(times)
+
+print("{:>14s} {:>8s} {:>16s} {:>16s} {:>8s}".format("site", "rows", "iterative [s]", "single-pass [s]", "aligned"))
+for name, load in SITES.items():
+    with utils.nullify_output():
+        site, kwargs, converges = load()
+        regular = site.data.hgs.make_regular(**kwargs)
+        out, toc = best(lambda: regular.hgs.BP_align(**kwargs))
+        if converges:
+            ref, toc_ref = best(lambda: regular.hgs.BP_align_iterative(**kwargs))
+            toc_ref = "{:16.3f}".format(toc_ref)
+            pd.testing.assert_frame_equal(out, ref)
+        else:
+            toc_ref = "{:>16s}".format("no convergence")
+        aligned = out.hgs.check_alignment(silent=True)
+    print("{:>14s} {:>8d} {} {:>16.3f} {:>8s}".format(name, len(regular), toc_ref, toc, str(aligned)))
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime of utils.gap_mask for synthetic records with small gaps (TGenerator.small_gaps).
+
+The records are joined from independent blocks, since the gap generator scales with the
+square of the record length. The previous groupby implementation is the reference.
+"""
+
+import numpy as np
+import pandas as pd
+import random
+import time
+
+from hydrogeosines.ext.synthetic import TGenerator
+from hydrogeosines import utils
+
+#%% settings
+BLOCK_DAYS  = 200
+SPD         = 96 # 15-minute sampling
+BLOCKS      = (1, 5, 20)
+SG_PROP     = 0.1
+MAXGAP      = 3
+
+#%% the previous implementation
+def gap_mask_groupby(s, maxgap):
+    idx = s.isnull().astype(int).groupby(s.notnull().astype(bool).cumsum()).sum()
+    sizes = idx[idx > 0]
+    start = sizes.index + (sizes.cumsum() - sizes)
+    stop  = start + sizes
+    gaps = [np.arange(a,b) for a,b in zip(start,stop)]
+    mask = np.zeros_like(s)
+    for gap in gaps:
+        mask[gap] = len(gap)
+    return (mask < maxgap) | s.notnull().to_numpy(), np.count_nonzero(np.logical_and(mask > 0, mask < maxgap))
+
+#%% synthetic record
+def synthetic(blocks, seed=0):
+    random.seed(seed)
+    np.random.seed(seed)
+    values = []
+    for _ in range(blocks):
+        tgen = TGenerator(days=BLOCK_DAYS, spd=SPD)
+        with utils.nullify_output():
+            tgen.small_gaps(2.1, 1.1, SG_PROP)
+        x = np.cos(2*np.pi*2*tgen.time)
+        x[tgen.gidx_s] = np.nan
+        values.append(x)
+    return pd.Series(np.concatenate(values))
+
+#%% run the benchmark
+print("{:>10s} {:>8s} {:>14s} {:>14s}".format("samples", "gaps", "groupby [s]", "rle [s]"))
+for blocks in BLOCKS:
+    s = synthetic(blocks)
+    null = s.isnull().to_numpy()
+    n_gaps = np.count_nonzero(np.diff(null.astype(int)) == 1) + int(null[0])
+    tic = time.perf_counter()
+    mask_ref, counter_ref = gap_mask_groupby(s, MAXGAP)
+    toc_ref = time.perf_counter() - tic
+    tic = time.perf_counter()
+    mask, counter = utils.gap_mask(s, MAXGAP)
+    toc = time.perf_counter() - tic
+    assert np.array_equal(mask, mask_ref) and (counter == counter_ref)
+    print("{:>10d} {:>8d} {:>14.4f} {:>14.4f}".format(len(s), n_gaps, toc_ref, toc))
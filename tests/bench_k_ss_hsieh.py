@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime per well of the Hsieh et al. (1987) fit with the scipy and mpmath engines.
+"""
+
+import numpy as np
+import time
+
+from hydrogeosines.ext.hgs_analysis import Freq_domain, hflow_response
+from hydrogeosines.models import const
+from hydrogeosines import utils
+
+#%% settings
+ENGINES     = ("scipy", "mpmath")
+WELLS       = 20
+f_m2        = const.const['_etfqs']['M2']
+
+#%% synthetic wells
+rng = np.random.default_rng(0)
+K = 10**rng.uniform(-7, -4, WELLS)
+Ss = 10**rng.uniform(-6, -4, WELLS)
+ET_m2 = 10*np.exp(0.3j)
+GW_m2 = []
+for k, s in zip(K, Ss):
+    Ar, dPhi = hflow_response(k*24*3600, s, 0.127, 0.127, 10, f_m2)
+    GW_m2.append(ET_m2*1e-9*(Ar/s)*np.exp(1j*dPhi))
+
+#%% run the benchmark
+print("{:>8s} {:>8s} {:>16s} {:>14s}".format("engine", "wells", "runtime/well [s]", "max rel. error"))
+for engine in ENGINES:
+    errors = []
+    tic = time.perf_counter()
+    for k, s, gw in zip(K, Ss, GW_m2):
+        with utils.nullify_output():
+            fit = Freq_domain.K_Ss_Hsieh(ET_m2, gw, 10, 0.127, 0.127, engine=engine)
+        errors.append(max(abs(fit["K"]/k - 1), abs(fit["Ss"]/s - 1)))
+    toc = (time.perf_counter() - tic)/WELLS
+    print("{:>8s} {:>8d} {:>16.4f} {:>14.1e}".format(engine, WELLS, toc, np.max(errors)))
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime of the regression deconvolution (GW_correct) for synthetic 15-minute records.
+
+Configurations whose dense design matrix exceeds MAX_BYTES are skipped. The
+"cholesky" solver never builds the lagged matrices and is always run.
+"""
+
+import numpy as np
+import time
+
+from hydrogeosines.ext.hgs_analysis import Time_domain
+from hydrogeosines import utils
+
+#%% settings
+SPD         = 96 # 15-minute sampling
+YEARS       = (1, 5, 10)
+LAGS_H      = (8, 24, 72)
+SOLVERS     = ("qr", "cholesky", "curve_fit")
+MAX_BYTES   = 1.5e9
+
+#%% synthetic record
+def synthetic(years, spd=SPD, seed=0):
+    rng = np.random.default_rng(seed)
+    n = int(365*years*spd)
+    tf = np.arange(n)/spd
+    BP = 0.05*np.cos(2*np.pi*2*tf) + np.cumsum(rng.normal(0, 1e-3, n))
+    # simple exponential barometric response
+    irc = 0.3*np.exp(-np.arange(spd)/(spd/8))
+    irc = irc/np.sum(irc)*0.6
+    GW = -np.convolve(BP, irc)[:n] + np.cumsum(rng.normal(0, 1e-4, n))
+    return tf, GW, BP
+
+#%% run the benchmark
+print("{:>6s} {:>6s} {:>10s} {:>10s} {:>12s}".format("years", "lag_h", "samples", "solver", "runtime [s]"))
+for years in YEARS:
+    tf, GW, BP = synthetic(years)
+    for lag_h in LAGS_H:
+        nlag = int((lag_h/24)*SPD) + 1
+        for solver in SOLVERS:
+            if (solver != "cholesky") and (len(tf)*(nlag + 1)*8*3 > MAX_BYTES):
+                print("{:>6d} {:>6d} {:>10d} {:>10s} {:>12s}".format(years, lag_h, len(tf), solver, "skipped"))
+                continue
+            tic = time.perf_counter()
+            with utils.nullify_output():
+                Time_domain.regress_deconv(tf, GW, BP, lag_h=lag_h, solver=solver)
+            toc = time.perf_counter() - tic
+            print("{:>6d} {:>6d} {:>10d} {:>10s} {:>12.2f}".format(years, lag_h, len(tf), solver, toc))
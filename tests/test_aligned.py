@@ -0,0 +1,55 @@
+import hydrogeosines as hgs
+import numpy as np
+import pandas as pd
+from hydrogeosines.ext.hgs_aligned import HgsAligned
+
+#%% the aligned arrays of the regular and aligned data
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/BLM-1_double.csv',
+                        input_category=["GW","GW","BP","ET"], utc_offset=0, unit=["m","m","m","nstr"],
+                        how="add", check_duplicates=True)
+
+process = hgs.Processing(site).RegularAndAligned()
+data = process.data_regular
+aligned = process.data_aligned
+assert aligned is process.data_aligned
+assert aligned.keys == [("BLM-1", "all"), ("BLM-2", "all")]
+assert set(aligned.table["category"]) == {"GW", "BP", "ET"}
+
+gw_data = data.hgs.filters.get_gw_data
+for gw_loc in aligned.keys:
+    GW = gw_data[(gw_data["location"] == gw_loc[0]) & (gw_data["part"] == gw_loc[1])]
+    np.testing.assert_array_equal(aligned.times(gw_loc), pd.DatetimeIndex(GW["datetime"]).asi8)
+    np.testing.assert_array_equal(aligned.values(gw_loc, "GW"), GW["value"].values)
+    np.testing.assert_array_equal(aligned.to_zero(gw_loc), GW.hgs.dt.to_zero)
+    for cat in ("BP", "ET"):
+        group = data[data["category"] == cat].set_index("datetime")["value"]
+        np.testing.assert_array_equal(aligned.values(gw_loc, cat), group.reindex(GW["datetime"]).values)
+        # the series are contiguous views of the arrays
+        values = aligned.values(gw_loc, cat)
+        assert values.flags["C_CONTIGUOUS"] and (values.base is not None)
+
+#%% the arrays follow changes of the regular data
+process.data_regular = data[data["location"] != "BLM-2"].reset_index(drop=True)
+assert process.data_aligned.keys == [("BLM-1", "all")]
+
+#%% other categories are matched by time, independent of their order
+frame = pd.DataFrame({"datetime": pd.date_range("2020-01-01", periods=6, freq="H", tz="UTC").repeat(2),
+                      "category": ["GW", "BP"]*6, "location": ["A", "Baro"]*6, "part": ["all"]*12, "unit": ["m"]*12,
+                      "value": np.arange(12, dtype=float)})
+shuffled = pd.concat([frame[frame["category"] == "GW"], frame[frame["category"] == "BP"].iloc[::-1]], ignore_index=True)
+aligned = HgsAligned(shuffled)
+np.testing.assert_array_equal(aligned.values(("A", "all"), "BP"), np.arange(1, 12, 2))
+# missing entries are masked
+aligned = HgsAligned(frame.drop(index=[3, 5]))
+np.testing.assert_array_equal(aligned.mask(("A", "all"), "BP"), [True, False, False, True, True, True])
+np.testing.assert_array_equal(aligned.values(("A", "all"), "BP"), [1, 7, 9, 11])
+assert not aligned.is_aligned("BP")
+
+# one row per category: a second BP location is not silently dropped
+second = frame[frame["category"] == "BP"].assign(location="Baro_2")
+try:
+    HgsAligned(pd.concat([frame, second], ignore_index=True))
+    raise AssertionError("several BP locations must raise")
+except Exception as e:
+    assert "more than one location" in str(e)
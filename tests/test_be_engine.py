@@ -0,0 +1,54 @@
+import hydrogeosines as hgs
+import numpy as np
+import time
+
+from hydrogeosines.ext.hgs_analysis import Time_domain
+
+#%% synthetic records (including zeros and sign changes)
+rng = np.random.default_rng(42)
+n = 200000
+BP = np.round(rng.normal(0, 1e-3, n), 4)
+GW = -0.4*BP + np.round(rng.normal(0, 2e-4, n), 5)
+
+#%% compare the vectorized engine against the loop reference
+methods = ["BE_average_of_ratios", "BE_Clark", "BE_Davis_and_Rasmussen", "BE_Rahi"]
+for method in methods:
+    func = getattr(Time_domain, method)
+    tic = time.perf_counter()
+    ref = func(BP, GW, engine="loop")
+    t_loop = time.perf_counter() - tic
+    tic = time.perf_counter()
+    res = func(BP, GW, engine="numpy")
+    t_numpy = time.perf_counter() - tic
+    print("{:<24s} loop: {:8.3f} s, numpy: {:8.3f} s, BE = {:.6f}".format(method, t_loop, t_numpy, res))
+    # results must be bit-compatible
+    assert (res == ref), "{}: {} != {}".format(method, res, ref)
+
+#%% real data using the processing workflow
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/Rau_et_al_2021.csv',
+                        input_category=["GW","BP","ET"], utc_offset=0, unit=["m","m","nstr"],
+                        how="add", check_duplicates=True)
+
+process = hgs.Processing(site)
+be_loop = process.BE_time(method="all", engine="loop")
+be_numpy = process.BE_time(method="all")
+
+for loc in be_numpy["be_time"].keys():
+    for key, val in be_numpy["be_time"][loc][0].items():
+        assert (val == be_loop["be_time"][loc][0][key]), key
+
+#%% batched evaluation of several wells sharing one barometer
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/BLM-1_double.csv',
+                        input_category=["GW","GW","BP","ET"], utc_offset=0, unit=["m","m","m","nstr"],
+                        how="add", check_duplicates=True)
+
+process = hgs.Processing(site).RegularAndAligned()
+be_serial = process.BE_time(method="all")
+be_batch = process.BE_time(method="all", batch=True)
+
+assert list(be_serial["be_time"].keys()) == list(be_batch["be_time"].keys())
+for loc in be_serial["be_time"].keys():
+    for key, val in be_serial["be_time"][loc][0].items():
+        assert (val == be_batch["be_time"][loc][0][key]), key
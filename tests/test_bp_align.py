@@ -0,0 +1,37 @@
+import hydrogeosines as hgs
+import pandas as pd
+
+#%% the single-pass alignment must reproduce the converged iterative version
+site = hgs.Site('Fowlers Gap', geoloc=[141.73099, -31.2934, 160])
+site.import_csv('tests/data/fowlers_gap/acworth_short_gaps.csv', input_category=['BP', 'GW', 'GW', 'GW', 'ET'], utc_offset=10,
+                unit=['m', 'm', 'm', 'm', 'm**2/s**2'], loc_names=["Baro", "FG822-1", "FG822-2", "Smith", "ET"], how="add", check_duplicates=True)
+
+regular = site.data.hgs.make_regular(part_min=5, inter_max_total=40)
+aligned = regular.hgs.BP_align(part_min=5, inter_max_total=40)
+reference = regular.hgs.BP_align_iterative(part_min=5, inter_max_total=40)
+pd.testing.assert_frame_equal(aligned, reference)
+assert aligned.hgs.check_alignment()
+# the large BP gap splits the GW records into two parts
+assert set(aligned.loc[aligned["category"] == "GW", "part"]) == {"1", "2"}
+
+#%% GW records that extend beyond the BP record (the iterative version does not converge)
+site = hgs.Site('csiro', geoloc=[141.762065, -31.065781, 160])
+site.import_csv('tests/data/csiro/test_sample/CSIRO_GW_short.csv', input_category=["GW"]*3, utc_offset=10, unit=["m"]*3,
+                loc_names=["Loc_A","Loc_B","Loc_C"], how="add", check_duplicates=True)
+site.import_csv('tests/data/csiro/test_sample/CSIRO_BP_short.csv', input_category="BP", utc_offset=10, unit="mbar",
+                loc_names=["Baro"], how="add", check_duplicates=True)
+
+process = hgs.Processing(site).by_gwloc(["Loc_A","Loc_B"]).RegularAndAligned()
+data = process.data_regular
+assert data.hgs.check_alignment()
+gw = data[data["category"] == "GW"]
+bp = data[data["category"] == "BP"]
+assert gw["datetime"].isin(bp["datetime"]).all()
+assert not data.loc[data["category"].isin(["GW","BP"]), "value"].isnull().any()
+
+#%% data that is aligned already is returned as is
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/BLM-1_double.csv', input_category=["GW","GW","BP","ET"], utc_offset=0,
+                unit=["m","m","m","nstr"], how="add", check_duplicates=True)
+regular = site.data.hgs.make_regular()
+pd.testing.assert_frame_equal(regular.hgs.BP_align(), regular.hgs.BP_align_iterative())
@@ -0,0 +1,54 @@
+import hydrogeosines as hgs
+import numpy as np
+import pandas as pd
+
+#%% object and categorical storage of the site data
+def load(categorical):
+    site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688], categorical=categorical)
+    site.import_csv('tests/data/death_valley/BLM-1_double.csv',
+                            input_category=["GW","GW","BP","ET"], utc_offset=0, unit=["m","m","m","nstr"],
+                            how="add", check_duplicates=True)
+    return site
+
+site_obj = load(False)
+site_cat = load(True)
+
+assert not site_obj.data.hgs.is_categorical
+assert site_cat.data.hgs.is_categorical
+assert site_cat.data.hgs.filters.obj_col == site_obj.data.hgs.filters.obj_col
+pd.testing.assert_frame_equal(site_cat.data.hgs.to_object(), site_obj.data)
+
+cols = list(site_obj.data.hgs.filters.obj_col)
+mem_obj = site_obj.data[cols].memory_usage(deep=True, index=False).sum()
+mem_cat = site_cat.data[cols].memory_usage(deep=True, index=False).sum()
+print("Identifier columns: {:.1f} bytes/row (object), {:.1f} bytes/row (categorical)".format(mem_obj/len(site_obj.data), mem_cat/len(site_cat.data)))
+
+#%% processing and export results must not depend on the storage
+process_obj = hgs.Processing(site_obj).RegularAndAligned()
+process_cat = hgs.Processing(site_cat).RegularAndAligned()
+assert process_cat.data_regular.hgs.is_categorical
+pd.testing.assert_frame_equal(process_cat.data_regular.hgs.to_object(), process_obj.data_regular)
+
+for method, kwargs in (("BE_time", {}), ("hals", {}), ("GW_correct", {"lag_h": 8, "et_method": "ts"})):
+    # there is no export for BE_time
+    update = (method != "BE_time")
+    res_obj = getattr(process_obj, method)(update=update, **kwargs)
+    res_cat = getattr(process_cat, method)(update=update, **kwargs)
+    name = method.lower()
+    assert list(res_obj[name].keys()) == list(res_cat[name].keys())
+    for loc in res_obj[name].keys():
+        for key, val in res_obj[name][loc][0].items():
+            if isinstance(val, dict):
+                for k, v in val.items():
+                    np.testing.assert_array_equal(v, res_cat[name][loc][0][key][k])
+            else:
+                np.testing.assert_array_equal(val, res_cat[name][loc][0][key])
+
+for method in ("hals", "gw_correct"):
+    exp_obj = hgs.Output(process_obj).export(method)
+    exp_cat = hgs.Output(process_cat).export(method)
+    for loc in exp_obj.keys():
+        files_obj = exp_obj[loc] if isinstance(exp_obj[loc], tuple) else (exp_obj[loc],)
+        files_cat = exp_cat[loc] if isinstance(exp_cat[loc], tuple) else (exp_cat[loc],)
+        for a, b in zip(files_obj, files_cat):
+            pd.testing.assert_frame_equal(a, b)
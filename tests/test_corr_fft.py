@@ -0,0 +1,41 @@
+import hydrogeosines as hgs
+import numpy as np
+
+from hydrogeosines.ext.hgs_analysis import Time_domain
+
+#%% linear correlation against the direct sums
+rng = np.random.default_rng(0)
+x = np.cumsum(rng.normal(size=1001))
+y = np.roll(x, 5) + rng.normal(size=1001)
+xp, yp = x - x.mean(), y - y.mean()
+ref_a = np.correlate(xp, xp, mode="full")[len(x)-1:]/np.sum(xp**2)
+ref_x = np.correlate(yp, xp, mode="full")[len(x)-1:]/np.sum(xp**2)
+
+np.testing.assert_allclose(Time_domain.acorr(x), ref_a[:len(x)//2], rtol=0, atol=1e-12)
+np.testing.assert_allclose(Time_domain.xcorr(x, y), ref_x[:len(x)//2], rtol=0, atol=1e-12)
+np.testing.assert_allclose(Time_domain.acorr(x, maxlag=24), ref_a[:25], rtol=0, atol=1e-12)
+np.testing.assert_allclose(Time_domain.xcorr(x, y, maxlag=2000), ref_x, rtol=0, atol=1e-12)
+
+#%% cached spectra
+sx = Time_domain.corr_spectrum(x)
+sy = Time_domain.corr_spectrum(y, sx["N"])
+np.testing.assert_allclose(Time_domain.acorr(x, spectrum=sx), ref_a[:len(x)//2], rtol=0, atol=1e-12)
+np.testing.assert_allclose(Time_domain.xcorr(x, y, spectrum1=sx, spectrum2=sy), ref_x[:len(x)//2], rtol=0, atol=1e-12)
+
+#%% Processing with a maximum lag
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/Rau_et_al_2021.csv',
+                        input_category=["GW","BP","ET"], utc_offset=0, unit=["m","m","nstr"],
+                        how="add", check_duplicates=True)
+process = hgs.Processing(site)
+full = process.xcorr()
+short = process.xcorr(max_lag=2)
+for ident in full["xcorr"].keys():
+    res_f = full["xcorr"][ident][0]
+    res_s = short["xcorr"][ident][0]
+    assert res_s["lags"][-1] <= 2
+    np.testing.assert_allclose(res_s["coeff"], res_f["coeff"][:len(res_s["coeff"])], rtol=0, atol=1e-12)
+    np.testing.assert_allclose(res_s["lags"], res_f["lags"][:len(res_s["lags"])])
+short = process.acorr(max_lag=2)
+for ident, (res, data_group, info) in short["acorr"].items():
+    assert res["lags"][-1] <= 2
@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import pandas as pd
+import tempfile
+import datetime
+
+from hydrogeosines.models.ext.et_cache import ET_cache
+
+#%% a deterministic series in the layout of PyGTide results
+calls = []
+def series(start, duration, samplerate=3600):
+    # like PyGTide, only the date of the start is used
+    start = datetime.datetime(start.year, start.month, start.day)
+    utc = pd.date_range(start, start + datetime.timedelta(hours=duration), freq="{:d}S".format(samplerate), tz="UTC")
+    tf = (utc - pd.Timestamp("2000-01-01", tz="UTC"))/pd.Timedelta(days=1)
+    return pd.DataFrame({"UTC": utc, "Signal [nm/s**2]": np.cos(2*np.pi*1.93*tf), "Pole tide [nm/s**2]": 0.})
+
+def predict(start, duration, samplerate=3600):
+    calls.append(duration)
+    return series(start, duration, samplerate)
+
+geoloc = [-116.471360, 36.408130, 688]
+folder = tempfile.mkdtemp()
+cache = ET_cache(folder=folder)
+start = datetime.datetime(2020, 1, 10)
+
+# first request is predicted and stored
+data = cache.predict(predict, geoloc, start, 24*10, 3600, -1, 8)
+assert calls == [240]
+pd.testing.assert_frame_equal(data, series(start, 240))
+
+# a contained request is served from disk
+data = cache.predict(predict, geoloc, start + datetime.timedelta(days=2), 24, 3600, -1, 8)
+assert len(calls) == 1
+pd.testing.assert_frame_equal(data, series(start + datetime.timedelta(days=2), 24))
+
+# an overlapping request only predicts the missing ranges
+calls.clear()
+data = cache.predict(predict, geoloc, start - datetime.timedelta(days=1), 24*12, 3600, -1, 8)
+assert sorted(calls) == [24, 24]
+pd.testing.assert_frame_equal(data, series(start - datetime.timedelta(days=1), 24*12))
+
+# requests starting during the day are predicted from midnight, the stitched series is regular
+calls.clear()
+for offset, hours in (((9, 13), 24*3), ((-3, 7), 24*5)):
+    t0 = start + datetime.timedelta(days=offset[0], hours=offset[1])
+    data = cache.predict(predict, geoloc, t0, hours, 3600, -1, 8)
+    pd.testing.assert_frame_equal(data, series(t0, hours))
+assert len(calls) == 2
+data = cache.predict(predict, geoloc, start - datetime.timedelta(days=3), 24*15, 3600, -1, 8)
+assert len(calls) == 2
+assert (np.diff(data["UTC"].values) == np.timedelta64(3600, "s")).all()
+pd.testing.assert_frame_equal(data, series(start - datetime.timedelta(days=3), 24*15))
+
+# sample rates that do not divide a day: the grid phase changes from day to day
+calls.clear()
+rate = 7*3600
+fine = lambda t0, hours: predict(t0, hours, samplerate=rate)
+data = cache.predict(fine, geoloc, start, 24*7, rate, -1, 8)
+pd.testing.assert_frame_equal(data, series(start, 24*7, rate))
+data = cache.predict(fine, geoloc, start + datetime.timedelta(days=5, hours=12), 24*6, rate, -1, 8)
+pd.testing.assert_frame_equal(data, series(start + datetime.timedelta(days=5), 24*6, rate))
+# the extension starts at the latest midnight on the grid of the entry
+calls.clear()
+data = cache.predict(fine, geoloc, start, 24*12, rate, -1, 8)
+assert calls == [24*5]
+pd.testing.assert_frame_equal(data, series(start, 24*12, rate))
+
+# other parameters use another entry
+calls.clear()
+cache.predict(predict, geoloc, start, 24, 3600, 0, 8)
+cache.predict(predict, geoloc, start, 24, 3600, -1, 8, waves=np.array([[0.8, 2.2, 1., 0.]]))
+assert len(calls) == 2
+
+#%% size based eviction keeps the latest entry
+small = ET_cache(folder=folder, max_bytes=1)
+small.predict(predict, [10., 10., 0.], start, 24, 3600, -1, 8)
+assert small.size() > 0
+assert len([f for f in os.listdir(folder) if f.endswith(".npz")]) == 1
+cache.clear()
+assert cache.size() == 0
@@ -0,0 +1,57 @@
+import hydrogeosines as hgs
+import numpy as np
+import time
+
+from hydrogeosines.ext.hgs_analysis import Freq_domain, dft_bins
+
+#%% selected DFT bins against the full FFT
+rng = np.random.default_rng(0)
+for N in (1000, 1001, 4096, 99991):
+    x = rng.normal(size=N)
+    k = np.array([0, 1, 17, N//3, N//2 - 1])
+    np.testing.assert_allclose(dft_bins(x, k), np.fft.fft(x)[k], rtol=1e-9, atol=1e-9*np.sqrt(N))
+
+#%% targeted spectrum of a 1-minute record
+spd = 1440
+tf = np.arange(2*365*spd)/spd
+data = 0.3*np.cos(2*np.pi*1.9322736*tf + 0.5) + 0.1*np.cos(2*np.pi*2*tf) + rng.normal(0, 0.01, len(tf))
+freqs = [0.9295357, 1.0, 1.9322736, 2.0]
+tic = time.perf_counter()
+full = Freq_domain.fft_comp(tf, data)
+t_full = time.perf_counter() - tic
+tic = time.perf_counter()
+targeted = Freq_domain.fft_comp(tf, data, freqs=freqs)
+t_targeted = time.perf_counter() - tic
+print("{:,d} samples, full FFT: {:.3f} s, targeted: {:.3f} s".format(len(tf), t_full, t_targeted))
+for i, f in enumerate(freqs):
+    idx = np.argmin(np.abs(full["freq"] - f))
+    assert targeted["freq"][i] == full["freq"][idx]
+    np.testing.assert_allclose(targeted["complex"][i], full["complex"][idx], rtol=1e-8, atol=1e-12)
+np.testing.assert_allclose(targeted["dc_comp"], full["dc_comp"], rtol=1e-8, atol=1e-12)
+
+#%% the tidal components of a site
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/Rau_et_al_2021.csv',
+                        input_category=["GW","BP","ET"], utc_offset=0, unit=["m","m","nstr"],
+                        how="add", check_duplicates=True)
+
+process = hgs.Processing(site)
+full = process.fft()
+targeted = process.fft(targeted=True)
+for ident in full["fft"].keys():
+    res_f = full["fft"][ident][0]
+    res_t = targeted["fft"][ident][0]
+    assert len(res_t["freq"]) == len(res_t["comps"])
+    for i, f in enumerate(res_t["freq"]):
+        idx = np.argmin(np.abs(res_f["freq"] - f))
+        np.testing.assert_allclose(res_t["complex"][i], res_f["complex"][idx], rtol=1e-8, atol=1e-12)
+
+#%% BE_freq from the targeted spectra
+be_full = hgs.Processing(site)
+be_full.fft(update=True)
+be_full = be_full.BE_freq(freq_method="fft")
+be_targeted = hgs.Processing(site)
+be_targeted.fft(targeted=True, update=True)
+be_targeted = be_targeted.BE_freq(freq_method="fft")
+for key in be_full["be_freq"].keys():
+    np.testing.assert_allclose(be_targeted["be_freq"][key][0], be_full["be_freq"][key][0], rtol=1e-8)
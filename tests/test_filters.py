@@ -0,0 +1,39 @@
+import hydrogeosines as hgs
+import numpy as np
+import pandas as pd
+import time
+
+#%% lazy category accessors against the eager boolean masks
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/BLM-1_double.csv',
+                        input_category=["GW","GW","BP","ET"], utc_offset=0, unit=["m","m","m","nstr"],
+                        how="add", check_duplicates=True)
+data = site.data
+
+# grouping columns do not touch the data
+filters = data.hgs.filters
+assert filters.loc_part == ["location", "part"]
+assert filters._rows is None
+
+for cat in data["category"].unique():
+    ref = data[data["category"] == cat].copy()
+    pd.testing.assert_frame_equal(getattr(filters, "get_{}_data".format(cat.lower())), ref)
+    np.testing.assert_array_equal(getattr(filters, "get_{}_values".format(cat.lower())), ref.value.values)
+    np.testing.assert_array_equal(getattr(filters, "get_{}_locs".format(cat.lower())), ref["location"].unique())
+
+# the returned data is independent of the site data
+gw = filters.get_gw_data
+gw["value"] = 0.
+assert (filters.get_gw_data["value"] != 0).any()
+
+# the filters follow in-place edits of the frame
+edited = data.copy()
+n_gw, n_bp = len(edited.hgs.filters.get_gw_data), len(edited.hgs.filters.get_bp_data)
+edited.loc[edited["category"] == "BP", "category"] = "GW"
+assert len(edited.hgs.filters.get_gw_data) == n_gw + n_bp
+assert not hasattr(edited.hgs.filters, "get_bp_data")
+
+tic = time.perf_counter()
+for i in range(100):
+    data.hgs.filters.loc_part
+print("100 x filters.loc_part: {:.3f} s".format(time.perf_counter() - tic))
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+from hydrogeosines import utils
+
+#%% the previous implementation as reference
+def gap_mask_ref(s, maxgap):
+    idx = s.isnull().astype(int).groupby(s.notnull().astype(bool).cumsum()).sum()
+    sizes = idx[idx > 0]
+    start = sizes.index + (sizes.cumsum() - sizes)
+    stop  = start + sizes
+    mask = np.zeros_like(s)
+    for a, b in zip(start, stop):
+        mask[np.arange(a, b)] = b - a
+    return (mask < maxgap) | s.notnull().to_numpy(), np.count_nonzero(np.logical_and(mask > 0, mask < maxgap))
+
+rng = np.random.default_rng(0)
+cases = [np.full(10, np.nan), np.ones(10), np.array([np.nan, np.nan, 1, np.nan, 2, np.nan, np.nan, np.nan])]
+for p in (0.05, 0.3, 0.7):
+    x = rng.normal(size=2000)
+    x[rng.random(2000) < p] = np.nan
+    cases.append(x)
+for x in cases:
+    s = pd.Series(x)
+    for maxgap in (0, 1, 2, 3.5, 12, 1e6):
+        mask, counter = utils.gap_mask(s, maxgap)
+        mask_ref, counter_ref = gap_mask_ref(s, maxgap)
+        assert mask.dtype == bool
+        np.testing.assert_array_equal(mask, mask_ref)
+        assert counter == counter_ref
@@ -0,0 +1,56 @@
+import hydrogeosines as hgs
+import numpy as np
+
+from hydrogeosines.ext.hgs_analysis import Time_domain, Lag_operator, lsq_qr, const
+
+#%% the rows of the lag operator only touch the samples of the window
+x = np.random.default_rng(1).normal(size=500)
+V = Lag_operator(x, 24)
+dense = V.dense()
+for start, stop in ((0, 500), (0, 5), (10, 40), (24, 25), (300, 500), (7, 7)):
+    np.testing.assert_array_equal(V.rows(start, stop), dense[start:stop])
+
+#%% rolling windows of a multi-year record against a direct fit of each window
+rng = np.random.default_rng(0)
+spd = 24
+n = spd*365*3
+tf = np.arange(n)/spd
+BP = 0.05*np.cos(2*np.pi*2*tf) + np.cumsum(rng.normal(0, 1e-3, n))
+ET = np.cos(2*np.pi*1.93*tf) + 0.5*np.cos(2*np.pi*0.93*tf) + rng.normal(0, 1e-2, n)
+GW = -0.5*BP + 0.01*ET + np.cumsum(rng.normal(0, 1e-4, n))
+fqs = np.array(list(const.const["_etfqs"].values()))
+
+for et_method in (None, "ts", "hals"):
+    tw, params = Time_domain.regress_deconv_rolling(tf, GW, BP, ET, lag_h=24, et_method=et_method, window=30, step=1)
+    assert params["brf"]["brf"].shape == (len(tw), 25)
+    Z = [np.ones((n-1, 1)), Lag_operator(-np.diff(BP), 24).dense()]
+    if et_method == "ts":
+        Z.append(Lag_operator(np.diff(ET), 24).dense())
+    elif et_method == "hals":
+        tau = np.outer(tf[:-1], 2*np.pi*fqs)
+        Z += [np.cos(tau), np.sin(tau)]
+    Z = np.hstack(Z)
+    # the windows after many up/downdates, across refactorizations and at the end of the record
+    for k in list(range(0, len(tw), 97)) + [len(tw)-2, len(tw)-1]:
+        rows = slice(tw[k] - 30*spd, tw[k])
+        c, covar, condnum = lsq_qr(Z[rows], np.diff(GW)[rows])
+        ref = Time_domain.deconv_params(c, covar, params["brf"]["lag"], NP=len(fqs) if et_method == "hals" else 0, et_method=et_method, fqs=fqs)
+        for rf in ref.keys():
+            for key in ("irc", "brf", "crf_stdev", "complex"):
+                if key in ref[rf]:
+                    np.testing.assert_allclose(params[rf][key][k], ref[rf][key], rtol=1e-8, atol=1e-12)
+
+#%% the processing workflow
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/BLM-1_double.csv',
+                        input_category=["GW","GW","BP","ET"], utc_offset=0, unit=["m","m","m","nstr"],
+                        how="add", check_duplicates=True)
+
+process = hgs.Processing(site)
+rolling = process.GW_correct_rolling(lag_h=8, et_method="ts", window=30, step=1)
+for loc, (results, data, info) in rolling["gw_correct_rolling"].items():
+    print(loc, results["brf"]["brf"].iloc[:, -1].describe())
+
+rolling = process.GW_correct_rolling(lag_h=8, et_method="hals", window=30, step=1)
+for loc, (results, data, info) in rolling["gw_correct_rolling"].items():
+    assert "erf" in results
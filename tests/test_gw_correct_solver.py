@@ -0,0 +1,71 @@
+import hydrogeosines as hgs
+import numpy as np
+
+#%%  Testing MVC principal
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/Rau_et_al_2021.csv',
+                        input_category=["GW","BP","ET"], utc_offset=0, unit=["m","m","nstr"],
+                        how="add", check_duplicates=True)
+
+process = hgs.Processing(site)
+
+#%% compare the direct solver with the iterative reference
+for et_method in (None, "hals", "ts"):
+    direct = process.GW_correct(lag_h=8, et_method=et_method)
+    reference = process.GW_correct(lag_h=8, et_method=et_method, solver="curve_fit")
+    for loc in direct["gw_correct"].keys():
+        res_d = direct["gw_correct"][loc][0]
+        res_r = reference["gw_correct"][loc][0]
+        np.testing.assert_allclose(res_d["WLc"], res_r["WLc"], rtol=0, atol=1e-5)
+        np.testing.assert_allclose(res_d["brf"]["brf"], res_r["brf"]["brf"], rtol=0, atol=1e-4)
+        np.testing.assert_allclose(res_d["brf"]["crf_stdev"], res_r["brf"]["crf_stdev"], rtol=1e-4)
+
+#%% the normal equations assembled from the lag operators must agree with QR
+for et_method in (None, "hals", "ts"):
+    direct = process.GW_correct(lag_h=8, et_method=et_method)
+    normal = process.GW_correct(lag_h=8, et_method=et_method, solver="cholesky")
+    for loc in direct["gw_correct"].keys():
+        res_d = direct["gw_correct"][loc][0]
+        res_n = normal["gw_correct"][loc][0]
+        np.testing.assert_allclose(res_n["WLc"], res_d["WLc"], rtol=0, atol=1e-8)
+        np.testing.assert_allclose(res_n["brf"]["brf"], res_d["brf"]["brf"], rtol=0, atol=1e-8)
+        np.testing.assert_allclose(res_n["brf"]["crf_stdev"], res_d["brf"]["crf_stdev"], rtol=1e-6)
+
+#%% the cumulative response variance against the per-lag submatrix sums
+from hydrogeosines.ext.hgs_analysis import cumsum_var
+
+rng = np.random.default_rng(0)
+A = rng.normal(size=(400, 289))
+covar = np.linalg.inv(A.T @ A)
+ref = np.zeros(covar.shape[0])
+for i in range(covar.shape[0]):
+    ref[i] = np.sum(np.diagonal(covar[0:i+1, 0:i+1])) + 2*np.sum(np.tril(covar[0:i+1, 0:i+1], -1))
+# the prefix sums add the same terms in a different order than the submatrix sums, so they agree
+# to rounding only (about 1e-15 relative here), not bit for bit; rtol=1e-12 leaves room for the
+# error growth with the number of lags
+np.testing.assert_allclose(np.sqrt(cumsum_var(covar)), np.sqrt(ref), rtol=1e-12)
+
+#%% long lags on a long record: the default solver avoids the dense lagged matrices
+import tracemalloc
+from hydrogeosines.ext.hgs_analysis import Time_domain
+
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/BLM-1_double.csv',
+                        input_category=["GW","GW","BP","ET"], utc_offset=0, unit=["m","m","m","nstr"],
+                        how="add", check_duplicates=True)
+process = hgs.Processing(site).by_gwloc(["BLM-1"])
+process.RegularAndAligned()
+n = len(process.data_aligned.times(("BLM-1", "all"))) - 1
+# 72 hours at 15 minute sampling
+nm = 72*4 + 1
+assert n*(1 + nm) > Time_domain.DENSE_MAX
+tracemalloc.start()
+auto = process.GW_correct(lag_h=72)
+peak = tracemalloc.get_traced_memory()[1]
+tracemalloc.stop()
+assert peak < n*nm*8, "the dense {:d} x {:d} matrix was built ({:,d} bytes)".format(n, nm, peak)
+direct = process.GW_correct(lag_h=72, solver="qr")
+res_a = auto["gw_correct"][("BLM-1", "all")][0]
+res_d = direct["gw_correct"][("BLM-1", "all")][0]
+np.testing.assert_allclose(res_a["WLc"], res_d["WLc"], rtol=0, atol=1e-8)
+np.testing.assert_allclose(res_a["brf"]["brf"], res_d["brf"]["brf"], rtol=0, atol=1e-8)
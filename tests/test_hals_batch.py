@@ -0,0 +1,42 @@
+import hydrogeosines as hgs
+import numpy as np
+
+#%% a site with several wells sharing the same sample times
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/BLM-1_double.csv',
+                        input_category=["GW","GW","BP","ET"], utc_offset=0, unit=["m","m","m","nstr"],
+                        how="add", check_duplicates=True)
+
+process = hgs.Processing(site)
+
+#%% the shared factorization must agree with the HALS fit per series
+serial = process.hals()
+batch = process.hals(batch=True)
+assert list(serial["hals"].keys()) == list(batch["hals"].keys())
+# the series of one category with the same sample times form a batch
+batches = {}
+for ident, (results, data_group, info) in batch["hals"].items():
+    batches.setdefault((ident[-1], data_group.index.values.tobytes()), []).append(ident)
+assert max(len(idents) for idents in batches.values()) > 1
+for ident in serial["hals"].keys():
+    res_s = serial["hals"][ident][0]
+    res_b = batch["hals"][ident][0]
+    np.testing.assert_allclose(res_b["complex"], res_s["complex"], rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(res_b["phs"], res_s["phs"], rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(res_b["error_var"], res_s["error_var"], rtol=1e-9)
+    np.testing.assert_allclose(res_b["cond_num"], res_s["cond_num"], rtol=1e-6)
+    np.testing.assert_allclose(res_b["offset"], res_s["offset"], rtol=1e-9, atol=1e-12)
+    assert res_b["component"] == res_s["component"]
+
+#%% several series solved at once
+from hydrogeosines.ext.hgs_analysis import Freq_domain
+
+rng = np.random.default_rng(0)
+tf = np.arange(0, 40, 1/24)
+freqs = [1.0, 1.9322736, 2.0]
+Y = np.column_stack([np.cos(2*np.pi*2*tf + p) + rng.normal(0, 0.1, len(tf)) for p in (0, 1, 2)])
+fits = Freq_domain.harmonic_lsqr_batch(tf, Y, freqs)
+for i, fit in enumerate(fits):
+    ref = Freq_domain.harmonic_lsqr(tf, Y[:, i], freqs)
+    for key in ("complex", "error_var", "offset", "y_model"):
+        np.testing.assert_allclose(fit[key], ref[key], rtol=1e-9, atol=1e-12)
@@ -0,0 +1,65 @@
+import hydrogeosines as hgs
+import numpy as np
+import time
+
+from hydrogeosines.ext.hgs_analysis import Freq_domain, Harmonic_rls
+from hydrogeosines.ext.time import Time
+
+#%% synthetic telemetry
+rng = np.random.default_rng(0)
+freqs = [0.9295357, 1.0, 1.9322736, 2.0]
+tf = 19000.3 + np.arange(0, 60, 1/24)
+data = 0.1 + 0.5*np.cos(2*np.pi*1.9322736*tf + 0.3) + 0.2*np.sin(2*np.pi*2.0*tf) + rng.normal(0, 0.01, len(tf))
+
+#%% seeding agrees with the batch fit, the time origin is the first sample
+n = 24*30
+online = Harmonic_rls.from_batch(tf[:n], data[:n], freqs)
+assert online.t0 == tf[0]
+batch = Freq_domain.harmonic_lsqr(tf[:n] - tf[0], data[:n], freqs)
+np.testing.assert_allclose(online.complex, batch["complex"], rtol=1e-9, atol=1e-12)
+np.testing.assert_allclose(online.offset, batch["offset"], rtol=1e-9)
+np.testing.assert_allclose(online.error_var, batch["error_var"], rtol=1e-9)
+
+#%% the recursive updates reproduce the batch fit of all samples
+tic = time.perf_counter()
+for t, y in zip(tf[n:], data[n:]):
+    online.update(t, y)
+print("{:.1f} us per update".format((time.perf_counter() - tic)/(len(tf) - n)*1e6))
+batch = Freq_domain.harmonic_lsqr(tf - tf[0], data, freqs)
+np.testing.assert_allclose(online.complex, batch["complex"], rtol=1e-8, atol=1e-10)
+np.testing.assert_allclose(online.offset, batch["offset"], rtol=1e-8)
+np.testing.assert_allclose(online.error_var, batch["error_var"], rtol=1e-6)
+res = online.results()
+np.testing.assert_allclose(res["amp"], np.abs(batch["complex"]), rtol=1e-8, atol=1e-10)
+assert online.t_last == tf[-1]
+
+#%% a forgetting factor follows a change of the amplitude
+changed = data + 0.5*np.cos(2*np.pi*1.9322736*tf + 0.3)
+tracker = Harmonic_rls.from_batch(tf[:n], data[:n], freqs, forgetting=0.995)
+tracker.update(tf[n:], changed[n:])
+np.testing.assert_allclose(tracker.results()["amp"][2], 1.0, rtol=3e-2)
+static = Harmonic_rls.from_batch(tf[:n], data[:n], freqs).update(tf[n:], changed[n:])
+assert abs(static.results()["amp"][2] - 1.0) > 0.2
+
+#%% Processing seeds one estimator per location
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/Rau_et_al_2021.csv',
+                        input_category=["GW","BP","ET"], utc_offset=0, unit=["m","m","nstr"],
+                        how="add", check_duplicates=True)
+process = hgs.Processing(site)
+out = process.hals_online()
+for ident, (results, data_group, info) in out["hals_online"].items():
+    estimator = results["estimator"]
+    assert len(results["component"]) == len(results["amp"])
+    # the data are seeded up to the last sample
+    tf = Time(data_group.index.to_series()).to_num
+    assert estimator.t_last == tf[-1]
+    estimator.update(tf[-1] + 1/24, data_group.values[-1, 0])
+
+#%% the phases agree with hals on the same data
+hals = process.hals(detrend=False)["hals"]
+for ident, (results, data_group, info) in out["hals_online"].items():
+    batch = hals[ident][0]
+    assert results["component"] == batch["component"]
+    np.testing.assert_allclose(results["amp"], batch["amp"], rtol=1e-6)
+    np.testing.assert_allclose(np.angle(np.exp(1j*(results["phs"] - batch["phs"]))), 0, atol=1e-6)
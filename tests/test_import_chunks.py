@@ -0,0 +1,23 @@
+import hydrogeosines as hgs
+import pandas as pd
+
+#%% the chunked import must reproduce the site table of a single read
+def load(categorical=False, **kwargs):
+    site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688], categorical=categorical)
+    site.import_csv('tests/data/death_valley/BLM-1_double.csv',
+                            input_category=["GW","GW","BP","ET"], utc_offset=0, unit=["m","m","m","nstr"],
+                            how="add", check_duplicates=True, **kwargs)
+    site.import_csv('tests/data/death_valley/Rau_et_al_2021.csv',
+                            input_category=["GW","BP","ET"], utc_offset=-8, unit=["m","hpa","nstr"],
+                            loc_names=["Well","Baro","ET"], how="add", **kwargs)
+    return site
+
+single = load()
+chunked = load(chunksize=1000)
+pd.testing.assert_frame_equal(single.data, chunked.data)
+assert single.utc_offset == chunked.utc_offset
+
+# the series are buffered per location and merged into the categorical table of the site
+single = load(categorical=True)
+chunked = load(categorical=True, chunksize=1000)
+pd.testing.assert_frame_equal(single.data, chunked.data)
@@ -0,0 +1,27 @@
+import hydrogeosines as hgs
+import numpy as np
+
+from hydrogeosines.ext.hgs_analysis import Freq_domain, hflow_response
+from hydrogeosines.models import const
+
+#%% the analytic Jacobian against finite differences
+f_m2 = const.const['_etfqs']['M2']
+for K, S_s in ((8.64, 1e-4), (0.01, 1e-5), (1e-3, 1e-2)):
+    Ar, dPhi, jac = hflow_response(K, S_s, 0.127, 0.127, 10, f_m2, jac=True)
+    h = 1e-5
+    for j, (dK, dS) in enumerate(((K*h, 0), (0, S_s*h))):
+        up = np.array(hflow_response(K + dK, S_s + dS, 0.127, 0.127, 10, f_m2))
+        down = np.array(hflow_response(K - dK, S_s - dS, 0.127, 0.127, 10, f_m2))
+        np.testing.assert_allclose(jac[:, j], (up - down)/(2*(dK + dS)), rtol=1e-5, atol=1e-12)
+
+#%% the double-precision fit against the mpmath reference
+ET_m2 = 10*np.exp(0.3j)
+for K, S_s in ((1e-5, 1e-5), (1e-6, 2e-6), (5e-7, 1e-4)):
+    Ar, dPhi = hflow_response(K*24*3600, S_s, 0.127, 0.127, 10, f_m2)
+    GW_m2 = ET_m2*1e-9*(Ar/S_s)*np.exp(1j*dPhi)
+    fit = Freq_domain.K_Ss_Hsieh(ET_m2, GW_m2, 10, 0.127, 0.127)
+    ref = Freq_domain.K_Ss_Hsieh(ET_m2, GW_m2, 10, 0.127, 0.127, engine="mpmath")
+    np.testing.assert_allclose(fit["K"], K, rtol=1e-6)
+    np.testing.assert_allclose(fit["Ss"], S_s, rtol=1e-6)
+    np.testing.assert_allclose(fit["K"], ref["K"], rtol=1e-6)
+    np.testing.assert_allclose(fit["Ss"], ref["Ss"], rtol=1e-6)
@@ -0,0 +1,82 @@
+import os
+import numpy as np
+import tempfile
+import time
+
+from hydrogeosines.ext.hgs_analysis import Freq_domain, hflow_response
+from hydrogeosines.ext.k_ss_table import K_Ss_table
+from hydrogeosines.models import const
+from hydrogeosines import utils
+
+f_m2 = const.const['_etfqs']['M2']
+folder = tempfile.mkdtemp()
+rng = np.random.default_rng(0)
+n = 200
+ET_m2 = 10*np.exp(1j*rng.uniform(-np.pi, np.pi, n))
+
+#%% Hsieh et al. (1987) for synthetic wells of different geometry
+K = 10**rng.uniform(-7, -4, n)
+Ss = 10**rng.uniform(-6, -4, n)
+scr_len = rng.uniform(2, 50, n)
+case_rad = rng.uniform(0.05, 0.2, n)
+scr_rad = rng.uniform(0.05, 0.2, n)
+GW_m2 = np.empty(n, dtype=complex)
+for i in range(n):
+    Ar, dPhi = hflow_response(K[i]*24*3600, Ss[i], case_rad[i], scr_rad[i], scr_len[i], f_m2)
+    GW_m2[i] = ET_m2[i]*1e-9*(Ar/Ss[i])*np.exp(1j*dPhi)
+
+table = K_Ss_table("hsieh", folder=folder)
+tic = time.perf_counter()
+res = table.invert(ET_m2, GW_m2, scr_len=scr_len, case_rad=case_rad, scr_rad=scr_rad)
+t_table = time.perf_counter() - tic
+tic = time.perf_counter()
+with utils.nullify_output():
+    ref = [Freq_domain.K_Ss_Hsieh(ET_m2[i], GW_m2[i], scr_len[i], case_rad[i], scr_rad[i]) for i in range(20)]
+t_solver = (time.perf_counter() - tic)/20*n
+print("Hsieh: {:d} wells, table: {:.3f} s, solver: {:.3f} s".format(n, t_table, t_solver))
+assert np.all(res["method"] == "table")
+np.testing.assert_allclose(res["K"], K, rtol=1e-8)
+np.testing.assert_allclose(res["Ss"], Ss, rtol=1e-8)
+np.testing.assert_allclose(res["K"][:20], [r["K"] for r in ref], rtol=1e-6)
+np.testing.assert_allclose(res["Ss"][:20], [r["Ss"] for r in ref], rtol=1e-6)
+
+# the table is stored on disk and loaded again
+reload = K_Ss_table("hsieh", folder=folder)
+np.testing.assert_array_equal(reload.table["phase"], table.table["phase"])
+np.testing.assert_allclose(reload.invert(ET_m2[:5], GW_m2[:5], scr_len=scr_len[:5], case_rad=case_rad[:5], scr_rad=scr_rad[:5])["K"], K[:5], rtol=1e-8)
+
+#%% Wang (2000)
+# positive phase shifts only
+u = 10**rng.uniform(-0.7, 0.4, n)
+Ss = 10**rng.uniform(-6, -4, n)
+scr_depth = rng.uniform(20, 200, n)
+omega = 2*np.pi*(f_m2/24/3600)
+K = omega*scr_depth**2*Ss/(2*u**2)
+V = 1 - np.exp(-(1 + 1j)*u)
+GW_m2 = ET_m2*1e-9*(np.abs(V)/Ss)*np.exp(1j*np.angle(V))
+
+table = K_Ss_table("wang", folder=folder)
+res = table.invert(ET_m2, GW_m2, scr_depth=scr_depth)
+assert np.all(res["method"] == "table")
+np.testing.assert_allclose(res["K"], K, rtol=1e-6)
+np.testing.assert_allclose(res["Ss"], Ss, rtol=1e-6)
+
+#%% the exact solver is the fallback
+res = table.invert(ET_m2[:3], GW_m2[:3]*np.exp(-1j*np.pi/2), scr_depth=scr_depth[:3])
+assert np.all(res["method"] == "failed") and np.all(np.isnan(res["K"]))
+
+# the solver, started from the table, where the Newton iterations do not converge
+class Unconverged(K_Ss_table):
+    def newton(self, x, log_g, phase_shift, iterations:int=30, tol:float=1e-12):
+        return x, np.zeros(len(x), dtype=bool)
+
+res = Unconverged("wang", folder=folder).invert(ET_m2[:3], GW_m2[:3], scr_depth=scr_depth[:3])
+assert np.all(res["method"] == "solver")
+np.testing.assert_allclose(res["K"], K[:3], rtol=1e-3)
+np.testing.assert_allclose(res["Ss"], Ss[:3], rtol=1e-3)
+
+#%% nothing is written to disk without a folder
+if K_Ss_table.ENV_FOLDER not in os.environ:
+    memory = K_Ss_table("wang")
+    assert memory.folder is None and memory.path() is None
+    np.testing.assert_array_equal(memory.table["phase"], table.table["phase"])
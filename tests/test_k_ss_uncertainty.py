@@ -0,0 +1,40 @@
+import hydrogeosines as hgs
+import numpy as np
+
+#%% the uncertainty of K and Ss from Monte Carlo realizations
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/Rau_et_al_2021.csv',
+                        input_category=["GW","BP","ET"], utc_offset=0, unit=["m","m","nstr"],
+                        how="add", check_duplicates=True)
+
+process = hgs.Processing(site)
+process.hals(update=True)
+geometry = {"scr_len": 106, "case_rad": 0.127, "scr_rad": 0.127, "scr_depth": 78}
+tolerance = {"scr_len": 2, "case_rad": 0.002, "scr_rad": 0.002, "scr_depth": 2}
+
+serial = process.K_Ss_estimate(loc='BLM-1', mc=300, tolerance=tolerance, seed=1, **geometry)
+pool = process.K_Ss_estimate(loc='BLM-1', mc=300, tolerance=tolerance, seed=1, n_jobs=2, **geometry)
+# n_jobs=-1 uses all processors, like Processing(n_jobs=-1)
+all_jobs = process.K_Ss_estimate(loc='BLM-1', mc=300, tolerance=tolerance, seed=1, n_jobs=-1, **geometry)
+# by default the realizations follow the n_jobs and backend of the Processing
+threads = hgs.Processing(site, n_jobs=-1, backend="thread")
+threads.hals(update=True)
+threads = threads.K_Ss_estimate(loc='BLM-1', mc=300, tolerance=tolerance, seed=1, **geometry)
+for key in serial["k_ss_estimate"].keys():
+    res = serial["k_ss_estimate"][key][0]
+    unc = res["uncertainty"]
+    # the seeding does not depend on the number of processes
+    np.testing.assert_array_equal(unc["K"], pool["k_ss_estimate"][key][0]["uncertainty"]["K"])
+    np.testing.assert_array_equal(unc["Ss"], pool["k_ss_estimate"][key][0]["uncertainty"]["Ss"])
+    for other in (all_jobs, threads):
+        np.testing.assert_array_equal(unc["K"], other["k_ss_estimate"][key][0]["uncertainty"]["K"])
+        np.testing.assert_array_equal(unc["Ss"], other["k_ss_estimate"][key][0]["uncertainty"]["Ss"])
+    assert unc["realizations"] == 300
+    assert unc["failed"] < 300
+    assert np.all(np.diff(unc["K"]) > 0) and np.all(np.diff(unc["Ss"]) > 0)
+    assert unc["K"][0] <= res["K"] <= unc["K"][-1]
+    assert unc["Ss"][0] <= res["Ss"] <= unc["Ss"][-1]
+
+# a different seed gives different realizations
+other = process.K_Ss_estimate(loc='BLM-1', mc=300, tolerance=tolerance, seed=2, **geometry)
+assert not np.array_equal(other["k_ss_estimate"][key][0]["uncertainty"]["K"], unc["K"])
@@ -0,0 +1,32 @@
+import numpy as np
+import time
+
+from hydrogeosines.ext.hgs_analysis import Freq_domain
+
+#%% linear time detrending against the reference implementation
+rng = np.random.default_rng(0)
+n = 96*365
+tf = np.arange(n)/96 + 3000.
+data = np.cumsum(rng.normal(size=n))*1e-3 + 0.01*tf
+gaps = data.copy()
+gaps[rng.random(n) < 0.05] = np.nan
+gaps[5000:8000] = np.nan
+irregular = np.sort(rng.uniform(0, 200, 5000))
+
+cases = [(tf, data, {}),
+         (tf, data, {"length": 2, "n_ovrlp": 4}),
+         (tf, data, {"length": 1, "stopper": 50, "n_ovrlp": 0}),
+         (tf, gaps, {}),
+         (irregular, np.sin(irregular), {"stopper": 40})]
+
+for x, y, kwargs in cases:
+    tic = time.perf_counter()
+    ref = Freq_domain.lin_window_ovrlp(x, y, engine="loop", **kwargs)
+    t_loop = time.perf_counter() - tic
+    tic = time.perf_counter()
+    res = Freq_domain.lin_window_ovrlp(x, y, **kwargs)
+    t_numpy = time.perf_counter() - tic
+    print("{:>8d} samples {} loop: {:.3f} s, numpy: {:.4f} s".format(len(x), kwargs, t_loop, t_numpy))
+    # the same samples are detrended (stopper rule, gaps)
+    assert np.array_equal(ref == 0, res == 0)
+    np.testing.assert_allclose(res, ref, rtol=0, atol=1e-9*np.max(np.abs(ref)))
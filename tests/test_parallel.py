@@ -0,0 +1,40 @@
+import hydrogeosines as hgs
+import numpy as np
+import pandas as pd
+
+#%% the parallel execution must give the serial results in the same order
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/Rau_et_al_2021.csv',
+                        input_category=["GW","BP","ET"], utc_offset=0, unit=["m","m","nstr"],
+                        how="add", check_duplicates=True)
+
+def assert_same(a, b):
+    if isinstance(a, dict):
+        assert list(a.keys()) == list(b.keys())
+        for key in a.keys():
+            assert_same(a[key], b[key])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            assert_same(x, y)
+    elif isinstance(a, (pd.DataFrame, pd.Series)):
+        pd.testing.assert_frame_equal(pd.DataFrame(a), pd.DataFrame(b))
+    elif isinstance(a, (np.ndarray, float, complex, np.floating, np.complexfloating)):
+        np.testing.assert_array_equal(a, b)
+    else:
+        assert (a == b) or (a is b) or (str(a) == str(b))
+
+calls = [("hals", {}), ("hals", {"batch": True}), ("fft", {}), ("fft", {"targeted": True}),
+         ("GW_correct", {"lag_h": 8}), ("BE_time", {}), ("acorr", {"max_lag": 2}), ("xcorr", {})]
+
+serial = hgs.Processing(site)
+for backend in ("thread", "process"):
+    parallel = hgs.Processing(site, n_jobs=2, backend=backend)
+    for method, kwargs in calls:
+        assert_same(getattr(serial, method)(**kwargs), getattr(parallel, method)(**kwargs))
+
+try:
+    hgs.Processing(site, backend="cluster")
+    raise AssertionError("an unknown backend must raise")
+except Exception as error:
+    assert "Backend" in str(error)
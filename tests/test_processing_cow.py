@@ -0,0 +1,48 @@
+import hydrogeosines as hgs
+import numpy as np
+import pandas as pd
+import tracemalloc
+
+#%% the site data and the results must not depend on the copy mode
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/BLM-1_double.csv',
+                        input_category=["GW","GW","BP","ET"], utc_offset=0, unit=["m","m","m","nstr"],
+                        how="add", check_duplicates=True)
+data = site.data.copy()
+utc_offset = dict(site.utc_offset)
+
+def measure(copy_on_write):
+    # the memory allocated by the constructor
+    tracemalloc.start()
+    process = hgs.Processing(site, copy_on_write=copy_on_write)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return process, size
+
+process_deep, mem_deep = measure(False)
+process_cow, mem_cow = measure(True)
+# the column arrays (copies of the object columns share the strings)
+mem_data = site.data.memory_usage(deep=False).sum()
+print("Site data: {:.2f} MB, Processing: {:.2f} MB (deepcopy), {:.3f} MB (copy on write)".format(mem_data/1e6, mem_deep/1e6, mem_cow/1e6))
+# the deep copy holds the data twice (site and data_orig), copy on write does not copy it
+assert mem_deep > 1.5*mem_data
+assert mem_cow < 0.01*mem_data
+assert process_cow.shares_data and not process_deep.shares_data
+assert process_cow.site.data is site.data and process_cow.data_orig is site.data
+
+#%% the filter steps replace the shared data by a private copy
+for process in (process_deep, process_cow):
+    process.by_gwloc("BLM-1").by_dates(start="2009-07-01", stop="2009-11-01").decimate(2)
+    assert not process.shares_data
+    # ET_calc adds the UTC offset of ET to the processed site only
+    assert process.site.utc_offset is not site.utc_offset
+pd.testing.assert_frame_equal(process_cow.site.data, process_deep.site.data)
+# the original site is not touched
+pd.testing.assert_frame_equal(site.data, data)
+assert site.utc_offset == utc_offset
+assert process_cow.data_orig is site.data
+
+res_deep = process_deep.BE_time(method="clark")
+res_cow = process_cow.BE_time(method="clark")
+for loc in res_deep["be_time"].keys():
+    np.testing.assert_array_equal(res_cow["be_time"][loc][0]["clark"], res_deep["be_time"][loc][0]["clark"])
@@ -0,0 +1,94 @@
+import hydrogeosines as hgs
+import numpy as np
+import os
+import tempfile
+from hydrogeosines.handlers.result_cache import Result_cache
+
+#%% repeated calls are calculated once
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv('tests/data/death_valley/BLM-1_double.csv',
+                        input_category=["GW","GW","BP","ET"], utc_offset=0, unit=["m","m","m","nstr"],
+                        how="add", check_duplicates=True)
+
+process = hgs.Processing(site, cache=True)
+hals = process.hals()
+assert process.cache.misses == 1
+again = process.hals()
+assert process.cache.hits == 1
+assert again["hals"].keys() == hals["hals"].keys()
+# a subset of the locations is served from the results of all locations
+subset = process.hals(loc=["BLM-2"])
+assert process.cache.hits == 2
+assert list(subset["hals"].keys()) == [key for key in hals["hals"].keys() if key[0] == "BLM-2"]
+# BE_freq and K_Ss_estimate use the cached HALS
+process.BE_freq(method="rau")
+process.K_Ss_estimate(loc="BLM-1", scr_len=10, case_rad=0.127, scr_rad=0.127, scr_depth=78)
+assert process.cache.misses == 1
+# other parameters are calculated again
+process.hals(detrend=False)
+assert process.cache.misses == 2
+misses = process.cache.misses
+
+#%% the returned results are independent of the cache
+key = ("BLM-1", "all", "GW")
+changed = process.hals()
+changed["hals"][key][0]["complex"] *= 2
+np.testing.assert_array_equal(process.hals()["hals"][key][0]["complex"], hals["hals"][key][0]["complex"])
+
+#%% in-place edits of the data are detected
+edited = hgs.Processing(site, cache=True)
+edited.hals()
+gw = edited.site.data["category"] == "GW"
+edited.site.data.loc[gw, "value"] *= 3
+scaled = edited.hals()
+assert edited.cache.misses == 2
+reference = hgs.Processing(site)
+reference.site.data.loc[reference.site.data["category"] == "GW", "value"] *= 3
+reference = reference.hals()
+for ident, val in reference["hals"].items():
+    np.testing.assert_array_equal(scaled["hals"][ident][0]["complex"], val[0]["complex"])
+
+#%% the results are invalidated by a changed dataset
+process.by_dates(start="2009-07-01", stop="2009-11-01")
+short = process.hals(loc=["BLM-1"])
+assert process.cache.misses == misses + 1
+assert len(short["hals"][("BLM-1", "all", "GW")][1]) < len(hals["hals"][("BLM-1", "all", "GW")][1])
+uncached = hgs.Processing(site).by_dates(start="2009-07-01", stop="2009-11-01").hals(loc=["BLM-1"])
+for key, val in uncached["hals"].items():
+    np.testing.assert_array_equal(short["hals"][key][0]["complex"], val[0]["complex"])
+
+#%% stored results (update=True) are only reused for the data they were calculated from
+process = hgs.Processing(site)
+process.hals(loc=["BLM-1"], detrend=False, update=True)
+assert process._stored_results("hals", loc="BLM-1") is not None
+be_stored = process.BE_freq(method="rau")
+assert list(be_stored["be_freq"].keys()) == [("BLM-1", "all")]
+process.by_gwloc("BLM-2")
+assert process._stored_results("hals") is None
+assert list(process.BE_freq(method="rau")["be_freq"].keys()) == [("BLM-2", "all")]
+
+#%% the aligned methods depend on the regular data
+process = hgs.Processing(site, cache=Result_cache(max_entries=2))
+process.fft()
+# the same regular data
+process.RegularAndAligned()
+process.fft()
+assert process.cache.hits == 1
+process.data_regular = process.data_regular[process.data_regular["datetime"] < "2009-11-01"]
+process.fft()
+process.acorr()
+assert process.cache.misses == 3 and len(process.cache) == 2
+
+#%% a shared on-disk cache
+folder = tempfile.mkdtemp()
+cache = Result_cache(folder=folder)
+fft = hgs.Processing(site, cache=cache).fft(loc=["BLM-1"])
+assert len(os.listdir(folder)) == 1
+cache = Result_cache(folder=folder)
+loaded = hgs.Processing(site, cache=cache).fft(loc=["BLM-1"])
+assert cache.hits == 1
+for key, val in fft["fft"].items():
+    np.testing.assert_array_equal(loaded["fft"][key][0]["complex"], val[0]["complex"])
+cache.max_bytes = 0
+cache.evict()
+assert cache.size() == 0
@@ -0,0 +1,53 @@
+import hydrogeosines as hgs
+import numpy as np
+import os
+import json
+import tempfile
+
+#%% a manifest of two sites with the same records and one broken site
+file = {"filepath": "tests/data/death_valley/Rau_et_al_2021.csv", "input_category": ["GW","BP","ET"],
+        "utc_offset": 0, "unit": ["m","m","nstr"], "how": "add", "check_duplicates": True}
+manifest = [{"name": "death valley", "geoloc": [-116.471360, 36.408130, 688], "files": [file]},
+            {"name": "death valley 2", "geoloc": [-116.471360, 36.408130, 688], "files": [file]},
+            {"name": "missing", "geoloc": [-116.471360, 36.408130, 688], "files": [dict(file, filepath="tests/data/missing.csv")]}]
+pipeline = [("hals", {"update": True}), ("BE_freq", {"update": True}), ("GW_correct", {"lag_h": 8, "update": True}),
+            ("export", {"analysis_method": ["hals", "gw_correct"]})]
+
+folder = tempfile.mkdtemp()
+path = os.path.join(folder, "manifest.json")
+with open(path, "w") as f:
+    json.dump(manifest, f)
+batch = hgs.Batch(path, os.path.join(folder, "out"), pipeline=pipeline)
+
+summary = batch.run(n_jobs=2)
+assert list(summary.index) == ["death valley", "death valley 2", "missing"]
+assert list(summary["status"]) == ["done", "done", "failed"]
+for step in ("import", "hals", "BE_freq", "GW_correct", "export", "total"):
+    assert np.all(summary.loc[["death valley", "death valley 2"], step] >= 0)
+assert len(os.listdir(os.path.join(batch.folder, "death valley"))) > 1
+
+#%% the results agree with a direct run
+site = hgs.Site('death valley', geoloc=[-116.471360, 36.408130, 688])
+site.import_csv(**file)
+process = hgs.Processing(site)
+hals = process.hals()
+results = batch.results("death valley 2")
+for loc in hals["hals"].keys():
+    np.testing.assert_allclose(results["hals"][loc][0]["complex"], hals["hals"][loc][0]["complex"])
+
+#%% resume after a crash: only the sites without a completed record run again
+os.remove(os.path.join(batch.folder, "death valley 2.json"))
+summary = batch.run()
+assert list(summary["status"]) == ["skipped", "done", "failed"]
+summary = batch.run(resume=False)
+assert list(summary["status"]) == ["done", "done", "failed"]
+
+#%% invalid pipelines and manifests
+for args in ((manifest, folder, ["nonsense"]), (manifest[:1]*2, folder, pipeline)):
+    try:
+        hgs.Batch(*args)
+        raise AssertionError("Invalid arguments must raise")
+    except AssertionError:
+        raise
+    except Exception:
+        pass